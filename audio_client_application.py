@@ -6,37 +6,104 @@
 
 # **********************************Import*********************************** #
 # The global libraries built into python
+import sys
 import time
 import json
 import queue
 import ctypes
 import socket
-import datetime
 import threading
 import multiprocessing
 
 # The local libraries
 from network_audio_classes import constants
+from network_audio_classes import audio_codec
+from network_audio_classes import packet_protocol
+from network_audio_classes import latency_profile
+from network_audio_classes.clock_sync import ClockSync
+from network_audio_classes.server_discovery import DiscoveryClient
+from network_audio_classes.jitter_buffer import JitterBuffer
 from network_audio_classes.audio_player_process import AudioPlayer
+from network_audio_classes.audio_output_backend import AudioOutputBackend
+from network_audio_classes.audio_output_backend import PyAudioBackend
 from network_audio_classes.client_socket_thread import ClientSocketThread
+from network_audio_classes.metrics_registry import MetricsRegistry
+from network_audio_classes.metrics_registry import MetricsHttpServer
 
 # *************************Audio Client Application************************** #
 
 class AudioClientApplication(multiprocessing.Process):
     PROCESS_NAME: str = "Audio Client Application"
 
-    # TODO: Want to have a way for the client to auto find the server
-    def __init__(self, host_ip: str):
+    MESSAGE_TIMEOUT: float = .5
+
+    MAX_CONCEAL_FRAMES: int = 4
+    MAX_REORDER: int = 64
+
+    DISCOVERY_TIMEOUT: float = 1.0
+    CONNECT_TIMEOUT: float = 1.0
+
+    # A server that has not answered a clock sync in this long is gone even
+    # if the socket has not noticed yet
+    SERVER_TIMEOUT: float = 3.0
+
+    RECONNECT_MIN_DELAY: float = .1
+    RECONNECT_MAX_DELAY: float = 5.0
+    RECONNECT_BACKOFF: float = 2.0
+
+    def __init__(self, host_ip: str = None,
+                 min_latency: float = None,
+                 max_latency: float = None,
+                 codecs: list = None,
+                 zone: str = constants.DEFAULT_ZONE,
+                 output_backend: AudioOutputBackend = None,
+                 metrics: MetricsRegistry = None,
+                 metrics_port: int = None,
+                 sample_rate: int = constants.AUDIO_RATE,
+                 channels: int = constants.AUDIO_CHANNELS,
+                 latency_profile_name: str = constants.BALANCED_PROFILE):
         multiprocessing.Process.__init__(self, name=self.PROCESS_NAME)
 
+        # The profile sets the buffering, the player is only made once the
+        # server has said what frame size it streams in
+        self._latency_profile: latency_profile.LatencyProfile = \
+            latency_profile.get_latency_profile(latency_profile_name)
+
         self._audio_player: AudioPlayer
         self._audio_player = None
 
+        # The server sends audio in whatever rate and channels the device
+        # plays so the client never has to convert it. Without a backend a
+        # PyAudio one is made per session to fit the server's playout delay
+        if output_backend is not None:
+            sample_rate = output_backend.rate
+            channels = output_backend.channels
+
+        assert packet_protocol.supported_audio_format(sample_rate, channels)
+
+        self._sample_rate: int = sample_rate
+        self._channels: int = channels
+        self._output_backend: AudioOutputBackend = output_backend
+
+        # The frame size and playout delay the audio player was made for
+        self._player_stream: tuple = None
+
         self._client_socket: socket.socket
         self._client_socket = None
-        
 
+        # Without a host the first server that has the zone is used
         self._host_ip: str = host_ip
+        self._server_address: tuple = None
+        self._server_info: dict = None
+
+        # Only used by the process supervising the connection, the audio
+        # player and its buffer are kept while the connection is remade
+        self._reconnect_delay: float = self.RECONNECT_MIN_DELAY
+        self._next_connect_time: float = 0.0
+        self._disconnect_time: float = None
+
+        self._reconnects = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._recovery_time = multiprocessing.Value(ctypes.c_float, 0.0)
 
         self._socket_thread: threading.Thread
         self._socket_thread = None
@@ -50,31 +117,99 @@ class AudioClientApplication(multiprocessing.Process):
         self._latency_list: list = []
         self._average_latency = multiprocessing.Value(ctypes.c_float, 0.0)
 
+        # From the process starting to the first frame given to the player
+        self._start_time: float = 0.0
+        self._time_to_first_audio = multiprocessing.Value(ctypes.c_float, 0.0)
+
+        if min_latency is None:
+            min_latency = self._latency_profile.min_latency
+
+        if max_latency is None:
+            max_latency = max(self._latency_profile.max_latency, min_latency)
+
+        self._jitter_buffer: JitterBuffer = JitterBuffer(
+            min_latency, max_latency, self._latency_profile.frame_duration)
+
+        self._clock_sync: ClockSync
+        self._clock_sync = None
+        self._clock_offset = multiprocessing.Value(ctypes.c_int64, 0)
+        self._round_trip_time = multiprocessing.Value(ctypes.c_float, 0.0)
+
+        # The codecs offered to the server in order of preference
+        self._codecs: list = codecs or [audio_codec.PcmCodec.CODEC_NAME]
+        self._zone: str = zone
+        self._decode_time = multiprocessing.Value(ctypes.c_double, 0.0)
+
+        # Only used by the process handling the incoming messages
+        self._expected_sequence: int = None
+        self._stream_codecs: dict = {}
+
+        self._frames_received = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._frames_lost = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._frames_late = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._frames_concealed = multiprocessing.Value(ctypes.c_uint64, 0)
+
+        # Shared with the socket thread and the audio player, served over
+        # HTTP from this process when a metrics port is given
+        if metrics is None:
+            metrics = MetricsRegistry()
+
+        self._metrics: MetricsRegistry = metrics
+        self._metrics_port: int = metrics_port
+
+        self._frames_received_metric = metrics.counter(
+            "client_frames_received_total")
+        self._frames_lost_metric = metrics.counter("client_frames_lost_total")
+        self._frames_late_metric = metrics.counter("client_frames_late_total")
+        self._decode_time_metric = metrics.counter(
+            "client_decode_seconds_total")
+        self._latency_metric = metrics.gauge("client_latency_seconds")
+        self._first_audio_metric = metrics.gauge(
+            "client_time_to_first_audio_seconds")
+        self._reconnect_metric = metrics.counter("client_reconnects_total")
+        self._recovery_metric = metrics.gauge("client_recovery_seconds")
+        self._jitter_metric = metrics.gauge("client_jitter_seconds")
+        self._error_metric = metrics.counter("client_errors_total")
+
         return
 
     def run(self):
-        self._audio_player = AudioPlayer()
-        self._audio_player.start()
+        self._start_time = time.monotonic()
 
-        self._start_socket_thread()
+        metrics_server = None
+        if self._metrics_port is not None:
+            metrics_server = MetricsHttpServer(self._metrics,
+                                               self._metrics_port)
+            metrics_server.start()
 
         while self._client_running.value:
             try:
-                if self._socket_thread.pending_incoming_message():
-                    incoming_message = self._socket_thread.get_incoming_message()
-                    self._handle_incoming_message(incoming_message)
+                if self._audio_player is not None:
+                    self._audio_player.set_speaker_location(
+                        self._client_location.value)
+
+                if not self._connection_alive():
+                    self._supervise_connection()
+                    continue
 
-                self._audio_player.set_speaker_location(self._client_location.value)
-                time.sleep(.001)
+                incoming_message = self._socket_thread.get_incoming_message(
+                    True, self.MESSAGE_TIMEOUT)
+                self._handle_incoming_message(incoming_message)
 
             except queue.Empty:
                 pass
 
             except Exception as unhandled_error:
                 print("Got unhandled error: ", unhandled_error)
+                self._error_metric.inc()
+
+        if self._audio_player is not None:
+            self._audio_player.stop()
 
-        self._audio_player.stop()
         self._close_client_socket()
+
+        if metrics_server is not None:
+            metrics_server.stop()
         return
 
     def stop(self):
@@ -82,10 +217,78 @@ class AudioClientApplication(multiprocessing.Process):
         self.join()
         return
 
+    @property
+    def latency_profile(self) -> latency_profile.LatencyProfile:
+        return self._latency_profile
+
+    @property
+    def time_to_first_audio(self) -> float:
+        return self._time_to_first_audio.value
+
+    @property
+    def reconnects(self) -> int:
+        return self._reconnects.value
+
+    @property
+    def recovery_time(self) -> float:
+        # From losing the server to the next frame handed to the player
+        return self._recovery_time.value
+
     @property
     def average_latency(self) -> float:
         return self._average_latency.value
 
+    @property
+    def jitter(self) -> float:
+        return self._jitter_buffer.jitter
+
+    @property
+    def jitter_buffer_depth(self) -> int:
+        return self._jitter_buffer.target_depth
+
+    @property
+    def jitter_buffer_history(self) -> list:
+        return self._jitter_buffer.depth_history
+
+    @property
+    def clock_offset(self) -> int:
+        return self._clock_offset.value
+
+    @property
+    def round_trip_time(self) -> float:
+        return self._round_trip_time.value
+
+    @property
+    def average_decode_time(self) -> float:
+        return self._decode_time.value
+
+    @property
+    def frames_received(self) -> int:
+        return self._frames_received.value
+
+    @property
+    def frames_lost(self) -> int:
+        return self._frames_lost.value
+
+    @property
+    def frames_late(self) -> int:
+        return self._frames_late.value
+
+    @property
+    def frames_concealed(self) -> int:
+        return self._frames_concealed.value
+
+    @property
+    def loss_rate(self) -> float:
+        frames_expected = self._frames_received.value + self._frames_lost.value
+        if frames_expected == 0:
+            return 0.0
+        return self._frames_lost.value / frames_expected
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self._metrics
+
     @property
     def client_connected(self) -> bool:
         return self._client_connected.value
@@ -94,57 +297,259 @@ class AudioClientApplication(multiprocessing.Process):
         self._client_location.value = location
         return
 
+    def _find_server(self) -> tuple:
+        if self._host_ip is not None:
+            return self._host_ip, constants.AUDIO_CLIENT_PORT
+
+        self._server_info = DiscoveryClient().discover(self._zone,
+                                                       self.DISCOVERY_TIMEOUT)
+        if self._server_info is None:
+            return None
+
+        return DiscoveryClient.server_address(self._server_info)
+
+    def _connection_alive(self) -> bool:
+        return (self._socket_thread is not None and
+                self._socket_thread.thread_running and
+                self._clock_sync.time_since_reply < self.SERVER_TIMEOUT)
+
+    def _supervise_connection(self) -> None:
+        current_time = time.monotonic()
+
+        if self._socket_thread is not None:
+            self._close_client_socket()
+            self._disconnect_time = current_time
+            self._next_connect_time = current_time + self._reconnect_delay
+
+        if current_time < self._next_connect_time:
+            time.sleep(min(self._next_connect_time - current_time,
+                           self.MESSAGE_TIMEOUT))
+            return
+
+        self._start_socket_thread()
+
+        # Every failed attempt waits longer until audio flows again
+        if self._socket_thread is None:
+            self._next_connect_time = time.monotonic() + \
+                self._reconnect_delay
+            self._reconnect_delay = min(
+                self._reconnect_delay * self.RECONNECT_BACKOFF,
+                self.RECONNECT_MAX_DELAY)
+
+        elif self._disconnect_time is not None:
+            self._reconnects.value += 1
+            self._reconnect_metric.inc()
+
+        return
+
     def _start_socket_thread(self) -> None:
         try:
-            client_info = (self._host_ip, constants.AUDIO_CLIENT_PORT)
+            self._server_address = self._find_server()
+            if self._server_address is None:
+                print("Could not find a server for zone: ", self._zone)
+                return
 
             self._client_socket = socket.socket()
-            self._client_socket.connect(client_info)
+            self._client_socket.settimeout(self.CONNECT_TIMEOUT)
+            self._client_socket.connect(self._server_address)
+            self._client_socket.settimeout(None)
 
             self._client_connected.value = True
 
-            self._socket_thread = ClientSocketThread(self._client_socket)
+            handshake = packet_protocol.create_handshake(
+                codecs=self._codecs, zone=self._zone,
+                sample_rate=self._sample_rate, channels=self._channels,
+                latency_profile=self._latency_profile.profile_name)
+            self._clock_sync = ClockSync()
+            self._socket_thread = ClientSocketThread(
+                self._client_socket, handshake=handshake,
+                clock_sync=self._clock_sync, metrics=self._metrics,
+                metric_labels={"server": self._server_address[0]})
             self._socket_thread.start()
 
+            # The stream is joined wherever the server is now, the gap is
+            # neither loss nor jitter
+            self._expected_sequence = None
+            self._jitter_buffer.reset()
+
         except socket.error:
             self._close_client_socket()
 
         return
 
     def _close_client_socket(self) -> None:
-        if self._client_socket is not None:
-            self._client_socket.close()
-
+        # The socket thread shuts the socket down itself before it ends
         if self._socket_thread is not None:
             self._socket_thread.stop()
 
+        if self._client_socket is not None:
+            self._client_socket.close()
+
         self._client_socket = None
         self._socket_thread = None
         self._client_connected.value = False
         return
 
+    def _setup_audio_player(self) -> bool:
+        # Audio from before the server answered the handshake is dropped, the
+        # player is remade if a new session streams in another frame size or
+        # playout delay
+        session = self._socket_thread.session
+        if not packet_protocol.session_negotiated(session):
+            return False
+
+        frame_size = packet_protocol.session_frame_size(session)
+        playout_delay = packet_protocol.session_playout_delay(session)
+
+        if self._audio_player is not None:
+            if self._player_stream == (frame_size, playout_delay):
+                return True
+
+            self._audio_player.stop()
+
+        output_backend = self._output_backend
+        if output_backend is None:
+            output_backend = PyAudioBackend(
+                self._latency_profile.frames_per_buffer_for(
+                    playout_delay, self._sample_rate),
+                self._sample_rate, self._channels)
+
+        self._audio_player = AudioPlayer(
+            self._latency_profile.ring_depth_for(frame_size, playout_delay),
+            output_backend=output_backend, metrics=self._metrics,
+            frame_size=frame_size)
+        self._player_stream = (frame_size, playout_delay)
+        self._audio_player.set_speaker_location(self._client_location.value)
+        self._audio_player.start()
+
+        self._jitter_buffer.set_frame_duration(frame_size /
+                                               constants.AUDIO_RATE)
+        self._expected_sequence = None
+        return True
+
+    def _record_audio_started(self) -> None:
+        if self._time_to_first_audio.value == 0.0:
+            self._time_to_first_audio.value = time.monotonic() - \
+                self._start_time
+            self._first_audio_metric.set(self._time_to_first_audio.value)
+
+        if self._disconnect_time is not None:
+            self._recovery_time.value = time.monotonic() - \
+                self._disconnect_time
+            self._recovery_metric.set(self._recovery_time.value)
+            self._disconnect_time = None
+            self._reconnect_delay = self.RECONNECT_MIN_DELAY
+        return
+
+    def _get_presentation_time(self, incoming_message: dict) -> int:
+        server_time = incoming_message.get(constants.PRESENTATION_TIME_STR)
+
+        if not server_time or not self._clock_sync.synchronized:
+            return 0
+
+        return self._clock_sync.to_local_time(server_time)
+
+    def _check_sequence(self, incoming_message: dict, frame_byte_size: int,
+                        presentation_time: int) -> bool:
+        sequence = incoming_message.get(constants.SEQUENCE_STR)
+        if sequence is None:
+            return True
+
+        self._frames_received.value += 1
+        self._frames_received_metric.inc()
+
+        presentation_late = bool(presentation_time) and \
+            presentation_time < time.monotonic_ns()
+
+        if self._expected_sequence is None:
+            self._expected_sequence = sequence
+
+        sequence_mask = packet_protocol.SEQUENCE_MASK
+        sequence_delta = (sequence - self._expected_sequence) & sequence_mask
+
+        # A frame from before the expected one is too late to play, unless
+        # it is so far back that the server has restarted the stream
+        reordered_late = sequence_delta > sequence_mask // 2 and \
+            sequence_mask + 1 - sequence_delta <= self.MAX_REORDER
+
+        # A frame both behind and past its presentation time is counted once
+        if presentation_late or reordered_late:
+            self._frames_late.value += 1
+            self._frames_late_metric.inc()
+
+        if reordered_late:
+            return False
+
+        if 0 < sequence_delta <= sequence_mask // 2:
+            self._frames_lost.value += sequence_delta
+            self._frames_lost_metric.inc(sequence_delta)
+            self._conceal_frames(sequence_delta, frame_byte_size,
+                                 presentation_time)
+
+        self._expected_sequence = (sequence + 1) & sequence_mask
+        return True
+
+    def _conceal_frames(self, frames_lost: int, frame_byte_size: int,
+                        presentation_time: int) -> None:
+        conceal_count = min(frames_lost, self.MAX_CONCEAL_FRAMES)
+
+        if presentation_time:
+            sample_bytes = self._channels * constants.AUDIO_SEG_WIDTH
+            frame_duration = frame_byte_size // sample_bytes * \
+                1000000000 // self._sample_rate
+            presentation_time -= conceal_count * frame_duration
+
+        self._audio_player.conceal_audio_data(conceal_count, presentation_time)
+        return
+
     def _handle_incoming_message(self, incoming_message: dict) -> None:
         assert isinstance(incoming_message, dict)
-        message_time = datetime.datetime.now()
+        message_time = incoming_message.get(constants.RECEIVE_TIME_STR,
+                                            time.monotonic_ns())
         audio_payload = incoming_message.get(constants.AUDIO_PAYLOAD_STR)
-        audio_timestamp_str = incoming_message.get(constants.TIMESTAMP_STR)
-
-        if audio_payload is not None:
-            byte_payload = bytes(audio_payload)
-            incoming_message.update({constants.AUDIO_PAYLOAD_STR: byte_payload})
-            self._audio_player.add_audio_request(incoming_message)
-
-        if audio_timestamp_str is not None:
-            audio_timestamp = datetime.datetime.strptime(audio_timestamp_str,
-                                                         "%Y-%m-%d %H:%M:%S.%f")
-            audio_time_delta = (message_time - audio_timestamp).total_seconds()
+        audio_timestamp = incoming_message.get(constants.TIMESTAMP_STR)
+
+        if audio_payload is not None and self._setup_audio_player():
+            self._jitter_buffer.add_arrival(message_time, audio_timestamp)
+            self._audio_player.set_target_depth(
+                self._jitter_buffer.target_depth)
+
+            codec = audio_codec.get_stream_codec(
+                self._stream_codecs,
+                incoming_message.get(constants.CODEC_STR,
+                                     audio_codec.PcmCodec.CODEC_NAME),
+                self._channels)
+            decode_start = time.perf_counter()
+            audio_data = codec.decode(bytes(audio_payload))
+            self._decode_time.value = codec.average_decode_time
+            self._decode_time_metric.inc(time.perf_counter() - decode_start)
+            self._jitter_metric.set(self._jitter_buffer.jitter)
+
+            presentation_time = self._get_presentation_time(incoming_message)
+
+            if self._check_sequence(incoming_message, len(audio_data),
+                                    presentation_time):
+                self._audio_player.add_audio_data(audio_data,
+                                                  presentation_time)
+                self._record_audio_started()
+
+            self._frames_concealed.value = self._audio_player.frames_concealed
+
+        if self._clock_sync.synchronized:
+            self._clock_offset.value = self._clock_sync.offset_ns
+            self._round_trip_time.value = self._clock_sync.round_trip_ns / 1e9
+
+        if isinstance(audio_timestamp, int) and self._clock_sync.synchronized:
+            server_time = self._clock_sync.to_server_time(message_time)
+            audio_time_delta = (server_time - audio_timestamp) / 1e9
 
             self._latency_list.append(audio_time_delta)
 
             if len(self._latency_list) > 1000:
-                self._latency_list = self._latency_list[:500]
+                self._latency_list = self._latency_list[-500:]
 
             self._average_latency.value = sum(self._latency_list)/len(self._latency_list)
+            self._latency_metric.set(audio_time_delta)
         return
 
 
@@ -154,8 +559,8 @@ if __name__ == '__main__':
         ip = sys.argv[1]
         print("Connecting to server at: ", ip)
     except Exception as invalid_ip:
-        print("Using default IP")
-        ip = "localhost"
+        print("Looking for a server")
+        ip = None
 
     test_client = AudioClientApplication(ip)
     test_client.start()
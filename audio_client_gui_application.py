@@ -8,7 +8,6 @@ import datetime
 from tkinter import ttk
 from tkinter import Tk, Label
 
-from network_audio_classes import util_func
 from network_audio_classes import constants
 from audio_client_application import AudioClientApplication
 
@@ -23,8 +22,8 @@ class AudioGUIClientApplication:
         self._window.protocol("WM_DELETE_WINDOW", self._close_application)
         self._window.resizable(1, 1)
 
-        current_ip = util_func.get_own_ip()
-        self._audio_client = AudioClientApplication(current_ip)
+        # The client finds the server itself
+        self._audio_client = AudioClientApplication()
         self._audio_client.start()
 
         self._latency_list = []
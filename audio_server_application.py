@@ -10,20 +10,20 @@ import time
 import queue
 import ctypes
 import socket
-import datetime
 import threading
 import multiprocessing
 from threading import Thread
 
-# The brought in libraries via pip
-import pydub
-
 # The local libraries
 from network_audio_classes import constants
-from network_audio_classes import util_func
+from network_audio_classes import latency_profile
+from network_audio_classes.frame_pacer import FramePacer
+from network_audio_classes.audio_file_source import AudioFileSource
 from network_audio_classes.audio_player_process import AudioPlayer
 from network_audio_classes.client_socket_thread import ClientSocketThread
 from network_audio_classes.server_network_process import ServerNetworkProcess
+from network_audio_classes.metrics_registry import MetricsRegistry
+from network_audio_classes.metrics_registry import MetricsHttpServer
 
 
 # *************************Audio Server Application************************** #
@@ -31,61 +31,80 @@ from network_audio_classes.server_network_process import ServerNetworkProcess
 class AudioServerApplication(multiprocessing.Process):
     PROCESS_NAME: str = "Audio Server Application"
 
-    def __init__(self):
+    def __init__(self, audio_location: str = "",
+                 zone_locations: dict = None,
+                 metrics: MetricsRegistry = None,
+                 metrics_port: int = None,
+                 latency_profile_name: str = constants.BALANCED_PROFILE):
         multiprocessing.Process.__init__(self, name=self.PROCESS_NAME)
 
-        self._audio_location: str = ""
+        # Sets the frame size and playout delay of every zone
+        self._latency_profile: latency_profile.LatencyProfile = \
+            latency_profile.get_latency_profile(latency_profile_name)
 
-        self._audio_file: pydub.AudioSegment
-        self._audio_file = None
+        # The file streamed to each zone, the single audio location is the
+        # default zone's
+        self._zone_locations: dict = dict(zone_locations or {})
 
-        self._audio_data: bytes = bytes([])
+        if audio_location or not self._zone_locations:
+            self._zone_locations[constants.DEFAULT_ZONE] = audio_location
 
-        self._prev_audio_index = 0
-        self._current_audio_index = constants.AUDIO_BYTE_FRAME_SIZE
+        self._frame_pacers: dict = {
+            zone: FramePacer(self._latency_profile.frame_size)
+            for zone in self._zone_locations}
 
         self._network_process: ServerNetworkProcess
         self._network_process = None
 
         self._server_running = multiprocessing.Value(ctypes.c_bool, True)
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+
+        self._metrics: MetricsRegistry = metrics
+        self._metrics_port: int = metrics_port
+
+        self._late_frame_metrics: dict = {
+            zone: metrics.gauge("server_pacer_late_frames", {"zone": zone})
+            for zone in self._zone_locations}
         return
 
     def run(self):
-        self._network_process = ServerNetworkProcess()
+        metrics_server = None
+        if self._metrics_port is not None:
+            metrics_server = MetricsHttpServer(self._metrics,
+                                               self._metrics_port)
+            metrics_server.start()
+
+        self._network_process = ServerNetworkProcess(
+            playout_delay=self._latency_profile.playout_delay,
+            zones=list(self._zone_locations), metrics=self._metrics,
+            frame_size=self._latency_profile.frame_size)
         self._network_process.start()
 
-        first_client_connected = False
+        while (self._server_running.value and
+               self._network_process.clients_connected == 0):
+            time.sleep(constants.AUDIO_SLEEP_TIME)
 
-        while self._server_running.value:
-            if not first_client_connected:
-                if self._network_process.clients_connected > 0:
-                    first_client_connected = True
-                else:
-                    pass
-
-            else:
-                try:
-                    current_time = datetime.datetime.now()
-
-                    audio_data_chunk = self._audio_data[self._prev_audio_index:
-                                                        self._current_audio_index]
-                    audio_message = {constants.AUDIO_PAYLOAD_STR:
-                                     list(audio_data_chunk)}
-                    audio_message.update({constants.TIMESTAMP_STR:
-                                          current_time.strftime("%Y-%m-%d %H:%M:%S.%f")})
-                    self._network_process.add_audio_packet(audio_message, True)
-
-                    self._prev_audio_index = self._current_audio_index
-                    self._current_audio_index += constants.AUDIO_BYTE_FRAME_SIZE
-
-                except queue.Full:
-                    pass
+        stream_thread_list = [
+            threading.Thread(target=self._stream_zone, args=(zone, location))
+            for zone, location in self._zone_locations.items()]
+
+        for stream_thread in stream_thread_list:
+            stream_thread.start()
 
+        for stream_thread in stream_thread_list:
+            stream_thread.join()
+
+        while self._server_running.value:
             time.sleep(constants.AUDIO_SLEEP_TIME)
 
         print("Stopping audio server application")
         self._network_process.stop()
         print("Server network process stopped")
+
+        if metrics_server is not None:
+            metrics_server.stop()
         return
 
     def stop(self):
@@ -93,3 +112,56 @@ class AudioServerApplication(multiprocessing.Process):
         self._server_running.value = False
         self.join()
         return
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self._metrics
+
+    @property
+    def latency_profile(self) -> latency_profile.LatencyProfile:
+        return self._latency_profile
+
+    @property
+    def zones(self) -> list:
+        return list(self._zone_locations)
+
+    @property
+    def frame_pacer(self) -> FramePacer:
+        return self._frame_pacers.get(constants.DEFAULT_ZONE,
+                                      next(iter(self._frame_pacers.values())))
+
+    def zone_pacer(self, zone: str) -> FramePacer:
+        return self._frame_pacers[zone]
+
+    def _stream_zone(self, zone: str, audio_location: str) -> None:
+        if not audio_location:
+            return
+
+        audio_source = AudioFileSource(
+            audio_location,
+            frame_byte_size=self._latency_profile.frame_byte_size)
+        audio_frames = audio_source.frames()
+
+        frame_pacer = self._frame_pacers[zone]
+        frame_pacer.start()
+
+        while self._server_running.value:
+            audio_data_chunk = next(audio_frames, None)
+
+            if audio_data_chunk is None:
+                break
+
+            frame_pacer.wait()
+            self._late_frame_metrics[zone].set(frame_pacer.late_frames)
+
+            try:
+                audio_message = {constants.AUDIO_PAYLOAD_STR: audio_data_chunk,
+                                 constants.TIMESTAMP_STR: time.monotonic_ns()}
+                self._network_process.add_audio_packet(audio_message, True,
+                                                       zone)
+
+            except queue.Full:
+                pass
+
+        audio_source.stop()
+        return
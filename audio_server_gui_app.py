@@ -3,14 +3,17 @@
 # Created on: July 3rd, 2019
 
 import os
+import time
 import datetime
 import tkinter
 from tkinter import ttk
 from tkinter import Tk, Label, Button, Entry, Listbox
 
-import pydub
-
 from network_audio_classes import constants
+from network_audio_classes import latency_profile
+from network_audio_classes.pcm_cache import PcmCache
+from network_audio_classes.frame_pacer import FramePacer
+from network_audio_classes.audio_file_source import AudioFileSource
 from network_audio_classes.server_network_process import ServerNetworkProcess
 
 
@@ -18,12 +21,16 @@ class AudioGUIServerApplication:
     WINDOW_NAME = "Audio Server Application"
 
     AUDIO_FOLDER_NAME = "audio"
+    CACHE_FOLDER_NAME = os.path.join(AUDIO_FOLDER_NAME, PcmCache.CACHE_FOLDER)
     SUPPORTED_FORMATS = [".wav", ".mp3"]
 
     PROGRESS_BAR_SIZE = 200
     LOOP_FREQUENCY = 22
 
-    def __init__(self):
+    def __init__(self, latency_profile_name=constants.BALANCED_PROFILE):
+
+        self._latency_profile = latency_profile.get_latency_profile(
+            latency_profile_name)
 
         self._window = Tk()
 
@@ -31,16 +38,26 @@ class AudioGUIServerApplication:
         self._window.protocol("WM_DELETE_WINDOW", self._close_application)
         self._window.resizable(1, 1)
 
-        self._audio_server = ServerNetworkProcess()
+        self._audio_server = ServerNetworkProcess(
+            playout_delay=self._latency_profile.playout_delay,
+            frame_size=self._latency_profile.frame_size)
         self._audio_server.start()
 
         self._audio_file_list = []
         self._selected_audio_file = ""
 
+        self._pcm_cache = PcmCache(
+            self.CACHE_FOLDER_NAME,
+            frame_byte_size=self._latency_profile.frame_byte_size)
+
         self._audio_playing = False
-        self._audio_data = []
-        self._prev_audio_index = 0
-        self._current_audio_index = constants.AUDIO_BYTE_FRAME_SIZE
+        self._audio_source = None
+        self._cached_track = None
+        self._audio_frames = iter([])
+        self._frame_count = 0
+        self._frames_sent = 0
+
+        self._frame_pacer = FramePacer(self._latency_profile.frame_size)
 
         self._build_window_space()
 
@@ -53,6 +70,7 @@ class AudioGUIServerApplication:
         return
 
     def _close_application(self):
+        self._stop_audio_source()
         self._audio_server.stop()
         self._window.quit()
         return
@@ -110,14 +128,20 @@ class AudioGUIServerApplication:
             self._selected_audio_file = selected_file
             self._start_playing_audio_file()
 
-        if self._audio_playing:
+        # Every frame that is due goes out now, the pacer keeps the stream on
+        # the audio clock however late Tk runs this loop
+        while self._audio_playing and self._frame_pacer.next_frame():
             self._update_audio_playback()
 
         loop_end_time = datetime.datetime.now()
         loop_run_time = (loop_end_time - loop_start_time).total_seconds()
         loop_run_time_ms = int(loop_run_time * 1000)
 
-        if loop_run_time_ms >= self.LOOP_FREQUENCY:
+        if self._audio_playing:
+            next_frame_time = int(self._frame_pacer.time_until_next() * 1000)
+            next_loop_time = min(max(next_frame_time, 1), self.LOOP_FREQUENCY)
+            self._window.after(next_loop_time, self._update_loop)
+        elif loop_run_time_ms >= self.LOOP_FREQUENCY:
             self._window.after(1, self._update_loop)
         else:
             next_loop_time = self.LOOP_FREQUENCY - loop_run_time_ms
@@ -125,37 +149,70 @@ class AudioGUIServerApplication:
         return
 
     def _start_playing_audio_file(self):
+        self._stop_audio_source()
+
         actual_audio_file = os.path.join(self.AUDIO_FOLDER_NAME,
                                          self._selected_audio_file)
-        file_data = pydub.AudioSegment.from_file(actual_audio_file)
-        self._audio_data = file_data.raw_data
+        # Tracks already decoded once play straight from the cache, new
+        # ones are written to it while they stream
+        self._cached_track = self._pcm_cache.open_track(actual_audio_file)
 
+        if self._cached_track is not None:
+            self._audio_frames = self._cached_track.frames()
+            self._frame_count = self._cached_track.frame_count
+
+        else:
+            cache_writer = self._pcm_cache.create_writer(actual_audio_file)
+            self._audio_source = AudioFileSource(
+                actual_audio_file,
+                frame_byte_size=self._latency_profile.frame_byte_size,
+                cache_writer=cache_writer)
+            self._audio_frames = self._audio_source.frames()
+            self._frame_count = self._audio_source.frame_count
+
+        self._frames_sent = 0
+        self._frame_pacer.start()
         self._audio_playing = True
-        self._prev_audio_index = 0
-        self._current_audio_index = constants.AUDIO_BYTE_FRAME_SIZE
+        return
+
+    def _stop_audio_source(self):
+        if self._audio_source is not None:
+            self._audio_source.stop()
+
+        if self._cached_track is not None:
+            self._cached_track.close()
+
+        self._audio_source = None
+        self._cached_track = None
+        self._audio_frames = iter([])
+        self._audio_playing = False
         return
 
     def _update_audio_playback(self):
-        audio_time = datetime.datetime.now()
-        audio_segment = self._audio_data[self._prev_audio_index:
-                                         self._current_audio_index]
-        audio_message = {constants.AUDIO_PAYLOAD_STR: list(audio_segment),
-                         constants.TIMESTAMP_STR: str(audio_time)}
+        audio_segment = next(self._audio_frames, None)
 
-        self._audio_server.add_audio_packet(audio_message, wait=False)
+        if audio_segment is None:
+            self._stop_audio_source()
+            return
 
-        self._prev_audio_index = self._current_audio_index
-        self._current_audio_index += constants.AUDIO_BYTE_FRAME_SIZE
+        audio_message = {constants.AUDIO_PAYLOAD_STR: audio_segment,
+                         constants.TIMESTAMP_STR: time.monotonic_ns()}
 
-        if self._current_audio_index > len(self._audio_data):
-            self._audio_playing = False
-        else:
-            self._update_progress_bar()
+        self._audio_server.add_audio_packet(audio_message, wait=False)
+        self._frames_sent += 1
 
+        self._update_progress_bar()
         return
 
     def _update_progress_bar(self):
-        song_progress = self._current_audio_index/len(self._audio_data)
+        # A file source only knows its length once its thread has opened it
+        if self._audio_source is not None:
+            self._frame_count = self._audio_source.frame_count
+
+        if self._frame_count == 0:
+            return
+
+        song_progress = min(self._frames_sent / self._frame_count, 1.0)
         progress_percent = song_progress * 100
         self._song_progress_bar["value"] = progress_percent
         return
@@ -0,0 +1,348 @@
+# async_server_network_process.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# A network process with the same interface as the ServerNetworkProcess that
+# serves every client from a single asyncio event loop instead of a group of
+# threads per client
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import queue
+import asyncio
+import threading
+import collections
+
+# The local libraries
+from network_audio_classes import constants
+from network_audio_classes import packet_protocol
+from network_audio_classes.clock_sync import ClockSync
+from network_audio_classes.stream_decoder import StreamDecoder
+from network_audio_classes.metrics_registry import MetricsRegistry
+from network_audio_classes.client_socket_thread import ClientSocketThread
+from network_audio_classes.server_network_process import ServerNetworkProcess
+
+# **************************Async Client Connection************************** #
+
+
+class AsyncClientConnection:
+    READ_SIZE: int = 64 * 1024
+
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 outgoing_queue_depth: int,
+                 slow_client_policy: str,
+                 metrics: MetricsRegistry = None,
+                 metric_labels: dict = None,
+                 stream_info: dict = None):
+        self._reader: asyncio.StreamReader = reader
+        self._writer: asyncio.StreamWriter = writer
+
+        self._outgoing_message_queue = asyncio.Queue(outgoing_queue_depth)
+
+        # Control messages are never dropped and go out ahead of any queued
+        # audio, the semaphore counts what is waiting in both queues
+        self._control_message_queue: collections.deque = collections.deque()
+        self._pending_messages: asyncio.Semaphore = asyncio.Semaphore(0)
+
+        self._slow_client_policy: str = slow_client_policy
+        self._dropped_messages: int = 0
+        self._stream_decoder: StreamDecoder = StreamDecoder()
+
+        self._session: dict = {constants.BINARY_AUDIO_STR: False}
+        self._stream_info: dict = stream_info
+        self._status_message: dict = dict(ClientSocketThread.RESPONSE_MSG)
+
+        metric_labels = dict(metric_labels or {})
+        self._bytes_sent_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_bytes_sent_total", metric_labels)
+        self._bytes_received_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_bytes_received_total", metric_labels)
+        self._dropped_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_messages_dropped_total", metric_labels)
+        self._queue_depth_metric = MetricsRegistry.optional_gauge(
+            metrics, "socket_queue_depth", metric_labels)
+        return
+
+    @property
+    def session(self) -> dict:
+        return self._session
+
+    @property
+    def dropped_messages(self) -> int:
+        return self._dropped_messages
+
+    def add_outgoing_message(self, outgoing_message) -> None:
+        if not packet_protocol.is_outgoing_audio(outgoing_message):
+            self._control_message_queue.append(outgoing_message)
+            self._pending_messages.release()
+
+        elif not self._outgoing_message_queue.full():
+            self._outgoing_message_queue.put_nowait(outgoing_message)
+            self._pending_messages.release()
+
+        else:
+            self._dropped_messages += 1
+            self._dropped_metric.inc()
+
+            if self._slow_client_policy == constants.SLOW_CLIENT_DROP_OLDEST:
+                self._outgoing_message_queue.get_nowait()
+                self._outgoing_message_queue.put_nowait(outgoing_message)
+
+            elif self._slow_client_policy == constants.SLOW_CLIENT_DISCONNECT:
+                self.disconnect()
+
+        return
+
+    async def receive_messages(self, incoming_message_queue) -> None:
+        while True:
+            incoming_data = await self._reader.read(self.READ_SIZE)
+
+            if not incoming_data:
+                break
+
+            receive_time_ns = time.monotonic_ns()
+            self._bytes_received_metric.inc(len(incoming_data))
+            self._stream_decoder.feed(incoming_data)
+
+            for incoming_message in self._stream_decoder.messages():
+                self._handle_incoming_message(incoming_message,
+                                              incoming_message_queue,
+                                              receive_time_ns)
+
+        return
+
+    async def send_messages(self) -> None:
+        while True:
+            await self._pending_messages.acquire()
+
+            if self._control_message_queue:
+                outgoing_message = self._control_message_queue.popleft()
+            else:
+                outgoing_message = self._outgoing_message_queue.get_nowait()
+            self._queue_depth_metric.set(self._outgoing_message_queue.qsize())
+            self._send(outgoing_message)
+            await self._writer.drain()
+
+    def close(self) -> None:
+        self._writer.close()
+
+        # The metrics are labelled with this connection's address
+        for connection_metric in (self._bytes_sent_metric,
+                                  self._bytes_received_metric,
+                                  self._dropped_metric,
+                                  self._queue_depth_metric):
+            connection_metric.release()
+        return
+
+    def disconnect(self) -> None:
+        self._writer.transport.abort()
+        return
+
+    def _send(self, outgoing_message) -> None:
+        if isinstance(outgoing_message, bytes):
+            serialized_data = outgoing_message
+
+        else:
+            ClockSync.stamp_reply(outgoing_message)
+            wire_format = packet_protocol.session_wire_format(self._session)
+            serialized_data = packet_protocol.encode_message(outgoing_message,
+                                                             wire_format)
+
+        self._writer.write(serialized_data)
+        self._bytes_sent_metric.inc(len(serialized_data))
+        return
+
+    def _handle_incoming_message(self, incoming_message: dict,
+                                 incoming_message_queue,
+                                 receive_time_ns: int) -> None:
+        if ClockSync.is_reply(incoming_message):
+            pass
+
+        elif incoming_message.get(ClientSocketThread.STATUS_KEY):
+            status_reply = ClockSync.create_reply(incoming_message,
+                                                  self._status_message,
+                                                  receive_time_ns)
+            self.add_outgoing_message(status_reply)
+
+        elif constants.HANDSHAKE_STR in incoming_message:
+            handshake = incoming_message[constants.HANDSHAKE_STR]
+            self._session.update(packet_protocol.negotiate_handshake(
+                handshake, self._stream_info))
+            self.add_outgoing_message({constants.HANDSHAKE_ACK_STR:
+                                       dict(self._session)})
+
+        else:
+            try:
+                incoming_message_queue.put_nowait(incoming_message)
+
+            except queue.Full:
+                pass
+
+        return
+
+# **********************Async Server Network Process************************* #
+
+
+class AsyncServerNetworkProcess(ServerNetworkProcess):
+    PROCESS_NAME: str = "Async Server Network Process"
+
+    STOP_CHECK_TIME: float = .5
+    CLOSE_CHECK_TIME: float = .01
+
+    def __init__(self,
+                 slow_client_policy: str = constants.SLOW_CLIENT_DROP_OLDEST,
+                 client_queue_depth: int =
+                 ServerNetworkProcess.CLIENT_QUEUE_DEPTH,
+                 playout_delay: float = ServerNetworkProcess.PLAYOUT_DELAY,
+                 zones: list = None,
+                 metrics: MetricsRegistry = None,
+                 frame_size: int = constants.AUDIO_FRAME_SIZE,
+                 discovery: bool = True):
+        ServerNetworkProcess.__init__(self, slow_client_policy,
+                                      client_queue_depth, playout_delay,
+                                      zones, metrics, frame_size, discovery)
+
+        self._client_connection_list: list = []
+        return
+
+    def run(self):
+        try:
+            asyncio.run(self._serve_clients())
+
+        except Exception as serve_err:
+            print("Got an error running the async server: ", serve_err)
+            self._record_error("serve")
+
+        self._clear_queues()
+        return
+
+    async def _serve_clients(self) -> None:
+        event_loop = asyncio.get_running_loop()
+
+        self._server_ip = self.SERVER_BIND_ADDRESS
+        server = await asyncio.start_server(self._handle_client,
+                                            self._server_ip or None,
+                                            constants.AUDIO_CLIENT_PORT,
+                                            backlog=self.SOCKET_BACKLOG)
+        self._start_discovery_responder()
+
+        packet_thread_list = [
+            threading.Thread(target=self._receive_packets,
+                             args=(event_loop, zone))
+            for zone in self._zones]
+
+        for packet_thread in packet_thread_list:
+            packet_thread.start()
+
+        while self._server_running.value:
+            await asyncio.sleep(self.STOP_CHECK_TIME)
+
+        self._stop_discovery_responder()
+
+        server.close()
+        await server.wait_closed()
+
+        for client_connection in list(self._client_connection_list):
+            client_connection.disconnect()
+
+        while self._client_connection_list:
+            await asyncio.sleep(self.CLOSE_CHECK_TIME)
+
+        for packet_thread in packet_thread_list:
+            await event_loop.run_in_executor(None, packet_thread.join)
+        return
+
+    def _receive_packets(self, event_loop: asyncio.AbstractEventLoop,
+                         zone: str) -> None:
+        outgoing_message_queue = self._outgoing_message_queues[zone]
+
+        while self._server_running.value:
+            try:
+                outgoing_message = outgoing_message_queue.get(
+                    True, self.GET_TIME)
+                self._record_queue_depth(zone)
+
+                # Converted and encoded on this thread so the event loop only
+                # hands the finished bytes to the clients
+                wire_format_list = [
+                    packet_protocol.session_wire_format(
+                        client_connection.session)
+                    for client_connection in self._zone_connections(zone)]
+                encoded_messages = self._encode_once(outgoing_message,
+                                                     wire_format_list, zone)
+
+                event_loop.call_soon_threadsafe(self._fan_out_message,
+                                                encoded_messages, zone)
+
+            except queue.Empty:
+                pass
+
+            except Exception as packet_err:
+                print("Got an unhandled error receiving packets: ",
+                      packet_err)
+                self._record_error("receive_packets")
+
+        return
+
+    def _zone_connections(self, zone: str) -> list:
+        return [client_connection
+                for client_connection in list(self._client_connection_list)
+                if packet_protocol.session_zone(client_connection.session) ==
+                zone]
+
+    def _fan_out_message(self, encoded_messages: dict, zone: str) -> None:
+        for client_connection in self._zone_connections(zone):
+            wire_format = packet_protocol.session_wire_format(
+                client_connection.session)
+
+            # A client that joined or negotiated after the frame was encoded
+            # picks the stream up from the next one
+            if wire_format not in encoded_messages:
+                continue
+
+            dropped_messages = client_connection.dropped_messages
+            client_connection.add_outgoing_message(
+                encoded_messages[wire_format])
+
+            if client_connection.dropped_messages != dropped_messages:
+                self._record_drop(zone)
+        return
+
+    async def _handle_client(self,
+                             reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+        client_address = writer.get_extra_info("peername")
+        client_connection = AsyncClientConnection(
+            reader, writer, self._client_queue_depth, self._slow_client_policy,
+            self._metrics, {"client": "%s:%d" % client_address[:2]},
+            self._stream_info)
+        self._client_connection_list.append(client_connection)
+        self._update_clients_connected(1)
+
+        send_task = asyncio.ensure_future(client_connection.send_messages())
+        receive_task = asyncio.ensure_future(
+            client_connection.receive_messages(self._incoming_message_queue))
+
+        try:
+            finished_tasks, pending_tasks = await asyncio.wait(
+                [send_task, receive_task], return_when=asyncio.FIRST_COMPLETED)
+
+            for finished_task in finished_tasks:
+                if isinstance(finished_task.exception(), ValueError):
+                    print("Async client sent an invalid message: ",
+                          finished_task.exception())
+                    self._record_error("invalid_message")
+
+        finally:
+            send_task.cancel()
+            receive_task.cancel()
+
+            self._client_connection_list.remove(client_connection)
+            self._update_clients_connected(-1)
+            client_connection.close()
+
+        return
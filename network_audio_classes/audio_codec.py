@@ -0,0 +1,262 @@
+# audio_codec.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# The codecs that can be used for the audio payloads between the server and
+# its clients. Every codec keeps track of how long it spends per frame so the
+# bandwidth saved can be weighed against the CPU it costs
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import zlib
+import struct
+
+# The imports brought in via pip
+import numpy
+
+# The local libraries
+from network_audio_classes import constants
+
+# The optional libraries, the codecs that need them are skipped without them
+try:
+    import audioop
+except ImportError:
+    audioop = None
+
+# ****************************Audio Codec Classes**************************** #
+
+
+class AudioCodec:
+    CODEC_NAME: str = ""
+    CODEC_ID: int = 0
+
+    # A codec that carries state from one frame to the next can only encode
+    # a single stream, so it is never shared
+    STATEFUL: bool = False
+
+    def __init__(self, channels: int = constants.AUDIO_CHANNELS):
+        self._channels: int = channels
+
+        self._frames_encoded: int = 0
+        self._encode_time_ns: int = 0
+        self._frames_decoded: int = 0
+        self._decode_time_ns: int = 0
+        return
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    @property
+    def average_encode_time(self) -> float:
+        if self._frames_encoded == 0:
+            return 0.0
+        return self._encode_time_ns / self._frames_encoded / 1e9
+
+    @property
+    def average_decode_time(self) -> float:
+        if self._frames_decoded == 0:
+            return 0.0
+        return self._decode_time_ns / self._frames_decoded / 1e9
+
+    def encode(self, audio_data: bytes) -> bytes:
+        start_time = time.perf_counter_ns()
+        encoded_data = self._encode(audio_data)
+        self._encode_time_ns += time.perf_counter_ns() - start_time
+        self._frames_encoded += 1
+        return encoded_data
+
+    def decode(self, encoded_data: bytes) -> bytes:
+        start_time = time.perf_counter_ns()
+        audio_data = self._decode(encoded_data)
+        self._decode_time_ns += time.perf_counter_ns() - start_time
+        self._frames_decoded += 1
+        return audio_data
+
+    def _encode(self, audio_data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def _decode(self, encoded_data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class PcmCodec(AudioCodec):
+    CODEC_NAME: str = "PCM"
+    CODEC_ID: int = 0
+
+    def _encode(self, audio_data: bytes) -> bytes:
+        return bytes(audio_data)
+
+    def _decode(self, encoded_data: bytes) -> bytes:
+        return bytes(encoded_data)
+
+
+class DeltaZlibCodec(AudioCodec):
+    CODEC_NAME: str = "Delta_Zlib"
+    CODEC_ID: int = 1
+
+    COMPRESSION_LEVEL: int = 1
+
+    RAW_MODE: bytes = b'\x00'
+    DELTA_MODE: bytes = b'\x01'
+
+    # Every channel after the first is stored as its difference to the first,
+    # then every sample as its difference to the one before. The zigzagged
+    # residuals are split into byte planes so zlib sees the mostly zero high
+    # bytes as long runs. Frames that would grow are sent raw
+    def _encode(self, audio_data: bytes) -> bytes:
+        compressed_data = self._compress(audio_data)
+
+        if len(compressed_data) < len(audio_data):
+            return self.DELTA_MODE + compressed_data
+
+        return self.RAW_MODE + bytes(audio_data)
+
+    def _decode(self, encoded_data: bytes) -> bytes:
+        if encoded_data[:1] == self.RAW_MODE:
+            return bytes(encoded_data[1:])
+
+        return self._decompress(encoded_data[1:])
+
+    def _compress(self, audio_data: bytes) -> bytes:
+        samples = numpy.frombuffer(audio_data, numpy.int16)
+        samples = samples.reshape(-1, self._channels).astype(numpy.int32)
+
+        samples[:, 1:] -= samples[:, :1]
+        residuals = numpy.diff(samples, axis=0, prepend=0)
+
+        zigzag = ((residuals << 1) ^ (residuals >> 31)).astype(numpy.uint32)
+        byte_planes = zigzag.view(numpy.uint8).reshape(-1, 4).T
+
+        return zlib.compress(byte_planes.tobytes(), self.COMPRESSION_LEVEL)
+
+    def _decompress(self, encoded_data: bytes) -> bytes:
+        byte_planes = numpy.frombuffer(zlib.decompress(encoded_data),
+                                       numpy.uint8)
+        zigzag = byte_planes.reshape(4, -1).T.copy().view(numpy.uint32)
+
+        residuals = (zigzag >> 1).astype(numpy.int32) ^ \
+            -(zigzag & 1).astype(numpy.int32)
+        samples = numpy.cumsum(residuals.reshape(-1, self._channels), axis=0,
+                               dtype=numpy.int32)
+        samples[:, 1:] += samples[:, :1]
+
+        return samples.astype(numpy.int16).tobytes()
+
+
+class AdpcmCodec(AudioCodec):
+    CODEC_NAME: str = "ADPCM"
+    CODEC_ID: int = 2
+
+    STATEFUL: bool = True
+
+    # The predictor and step index each channel starts the frame with, this
+    # keeps frames independent so a lost one does not upset the next
+    STATE_STRUCT: struct.Struct = struct.Struct("!hB")
+
+    def __init__(self, channels: int = constants.AUDIO_CHANNELS):
+        AudioCodec.__init__(self, channels)
+        self._encode_states: list = [None] * channels
+        return
+
+    @classmethod
+    def available(cls) -> bool:
+        return audioop is not None
+
+    def _encode(self, audio_data: bytes) -> bytes:
+        samples = numpy.frombuffer(audio_data, numpy.int16)
+        samples = samples.reshape(-1, self._channels)
+
+        encoded_data = bytearray()
+        for channel in range(self._channels):
+            channel_state = self._encode_states[channel] or (0, 0)
+            encoded_data += self.STATE_STRUCT.pack(*channel_state)
+
+            channel_data = samples[:, channel].tobytes()
+            encoded_channel, self._encode_states[channel] = audioop.lin2adpcm(
+                channel_data, constants.AUDIO_SEG_WIDTH,
+                self._encode_states[channel])
+            encoded_data += encoded_channel
+
+        return bytes(encoded_data)
+
+    def _decode(self, encoded_data: bytes) -> bytes:
+        state_size = self.STATE_STRUCT.size
+        channel_size = len(encoded_data) // self._channels
+
+        channel_list = []
+        for channel in range(self._channels):
+            channel_start = channel * channel_size
+            channel_state = self.STATE_STRUCT.unpack_from(encoded_data,
+                                                          channel_start)
+            channel_data = encoded_data[channel_start + state_size:
+                                        channel_start + channel_size]
+
+            decoded_channel, _ = audioop.adpcm2lin(
+                channel_data, constants.AUDIO_SEG_WIDTH, channel_state)
+            channel_list.append(numpy.frombuffer(decoded_channel,
+                                                 numpy.int16))
+
+        return numpy.stack(channel_list, axis=1).tobytes()
+
+# ****************************Codec Registry********************************* #
+
+
+CODEC_CLASSES: list = [PcmCodec, DeltaZlibCodec, AdpcmCodec]
+
+_codec_instances: dict = {}
+
+
+def available_codecs() -> list:
+    return [codec_class.CODEC_NAME for codec_class in CODEC_CLASSES
+            if codec_class.available()]
+
+
+def create_codec(codec_name: str,
+                 channels: int = constants.AUDIO_CHANNELS) -> AudioCodec:
+    for codec_class in CODEC_CLASSES:
+        if codec_class.CODEC_NAME == codec_name and codec_class.available():
+            return codec_class(channels)
+    raise ValueError("Unsupported audio codec: %s" % codec_name)
+
+
+def get_codec(codec_name: str,
+              channels: int = constants.AUDIO_CHANNELS) -> AudioCodec:
+    # Only codecs without state between frames are shared by the process,
+    # a stateful one is created fresh for every call
+    codec_key = (codec_name, channels)
+
+    if codec_key in _codec_instances:
+        return _codec_instances[codec_key]
+
+    codec = create_codec(codec_name, channels)
+    if not codec.STATEFUL:
+        _codec_instances[codec_key] = codec
+    return codec
+
+
+def get_stream_codec(stream_codecs: dict, codec_name: str,
+                     channels: int = constants.AUDIO_CHANNELS) -> AudioCodec:
+    # The codecs a single stream keeps for itself so no state is shared
+    codec_key = (codec_name, channels)
+
+    if codec_key not in stream_codecs:
+        stream_codecs[codec_key] = create_codec(codec_name, channels)
+
+    return stream_codecs[codec_key]
+
+
+def get_codec_id(codec_name: str) -> int:
+    for codec_class in CODEC_CLASSES:
+        if codec_class.CODEC_NAME == codec_name:
+            return codec_class.CODEC_ID
+    raise ValueError("Unsupported audio codec: %s" % codec_name)
+
+
+def get_codec_name(codec_id: int) -> str:
+    for codec_class in CODEC_CLASSES:
+        if codec_class.CODEC_ID == codec_id:
+            return codec_class.CODEC_NAME
+    raise ValueError("Unknown audio codec id: %d" % codec_id)
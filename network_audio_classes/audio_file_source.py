@@ -0,0 +1,222 @@
+# audio_file_source.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Streams an audio file as fixed size PCM frames. WAV files that already match
+# the output format are read straight through the wave module and anything
+# else is decoded by an ffmpeg pipe. A thread opens the file and keeps a few
+# frames decoded ahead so memory stays constant no matter how long the track
+# is, and whoever creates the source never waits on ffmpeg. The decoded frames
+# can also be written out to the PCM cache as they go
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import math
+import wave
+import queue
+import threading
+import subprocess
+
+# The imports brought in via pip
+import pydub
+import pydub.utils
+
+# The local libraries
+from network_audio_classes import constants
+from network_audio_classes.pcm_cache import PcmCacheWriter
+
+# ***************************Audio File Source******************************* #
+
+
+class AudioFileSource(threading.Thread):
+    THREAD_NAME: str = "Audio File Source"
+
+    READ_AHEAD: int = 8
+    QUEUE_TIMEOUT: float = .5
+
+    END_OF_FILE = None
+
+    def __init__(self,
+                 file_path: str,
+                 read_ahead: int = READ_AHEAD,
+                 frame_byte_size: int = constants.AUDIO_BYTE_FRAME_SIZE,
+                 cache_writer: PcmCacheWriter = None):
+        threading.Thread.__init__(self, name=self.THREAD_NAME, daemon=True)
+
+        self._file_path: str = file_path
+        self._frame_byte_size: int = frame_byte_size
+
+        self._frame_queue: queue.Queue = queue.Queue(read_ahead)
+
+        self._source_running: bool = True
+        self._source_started: bool = False
+        self._frames_read: int = 0
+
+        self._wave_file: wave.Wave_read
+        self._wave_file = None
+
+        self._ffmpeg_process: subprocess.Popen
+        self._ffmpeg_process = None
+
+        self._cache_writer: PcmCacheWriter = cache_writer
+
+        # Found once the thread has opened the file, 0 until then
+        self._frame_count: int = 0
+        return
+
+    def run(self):
+        try:
+            self._frame_count = self._open_source()
+
+            while self._source_running:
+                audio_frame = self._read_frame()
+
+                if audio_frame is None:
+                    if self._cache_writer is not None:
+                        self._cache_writer.commit()
+                    break
+
+                if self._cache_writer is not None:
+                    self._cache_writer.write(audio_frame)
+
+                self._put_frame(audio_frame)
+
+        except OSError as open_err:
+            print("Could not open the audio file: ", open_err)
+
+        finally:
+            self._put_frame(self.END_OF_FILE)
+            self._close_source()
+
+        return
+
+    def stop(self) -> None:
+        self._source_running = False
+
+        # Free up a blocked put so the thread notices it should stop
+        try:
+            while True:
+                self._frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        if self.is_alive():
+            self.join()
+        else:
+            self._close_source()
+        return
+
+    @property
+    def frame_count(self) -> int:
+        return self._frame_count
+
+    @property
+    def frames_read(self) -> int:
+        return self._frames_read
+
+    def frames(self):
+        # The file is only read through once, iterating again after that
+        # just ends
+        if not self._source_started and self._source_running:
+            self._source_started = True
+            self.start()
+
+        while True:
+            try:
+                audio_frame = self._frame_queue.get(True, self.QUEUE_TIMEOUT)
+            except queue.Empty:
+                if not self.is_alive():
+                    return
+                continue
+
+            if audio_frame is self.END_OF_FILE:
+                return
+
+            self._frames_read += 1
+            yield audio_frame
+
+    def _open_source(self) -> int:
+        try:
+            self._wave_file = wave.open(self._file_path, "rb")
+
+            if self._wave_matches_output(self._wave_file):
+                frame_bytes = self._wave_file.getnframes() * \
+                    constants.AUDIO_BYTE_PER_FRAME
+                return math.ceil(frame_bytes / self._frame_byte_size)
+
+            self._wave_file.close()
+            self._wave_file = None
+
+        except (wave.Error, EOFError):
+            self._wave_file = None
+
+        self._ffmpeg_process = subprocess.Popen(
+            [pydub.AudioSegment.converter, "-v", "error",
+             "-i", self._file_path,
+             "-f", "s16le",
+             "-ac", str(constants.AUDIO_CHANNELS),
+             "-ar", str(constants.AUDIO_RATE), "-"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL)
+
+        return self._probe_frame_count()
+
+    @staticmethod
+    def _wave_matches_output(wave_file: wave.Wave_read) -> bool:
+        return (wave_file.getnchannels() == constants.AUDIO_CHANNELS and
+                wave_file.getsampwidth() == constants.AUDIO_SEG_WIDTH and
+                wave_file.getframerate() == constants.AUDIO_RATE)
+
+    def _probe_frame_count(self) -> int:
+        # Only an estimate for the progress bar, 0 when it can not be found
+        try:
+            duration = float(pydub.utils.mediainfo(self._file_path)["duration"])
+        except (KeyError, ValueError, OSError):
+            return 0
+
+        frame_duration = self._frame_byte_size / \
+            constants.AUDIO_BYTE_PER_FRAME / constants.AUDIO_RATE
+        return int(duration / frame_duration)
+
+    def _read_frame(self) -> bytes:
+        if self._wave_file is not None:
+            audio_frame = self._wave_file.readframes(
+                self._frame_byte_size // constants.AUDIO_BYTE_PER_FRAME)
+        else:
+            audio_frame = self._ffmpeg_process.stdout.read(
+                self._frame_byte_size)
+
+        if not audio_frame:
+            return None
+
+        # The last frame of the file is padded out with silence
+        if len(audio_frame) < self._frame_byte_size:
+            audio_frame += bytes(self._frame_byte_size - len(audio_frame))
+
+        return audio_frame
+
+    def _put_frame(self, audio_frame: bytes) -> None:
+        while self._source_running:
+            try:
+                self._frame_queue.put(audio_frame, True, self.QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+        return
+
+    def _close_source(self) -> None:
+        # A track that was not read to the end is not worth keeping
+        if self._cache_writer is not None:
+            self._cache_writer.discard()
+
+        if self._wave_file is not None:
+            self._wave_file.close()
+            self._wave_file = None
+
+        if self._ffmpeg_process is not None:
+            self._ffmpeg_process.kill()
+            self._ffmpeg_process.stdout.close()
+            self._ffmpeg_process.wait()
+            self._ffmpeg_process = None
+        return
@@ -0,0 +1,155 @@
+# audio_gain_stage.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Applies the speaker location as a left/right gain to 16 bit stereo frames
+# with NumPy, mono frames pass through at unity. The gains follow the same
+# curve as pydub's pan, are only recomputed when the location changes and ramp
+# over one frame when they do. The same ramp fades audio in and out around
+# lost or missing frames
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import math
+
+# The imports brought in via pip
+import numpy
+
+# The local libraries
+from network_audio_classes import constants
+
+# ****************************Audio Gain Stage******************************* #
+
+
+class AudioGainStage:
+    SAMPLE_TYPE = numpy.int16
+    SAMPLE_MIN: int = -32768
+    SAMPLE_MAX: int = 32767
+
+    MAX_BOOST_RATIO: float = 2.0
+
+    def __init__(self,
+                 location: float = 0.0,
+                 frame_size: int = constants.AUDIO_FRAME_SIZE,
+                 channels: int = constants.AUDIO_CHANNELS):
+        self._frame_size: int = frame_size
+        self._channels: int = channels
+
+        self._location: float = location
+        self._gains = self._channel_gains(location)
+        self._previous_gains = self._gains
+        self._ramp_pending: bool = False
+
+        ramp = numpy.linspace(0.0, 1.0, frame_size, endpoint=False,
+                              dtype=numpy.float32)
+        self._ramp = ramp.reshape(frame_size, 1)
+        self._fade_out_ramp = (1.0 - ramp).reshape(frame_size, 1)
+
+        # How far into the ramp a fade in is, it can take several calls
+        self._fade_offset: int = 0
+
+        self._scratch = numpy.zeros((frame_size, channels), numpy.float32)
+        return
+
+    @property
+    def gains(self) -> numpy.ndarray:
+        return self._gains
+
+    @classmethod
+    def location_gains(cls, location: float) -> numpy.ndarray:
+        max_boost_db = 20 * math.log10(cls.MAX_BOOST_RATIO)
+        boost_db = abs(location) * max_boost_db
+        boost_factor = 10 ** (boost_db / 20)
+
+        boost_gain = 10 ** (boost_db / 2 / 20)
+        reduce_gain = max(cls.MAX_BOOST_RATIO - boost_factor, 0.0)
+
+        if location < 0:
+            gains = [boost_gain, reduce_gain]
+        else:
+            gains = [reduce_gain, boost_gain]
+
+        return numpy.array(gains, numpy.float32)
+
+    def _channel_gains(self, location: float) -> numpy.ndarray:
+        # Only a stereo frame has a left and right to pan between
+        if self._channels != 2:
+            return numpy.ones(self._channels, numpy.float32)
+        return self.location_gains(location)
+
+    def set_location(self, location: float) -> None:
+        if location != self._location:
+            self._location = location
+            self._previous_gains = self._gains
+            self._gains = self._channel_gains(location)
+            self._ramp_pending = True
+        return
+
+    def process(self, audio_data: bytes, output_data: memoryview) -> None:
+        input_frame = numpy.frombuffer(audio_data, self.SAMPLE_TYPE)
+        input_frame = input_frame.reshape(-1, self._channels)
+
+        output_frame = numpy.frombuffer(output_data, self.SAMPLE_TYPE)
+        output_frame = output_frame.reshape(-1, self._channels)
+
+        sample_count = min(len(input_frame), len(output_frame))
+        scratch = self._scratch[:sample_count]
+
+        if self._ramp_pending:
+            gain_delta = self._gains - self._previous_gains
+            numpy.multiply(self._ramp[:sample_count], gain_delta, out=scratch)
+            scratch += self._previous_gains
+            scratch *= input_frame[:sample_count]
+            self._ramp_pending = False
+
+        else:
+            numpy.multiply(input_frame[:sample_count], self._gains,
+                           out=scratch)
+
+        numpy.clip(scratch, self.SAMPLE_MIN, self.SAMPLE_MAX, out=scratch)
+        numpy.copyto(output_frame[:sample_count], scratch, casting="unsafe")
+        output_frame[sample_count:] = 0
+        return
+
+    def reset_fade(self) -> None:
+        self._fade_offset = 0
+        return
+
+    def fade(self, audio_data: bytes, output_data: memoryview,
+             fade_in: bool = False) -> bool:
+        # A fade in carries on from where the last call left it and is done
+        # once a whole frame has ramped up. A fade out always ramps down to
+        # silence within the call, stepping through the ramp faster when the
+        # call is shorter than a frame
+        input_frame = numpy.frombuffer(audio_data, self.SAMPLE_TYPE)
+        input_frame = input_frame.reshape(-1, self._channels)
+
+        output_frame = numpy.frombuffer(output_data, self.SAMPLE_TYPE)
+        output_frame = output_frame.reshape(-1, self._channels)
+
+        sample_count = min(len(input_frame), len(output_frame))
+
+        if fade_in:
+            ramp = self._ramp[self._fade_offset:
+                              self._fade_offset + sample_count]
+            self._fade_offset += len(ramp)
+        else:
+            ramp_step = -(-self._frame_size // max(sample_count, 1))
+            ramp = self._fade_out_ramp[:sample_count * ramp_step:ramp_step]
+            self._fade_offset = 0
+
+        ramp_count = len(ramp)
+        scratch = self._scratch[:ramp_count]
+
+        numpy.multiply(input_frame[:ramp_count], ramp, out=scratch)
+        numpy.copyto(output_frame[:ramp_count], scratch, casting="unsafe")
+
+        if fade_in:
+            output_frame[ramp_count:sample_count] = \
+                input_frame[ramp_count:sample_count]
+            output_frame[sample_count:] = 0
+        else:
+            output_frame[ramp_count:] = 0
+
+        return self._fade_offset >= self._frame_size
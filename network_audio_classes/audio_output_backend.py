@@ -0,0 +1,264 @@
+# audio_output_backend.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# The outputs the AudioPlayer can play through. Every backend drives the same
+# PyAudio style callback, PyAudio plays it on a sound card while the null and
+# WAV sinks run it from their own real time clock so the player can run on
+# machines without any audio device
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import wave
+import ctypes
+import threading
+import multiprocessing
+
+# The local libraries
+from network_audio_classes import constants
+
+# ****************************Backend Constants****************************** #
+
+# The same values PyAudio uses for its callback return flags
+OUTPUT_CONTINUE: int = 0
+OUTPUT_COMPLETE: int = 1
+
+# ***************************Audio Output Backend**************************** #
+
+
+class AudioOutputBackend:
+
+    def __init__(self,
+                 frames_per_buffer: int = constants.AUDIO_FRAME_SIZE,
+                 rate: int = constants.AUDIO_RATE,
+                 channels: int = constants.AUDIO_CHANNELS):
+        self._frames_per_buffer: int = frames_per_buffer
+        self._rate: int = rate
+        self._channels: int = channels
+
+        self._stream_callback = None
+        return
+
+    @property
+    def frames_per_buffer(self) -> int:
+        return self._frames_per_buffer
+
+    @property
+    def rate(self) -> int:
+        return self._rate
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    def open(self, stream_callback) -> None:
+        self._stream_callback = stream_callback
+        return
+
+    def start(self) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        return
+
+
+class PyAudioBackend(AudioOutputBackend):
+
+    def __init__(self,
+                 frames_per_buffer: int = constants.AUDIO_FRAME_SIZE,
+                 rate: int = constants.AUDIO_RATE,
+                 channels: int = constants.AUDIO_CHANNELS):
+        AudioOutputBackend.__init__(self, frames_per_buffer, rate, channels)
+
+        self._audio_player = None
+        self._audio_streamer = None
+        return
+
+    def open(self, stream_callback) -> None:
+        # Only imported here so the other backends work without PyAudio
+        import pyaudio
+
+        AudioOutputBackend.open(self, stream_callback)
+
+        self._audio_player = pyaudio.PyAudio()
+        self._audio_streamer = self._audio_player.open(
+            format=constants.AUDIO_FORMAT,
+            channels=self._channels,
+            rate=self._rate,
+            frames_per_buffer=self._frames_per_buffer,
+            output=True,
+            stream_callback=stream_callback)
+        return
+
+    def start(self) -> None:
+        self._audio_streamer.start_stream()
+        return
+
+    def stop(self) -> None:
+        self._audio_streamer.stop_stream()
+        return
+
+    def close(self) -> None:
+        self._audio_streamer.close()
+        self._audio_player.terminate()
+        return
+
+
+class NullOutputBackend(AudioOutputBackend):
+    THREAD_NAME: str = "Null Output Backend"
+
+    def __init__(self,
+                 frames_per_buffer: int = constants.AUDIO_FRAME_SIZE,
+                 rate: int = constants.AUDIO_RATE,
+                 channels: int = constants.AUDIO_CHANNELS):
+        AudioOutputBackend.__init__(self, frames_per_buffer, rate, channels)
+
+        self._stream_running: bool = False
+        self._stream_thread: threading.Thread = None
+
+        # Written by the player process and read from wherever the backend
+        # was created
+        self._callback_count = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._late_callbacks = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._callback_time = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._max_callback_time = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._start_delay = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._max_start_delay = multiprocessing.Value(ctypes.c_uint64, 0)
+        return
+
+    @property
+    def callback_count(self) -> int:
+        return self._callback_count.value
+
+    @property
+    def late_callbacks(self) -> int:
+        return self._late_callbacks.value
+
+    @property
+    def average_callback_time(self) -> float:
+        callback_count = self._callback_count.value
+        if callback_count == 0:
+            return 0.0
+        return self._callback_time.value / callback_count / 1e9
+
+    @property
+    def max_callback_time(self) -> float:
+        return self._max_callback_time.value / 1e9
+
+    @property
+    def average_start_delay(self) -> float:
+        callback_count = self._callback_count.value
+        if callback_count == 0:
+            return 0.0
+        return self._start_delay.value / callback_count / 1e9
+
+    @property
+    def max_start_delay(self) -> float:
+        return self._max_start_delay.value / 1e9
+
+    def start(self) -> None:
+        self._stream_running = True
+        self._stream_thread = threading.Thread(target=self._run_callbacks,
+                                               name=self.THREAD_NAME)
+        self._stream_thread.start()
+        return
+
+    def stop(self) -> None:
+        self._stream_running = False
+
+        if self._stream_thread is not None:
+            self._stream_thread.join()
+            self._stream_thread = None
+        return
+
+    def _run_callbacks(self) -> None:
+        buffer_count = 0
+        start_time = time.monotonic_ns()
+
+        # Callback N is due at start + N buffers, the same cadence a sound
+        # card pulling frames_per_buffer samples at a time would have
+        while self._stream_running:
+            deadline = start_time + (buffer_count * self._frames_per_buffer *
+                                     1000000000 // self._rate)
+            current_time = time.monotonic_ns()
+
+            if current_time < deadline:
+                time.sleep((deadline - current_time) / 1e9)
+                continue
+
+            current_seconds = current_time / 1e9
+            time_info = {"current_time": current_seconds,
+                         "output_buffer_dac_time": current_seconds}
+
+            audio_data, callback_flag = self._stream_callback(
+                None, self._frames_per_buffer, time_info, 0)
+            callback_end = time.monotonic_ns()
+
+            self._write_output(audio_data)
+            self._record_timing(current_time - deadline,
+                                callback_end - current_time)
+            buffer_count += 1
+
+            if callback_flag != OUTPUT_CONTINUE:
+                break
+
+        return
+
+    def _write_output(self, audio_data: bytes) -> None:
+        return
+
+    def _record_timing(self, start_delay: int, callback_time: int) -> None:
+        buffer_time = self._frames_per_buffer * 1000000000 // self._rate
+
+        self._callback_count.value += 1
+        self._callback_time.value += callback_time
+        self._start_delay.value += start_delay
+
+        self._max_callback_time.value = max(self._max_callback_time.value,
+                                            callback_time)
+        self._max_start_delay.value = max(self._max_start_delay.value,
+                                          start_delay)
+
+        # A real device would have run dry waiting on this callback
+        if start_delay + callback_time > buffer_time:
+            self._late_callbacks.value += 1
+        return
+
+
+class WavFileBackend(NullOutputBackend):
+    THREAD_NAME: str = "WAV File Backend"
+
+    def __init__(self,
+                 file_path: str,
+                 frames_per_buffer: int = constants.AUDIO_FRAME_SIZE,
+                 rate: int = constants.AUDIO_RATE,
+                 channels: int = constants.AUDIO_CHANNELS):
+        NullOutputBackend.__init__(self, frames_per_buffer, rate, channels)
+
+        self._file_path: str = file_path
+        self._wave_file: wave.Wave_write = None
+        return
+
+    def open(self, stream_callback) -> None:
+        NullOutputBackend.open(self, stream_callback)
+
+        self._wave_file = wave.open(self._file_path, "wb")
+        self._wave_file.setnchannels(self._channels)
+        self._wave_file.setsampwidth(constants.AUDIO_SEG_WIDTH)
+        self._wave_file.setframerate(self._rate)
+        return
+
+    def close(self) -> None:
+        if self._wave_file is not None:
+            self._wave_file.close()
+            self._wave_file = None
+        return
+
+    def _write_output(self, audio_data: bytes) -> None:
+        self._wave_file.writeframes(audio_data)
+        return
@@ -7,16 +7,20 @@
 # **********************************Import*********************************** #
 
 # The global native python imports
+import math
 import time
 import ctypes
 import multiprocessing
 
-# The imports brought in via pip
-import pydub
-import pyaudio
-
 # The local libraries
 from network_audio_classes import constants
+from network_audio_classes import audio_output_backend
+from network_audio_classes.audio_output_backend import AudioOutputBackend
+from network_audio_classes.audio_gain_stage import AudioGainStage
+from network_audio_classes.shared_audio_ring import SharedAudioRing
+from network_audio_classes.metrics_registry import MetricsRegistry
+from network_audio_classes.drift_resampler import DriftEstimator
+from network_audio_classes.drift_resampler import FractionalResampler
 
 
 # ***********************Audio Player Thread Class************************** #
@@ -32,69 +36,165 @@ class AudioPlayer(multiprocessing.Process):
     LOCATION_MIN: float = -1.0
     LOCATION_MAX: float = 1.0
 
-    AUDIO_ARRAY_LEN: int = 10
-    AUDIO_ARRAY_SIZE: int = AUDIO_ARRAY_LEN * constants.AUDIO_BYTE_FRAME_SIZE
+    AUDIO_ARRAY_LEN: int = SharedAudioRing.RING_DEPTH
 
     AUDIO_STEP_BUFFER: int = 5
-
-    def __init__(self):
+    WAIT_TIMEOUT: float = .5
+
+    SYNC_TOLERANCE_NS: int = 1000000
+    SYNC_SMOOTHING_TIME: float = .1
+    SYNC_JUMP_NS: int = 10000000
+    MAX_OUTPUT_LATENCY: float = 1.0
+
+    def __init__(self, ring_depth: int = AUDIO_ARRAY_LEN,
+                 output_backend: AudioOutputBackend = None,
+                 metrics: MetricsRegistry = None,
+                 drift_correction: bool = True,
+                 frame_size: int = constants.AUDIO_FRAME_SIZE):
         multiprocessing.Process.__init__(self, name=self.PROCESS_NAME)
 
-        self._speaker_location = multiprocessing.Value(ctypes.c_float, 0.0)
+        if output_backend is None:
+            output_backend = audio_output_backend.PyAudioBackend()
+
+        self._output_backend: AudioOutputBackend = output_backend
+
+        # Frames arrive already in the device's rate and channels, resampled
+        # frames hold about as long as a source frame give or take a sample
+        self._rate: int = output_backend.rate
+        self._channels: int = output_backend.channels
+        self._sample_bytes: int = self._channels * constants.AUDIO_SEG_WIDTH
+        self._frame_size: int = frame_size
+        self._frame_samples: float = frame_size * self._rate / \
+            constants.AUDIO_RATE
 
-        self._audio_data_index = multiprocessing.Value(ctypes.c_ubyte, 0)
-        self._playback_data_index = multiprocessing.Value(ctypes.c_ubyte, 0)
-        self._audio_data_array = multiprocessing.Array(ctypes.c_ubyte,
-                                                       self.AUDIO_ARRAY_SIZE)
+        slot_samples = math.ceil(self._frame_samples)
 
-        self._audio_data_requested = multiprocessing.Value(ctypes.c_ulong, 0)
-        self._audio_data_played = multiprocessing.Value(ctypes.c_ulong, 0)
+        self._speaker_location = multiprocessing.Value(ctypes.c_float, 0.0)
 
-        self._audio_player_running = multiprocessing.Value(ctypes.c_bool, True)
+        self._audio_ring: SharedAudioRing = SharedAudioRing(
+            ring_depth, slot_samples * self._sample_bytes)
+        self._gain_stage: AudioGainStage = AudioGainStage(
+            frame_size=slot_samples, channels=self._channels)
+
+        self._stop_event = multiprocessing.Event()
+
+        # A target depth of zero leaves the buffering to the producer
+        self._target_depth = multiprocessing.Value(ctypes.c_uint32, 0)
+
+        # Only touched by the audio callback inside the player process
+        self._playback_offset: int = 0
+        self._prebuffering: bool = True
+        self._concealing: bool = False
+        self._last_output: bytes = bytes()
+        self._smoothed_sync_error: float = None
+        self._callback_gain_stage: AudioGainStage = AudioGainStage(
+            frame_size=slot_samples, channels=self._channels)
+
+        # Plays the buffer a little faster or slower than the device rate so
+        # the level holds while the two clocks drift apart
+        self._drift_correction: bool = drift_correction
+        self._drift_estimator: DriftEstimator = DriftEstimator(self._rate)
+        self._resampler: FractionalResampler = FractionalResampler(
+            self._channels)
+
+        self._sync_error = multiprocessing.Value(ctypes.c_int64, 0)
+        self._frames_skipped = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._frames_concealed = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._underrun_count = multiprocessing.Value(ctypes.c_uint64, 0)
 
         self._debug_mode = multiprocessing.Value(ctypes.c_bool, False)
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+
+        self._metrics: MetricsRegistry = metrics
+
+        self._frames_added_metric = metrics.counter("player_frames_added_total")
+        self._frames_dropped_metric = metrics.counter(
+            "player_frames_dropped_total")
+        self._frames_skipped_metric = metrics.counter(
+            "player_frames_skipped_total")
+        self._frames_concealed_metric = metrics.counter(
+            "player_frames_concealed_total")
+        self._underrun_metric = metrics.counter("player_underruns_total")
+        self._frames_buffered_metric = metrics.gauge("player_frames_buffered")
+        self._callback_count_metric = metrics.counter("player_callbacks_total")
+        self._callback_time_metric = metrics.counter(
+            "player_callback_seconds_total")
+        self._max_callback_metric = metrics.gauge(
+            "player_callback_max_seconds")
+        self._drift_metric = metrics.gauge("player_drift_ppm")
+        self._ratio_metric = metrics.gauge("player_resample_ratio")
         return
 
     def run(self):
-        audio_frame_size = constants.AUDIO_FRAME_SIZE
+        self._output_backend.open(self._audio_callback)
+        self._output_backend.start()
 
-        audio_player: pyaudio.PyAudio = pyaudio.PyAudio()
+        self._stop_event.wait()
 
-        audio_streamer = audio_player.open(format=constants.AUDIO_FORMAT,
-                                           channels=constants.AUDIO_CHANNELS,
-                                           rate=constants.AUDIO_RATE,
-                                           frames_per_buffer=audio_frame_size,
-                                           output=True,
-                                           stream_callback=self._audio_callback)
+        self._output_backend.stop()
+        self._output_backend.close()
+        return
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
 
-        audio_streamer.start_stream()
+        self._audio_ring.close()
+        self._audio_ring.unlink()
+        return
 
-        while self._audio_player_running.value:
-            time.sleep(.001)
+    def add_audio_data(self, audio_data: bytes,
+                       presentation_time: int = 0) -> None:
+        if self._audio_ring.full:
+            self._frames_dropped_metric.inc()
+            return
 
-        audio_streamer.stop_stream()
-        audio_streamer.close()
+        self._frames_added_metric.inc()
+        self._gain_stage.set_location(self._speaker_location.value)
+        self._gain_stage.process(audio_data, self._audio_ring.write_slot())
 
-        audio_player.terminate()
+        self._audio_ring.commit_write(
+            presentation_time, min(len(audio_data),
+                                   self._audio_ring.frame_byte_size))
         return
 
-    def stop(self):
-        self._audio_player_running.value = False
-        self.join()
-        return
+    def conceal_audio_data(self, frame_count: int,
+                           presentation_time: int = 0) -> None:
+        # Stands in for lost frames with the last frame faded out followed
+        # by silence, the frames after the gap fade back in on their own
+        frame_byte_size = round(self._frame_samples) * self._sample_bytes
 
-    def add_audio_data(self, audio_data: bytes) -> None:
-        audio_seg: pydub.AudioSegment = self._create_audio_segment(audio_data)
+        previous_frame = None
+        if self._audio_ring.write_count > 0:
+            previous_slot = self._audio_ring.write_count - 1
+            previous_frame = bytes(self._audio_ring.get_slot(previous_slot))
+            frame_byte_size = len(previous_frame)
 
-        # noinspection PyUnresolvedReferences
-        panned_audio_segment = audio_seg.pan(self._speaker_location.value)
-        panned_audio_data: bytes = panned_audio_segment.raw_data
+        frame_duration = frame_byte_size // self._sample_bytes * \
+            1000000000 // self._rate
 
-        self._set_audio_data(self._audio_data_index.value, panned_audio_data)
+        for frame_index in range(frame_count):
+            if self._audio_ring.full:
+                break
 
-        self._increase_data_index(self._audio_data_index)
+            write_slot = self._audio_ring.write_slot()
+
+            if frame_index == 0 and previous_frame is not None:
+                self._gain_stage.fade(previous_frame, write_slot)
+            else:
+                write_slot[:frame_byte_size] = bytes(frame_byte_size)
+
+            frame_time = presentation_time + frame_index * frame_duration \
+                if presentation_time else 0
+            self._audio_ring.commit_write(frame_time, frame_byte_size)
+
+            # The player's callback adds to it as well
+            with self._frames_concealed.get_lock():
+                self._frames_concealed.value += 1
+            self._frames_concealed_metric.inc()
 
-        self._audio_data_requested.value += 1
         return
 
     def set_speaker_location(self, location: float) -> None:
@@ -109,9 +209,17 @@ class AudioPlayer(multiprocessing.Process):
 
         return
 
+    def set_target_depth(self, target_depth: int) -> None:
+        assert isinstance(target_depth, int)
+        self._target_depth.value = min(max(target_depth, 0), self.ring_depth)
+        return
+
     def wait_for_audio_player(self) -> None:
-        while self.audio_data_delta >= self.AUDIO_STEP_BUFFER:
-            time.sleep(.001)
+        step_buffer = min(self.AUDIO_STEP_BUFFER, self.ring_depth)
+        while not self._audio_ring.wait_for_space(step_buffer,
+                                                  self.WAIT_TIMEOUT):
+            if self._stop_event.is_set():
+                break
         return
 
     def enable_debug_mode(self) -> None:
@@ -124,75 +232,317 @@ class AudioPlayer(multiprocessing.Process):
 
     @property
     def audio_data_requested(self) -> int:
-        return self._audio_data_requested.value
+        return self._audio_ring.write_count
 
     @property
     def audio_data_played(self) -> int:
-        return self._audio_data_played.value
+        return self._audio_ring.read_count
 
     @property
     def audio_data_delta(self) -> int:
-        data_delta: int = 0
-        if self.audio_data_played > self.audio_data_requested:
-            # This is the case of audio data overflowed
-            data_played_max_value: int = 2 ** 64 - 1
-            data_delta = data_played_max_value - self.audio_data_played
-            data_delta -= self.audio_data_requested
-        else:
-            data_delta = self.audio_data_requested - self.audio_data_played
-        return data_delta
+        return self._audio_ring.frames_buffered
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self._metrics
+
+    @property
+    def output_backend(self) -> AudioOutputBackend:
+        return self._output_backend
+
+    @property
+    def frame_size(self) -> int:
+        return self._frame_size
+
+    @property
+    def rate(self) -> int:
+        return self._rate
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    @property
+    def ring_depth(self) -> int:
+        return self._audio_ring.ring_depth
+
+    @property
+    def target_depth(self) -> int:
+        return self._target_depth.value
+
+    @property
+    def sync_error(self) -> float:
+        return self._sync_error.value / 1e9
+
+    @property
+    def drift_correction(self) -> bool:
+        return self._drift_correction
+
+    @property
+    def drift_ppm(self) -> float:
+        return self._drift_estimator.skew * 1e6
+
+    @property
+    def resample_ratio(self) -> float:
+        return self._drift_estimator.ratio
+
+    @property
+    def frames_skipped(self) -> int:
+        return self._frames_skipped.value
+
+    @property
+    def frames_concealed(self) -> int:
+        return self._frames_concealed.value
+
+    @property
+    def underrun_count(self) -> int:
+        return self._underrun_count.value
 
     @property
     def debug_mode(self) -> bool:
         return self._debug_mode.value
 
-    @staticmethod
-    def _create_audio_segment(data: bytes = bytes()) -> pydub.AudioSegment:
-        audio_seg = pydub.AudioSegment(data=data,
-                                       sample_width=constants.AUDIO_SEG_WIDTH,
-                                       frame_rate=constants.AUDIO_RATE,
-                                       channels=constants.AUDIO_CHANNELS)
-        return audio_seg
-
-    @staticmethod
-    def _get_start_stop_points(index: int) -> (int, int):
-        array_start_point = index * constants.AUDIO_BYTE_FRAME_SIZE
-        array_end_point = array_start_point + constants.AUDIO_BYTE_FRAME_SIZE
-        return array_start_point, array_end_point
-
-    def _get_audio_data(self, index: int) -> bytes:
-        array_start_point, array_end_point = self._get_start_stop_points(index)
-        audio_data = self._audio_data_array[array_start_point: array_end_point]
-        return bytes(audio_data)
+    def _get_output_time(self, time_info) -> int:
+        try:
+            output_latency = (time_info["output_buffer_dac_time"] -
+                              time_info["current_time"])
+
+        except (TypeError, KeyError):
+            output_latency = 0.0
+
+        if not 0.0 <= output_latency < self.MAX_OUTPUT_LATENCY:
+            output_latency = 0.0
+
+        return time.monotonic_ns() + int(output_latency * 1e9)
+
+    def _get_playback_time(self) -> int:
+        presentation_time = self._audio_ring.head_presentation_time
+        if presentation_time == 0:
+            return 0
+
+        sample_offset = self._playback_offset // self._sample_bytes
+
+        if self._drift_correction:
+            sample_offset -= self._resampler.pending_samples
+
+        return presentation_time + int(sample_offset * 1000000000 //
+                                       self._rate)
+
+    def _skip_samples(self, sample_count: int) -> None:
+        skip_bytes = sample_count * self._sample_bytes
+
+        while skip_bytes > 0 and self._audio_ring.frames_buffered > 0:
+            frame_bytes_left = len(self._audio_ring.head_slot()) - \
+                self._playback_offset
+
+            if skip_bytes >= frame_bytes_left:
+                skip_bytes -= frame_bytes_left
+                self._playback_offset = 0
+                self._audio_ring.advance()
+                self._frames_skipped.value += 1
+                self._frames_skipped_metric.inc()
+
+            else:
+                self._playback_offset += skip_bytes
+                skip_bytes = 0
+
+        return
+
+    def _read_samples(self, output_data: bytearray,
+                      output_index: int = 0) -> None:
+        while (output_index < len(output_data) and
+               self._audio_ring.frames_buffered > 0):
+            head_slot = self._audio_ring.head_slot()
+            copy_len = min(len(output_data) - output_index,
+                           len(head_slot) - self._playback_offset)
+
+            output_data[output_index:output_index + copy_len] = \
+                head_slot[self._playback_offset:
+                          self._playback_offset + copy_len]
+
+            output_index += copy_len
+            self._playback_offset += copy_len
+
+            if self._playback_offset == len(head_slot):
+                self._playback_offset = 0
+                self._audio_ring.advance()
 
-    def _set_audio_data(self, index: int, audio_data: bytes) -> None:
-        array_start_point, array_end_point = self._get_start_stop_points(index)
-        self._audio_data_array[array_start_point: array_end_point] = audio_data
         return
 
-    def _increase_data_index(self, data_index: multiprocessing.Value) -> None:
-        if (data_index.value + 1) == self.AUDIO_ARRAY_LEN:
-            data_index.value = 0
+    def _read_resampled(self, frame_count: int, level_error: float) -> bytes:
+        ratio = self._drift_estimator.update(level_error, frame_count)
+
+        input_count = self._resampler.input_needed(frame_count, ratio)
+        input_data = bytearray(input_count * self._sample_bytes)
+        self._read_samples(input_data)
+
+        return self._resampler.process(input_data, frame_count, ratio)
+
+    def _read_synchronized(self, frame_count: int, output_time: int) -> bytes:
+        output_data = bytearray(frame_count * self._sample_bytes)
+        output_index = 0
+
+        playback_time = self._get_playback_time()
+        sync_error = output_time - playback_time if playback_time else 0
+        self._sync_error.value = sync_error
+
+        # Callback times jitter by a few milliseconds on their own, so the
+        # error is smoothed before it is acted on. A jump well past that is
+        # real and is taken as it is so it gets fixed straight away
+        if self._smoothed_sync_error is None or \
+                abs(sync_error - self._smoothed_sync_error) > \
+                self.SYNC_JUMP_NS:
+            self._smoothed_sync_error = float(sync_error)
         else:
-            data_index.value += 1
+            smoothing = min(frame_count / (self.SYNC_SMOOTHING_TIME *
+                                           self._rate), 1.0)
+            self._smoothed_sync_error += smoothing * (
+                sync_error - self._smoothed_sync_error)
+        sync_error = int(self._smoothed_sync_error)
+
+        # Late audio gets dropped and early audio waits behind silence so
+        # speakers never drift further apart than the tolerance, with drift
+        # correction the resampler pulls in any error smaller than that. The
+        # estimator is told how far the level jumped so it keeps its trend
+        level_error = sync_error * self._rate / 1e9
+
+        if sync_error > self.SYNC_TOLERANCE_NS:
+            late_samples = sync_error * self._rate // 1000000000
+            self._skip_samples(late_samples)
+            level_error -= late_samples
+            self._drift_estimator.shift_level(-late_samples)
+            self._smoothed_sync_error = 0.0
+
+        elif sync_error < -self.SYNC_TOLERANCE_NS:
+            early_samples = -sync_error * self._rate // 1000000000
+            output_index = min(early_samples * self._sample_bytes,
+                               len(output_data))
+            held_samples = output_index // self._sample_bytes
+            level_error += held_samples
+            self._drift_estimator.shift_level(held_samples)
+            self._smoothed_sync_error = 0.0
+
+        if self._drift_correction and output_index < len(output_data):
+            sample_count = (len(output_data) - output_index) // \
+                self._sample_bytes
+            output_data[output_index:] = self._read_resampled(sample_count,
+                                                              level_error)
+        else:
+            self._read_samples(output_data, output_index)
+
+        return bytes(output_data)
+
+    def _read_buffered(self, frame_count: int) -> bytes:
+        target_depth = self._target_depth.value
+        frames_buffered = self._audio_ring.frames_buffered
+
+        # Hold playback after an underrun until the jitter buffer refills
+        # and drop a frame when it has grown past its target
+        if self._prebuffering and frames_buffered < target_depth:
+            return bytes(frame_count * self._sample_bytes)
+
+        self._prebuffering = False
+
+        if target_depth and frames_buffered > target_depth + 1:
+            self._audio_ring.advance()
+            self._frames_skipped.value += 1
+            self._frames_skipped_metric.inc()
+            self._drift_estimator.reset_level()
+
+        if not self._drift_correction:
+            output_data = bytearray(frame_count * self._sample_bytes)
+            self._read_samples(output_data)
+            return bytes(output_data)
+
+        # Without a target depth the producer paces itself against the ring
+        # and there is no level to hold
+        if not target_depth:
+            return self._read_resampled(frame_count, 0.0)
+
+        frame_samples = self._frame_samples
+        buffered_samples = self._audio_ring.frames_buffered * frame_samples - \
+            self._playback_offset // self._sample_bytes + \
+            self._resampler.pending_samples
+
+        # Frames arrive whole so the level drops by a frame between writes,
+        # adding back what has played since the last write leaves the level
+        # as of that write and keeps the steps out of the drift estimate
+        write_age = time.monotonic_ns() - self._audio_ring.last_write_time
+        played_samples = min(write_age * self._rate / 1e9,
+                             frame_samples)
+
+        target_samples = target_depth * frame_samples
+        level_error = buffered_samples + played_samples - target_samples
+        return self._read_resampled(frame_count, level_error)
+
+    def _conceal_underrun(self, frame_count: int) -> bytes:
+        audio_data = bytearray(frame_count * self._sample_bytes)
+
+        # Only the first empty callback fades out what was playing, the ones
+        # after it stay silent until audio arrives again
+        if not self._concealing and self._last_output:
+            self._callback_gain_stage.fade(self._last_output, audio_data)
+            with self._frames_concealed.get_lock():
+                self._frames_concealed.value += 1
+            self._underrun_count.value += 1
+            self._frames_concealed_metric.inc()
+            self._underrun_metric.inc()
+
+        self._concealing = True
+        self._prebuffering = True
+        self._smoothed_sync_error = None
+        self._callback_gain_stage.reset_fade()
+
+        self._resampler.reset()
+        self._drift_estimator.reset_level()
+        return bytes(audio_data)
+
+    def _fade_in(self, audio_data: bytes) -> bytes:
+        # The fade in spans a whole frame however many callbacks that takes
+        faded_data = bytearray(len(audio_data))
+        if self._callback_gain_stage.fade(audio_data, faded_data,
+                                          fade_in=True):
+            self._concealing = False
+        return bytes(faded_data)
+
+    def _record_callback(self, callback_time: float) -> None:
+        self._callback_count_metric.inc()
+        self._callback_time_metric.inc(callback_time)
+        self._drift_metric.set(self._drift_estimator.skew * 1e6)
+        self._ratio_metric.set(self._drift_estimator.ratio)
+        self._frames_buffered_metric.set(self._audio_ring.frames_buffered)
+
+        if callback_time > self._max_callback_metric.value:
+            self._max_callback_metric.set(callback_time)
         return
 
     def _audio_callback(self, in_data, frame_count, time_info, status):
+        callback_start = time.perf_counter()
+
+        if self._audio_ring.frames_buffered == 0:
+            audio_data = self._conceal_underrun(frame_count)
 
-        if self._playback_data_index.value != self._audio_data_index.value:
-            playback_index = self._playback_data_index.value
-            audio_data = self._get_audio_data(playback_index)
+        else:
+            # A resampled stream stops part way through frames, without a
+            # presentation time it still plays as a buffered one
+            if (self._audio_ring.head_presentation_time == 0 and
+                    (self._playback_offset == 0 or self._drift_correction)):
+                audio_data = self._read_buffered(frame_count)
 
-            self._increase_data_index(self._playback_data_index)
+            else:
+                output_time = self._get_output_time(time_info)
+                audio_data = self._read_synchronized(frame_count,
+                                                     output_time)
+                self._prebuffering = False
 
-            self._audio_data_played.value += 1
+            if self._concealing and not self._prebuffering:
+                audio_data = self._fade_in(audio_data)
 
-        else:
-            playback_index = self._playback_data_index.value
-            audio_data = self._get_audio_data(playback_index)
+            self._last_output = audio_data
 
         if self._debug_mode.value:
             print("Audio_Callback in_data:", in_data, "frame_count:",
                   frame_count, "time_info:", time_info, "status:", status)
 
-        return audio_data, pyaudio.paContinue
+        self._record_callback(time.perf_counter() - callback_start)
+        return audio_data, audio_output_backend.OUTPUT_CONTINUE
@@ -8,13 +8,18 @@
 
 # The global libraries built into python
 import time
-import json
 import queue
 import socket
 import threading
 import multiprocessing
 import multiprocessing.queues
-from ast import literal_eval
+
+# The local libraries
+from network_audio_classes import constants
+from network_audio_classes import packet_protocol
+from network_audio_classes.clock_sync import ClockSync
+from network_audio_classes.stream_decoder import StreamDecoder
+from network_audio_classes.metrics_registry import MetricsRegistry
 
 # ************************Client Socket Thread Func************************** #
 
@@ -23,19 +28,25 @@ class ClientSocketThread(threading.Thread):
     THREAD_NAME: str = "Client Socket Thread"
 
     SOCKET_TIMEOUT: float = .5
-    STARTING_BRACKET_CHAR: bytes = b'{'
-    ENDING_BRACKET_CHAR: bytes = b'}'
-    NEW_LINE_CHAR: bytes = b'\n'
-    NONE_CHAR: bytes = b''
-    TERMINATING_CHARS: list = [b'\n', b'}', b'']
+    OUTGOING_QUEUE_DEPTH: int = 10
+    POLICY_ASSERT: str = "Slow client policy must be in SLOW_CLIENT_POLICIES"
     STATUS_KEY: str = "Network_Alive"
     RESPONSE_MSG: dict = {"Network_Alive": True}
 
     def __init__(self,
                  client_socket: socket.socket,
-                 in_message_queue: queue.Queue = queue.Queue(),
-                 status_message: dict = None):
+                 in_message_queue: queue.Queue = None,
+                 status_message: dict = None,
+                 handshake: dict = None,
+                 outgoing_queue_depth: int = OUTGOING_QUEUE_DEPTH,
+                 slow_client_policy: str = constants.SLOW_CLIENT_DROP_OLDEST,
+                 clock_sync: ClockSync = None,
+                 metrics: MetricsRegistry = None,
+                 metric_labels: dict = None,
+                 stream_info: dict = None):
         assert isinstance(client_socket, socket.socket)
+        assert slow_client_policy in constants.SLOW_CLIENT_POLICIES, \
+            self.POLICY_ASSERT
 
         threading.Thread.__init__(self, name=self.THREAD_NAME)
 
@@ -48,14 +59,27 @@ class ClientSocketThread(threading.Thread):
         else:
             self._incoming_message_queue = queue.Queue()
 
-        self._outgoing_message_queue: queue.Queue = queue.Queue()
+        self._outgoing_message_queue: queue.Queue
+        self._outgoing_message_queue = queue.Queue(outgoing_queue_depth)
+
+        # Control messages are never dropped and go out ahead of any queued
+        # audio, the semaphore counts what is waiting in both queues
+        self._control_message_queue: queue.Queue = queue.Queue()
+        self._pending_messages: threading.Semaphore = threading.Semaphore(0)
+
+        self._slow_client_policy: str = slow_client_policy
+        self._dropped_messages: int = 0
 
         self._client_socket: socket.socket = client_socket
+        self._stream_decoder: StreamDecoder = StreamDecoder()
 
         if self._client_socket.gettimeout() is None:
             self._client_socket.settimeout(self.SOCKET_TIMEOUT)
 
-        self._thread_running: bool = True
+        # Frames are small writes that have to go out as soon as they are
+        # made, Nagle would hold them back for the previous ACK
+        if client_socket.family in (socket.AF_INET, socket.AF_INET6):
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         self._thread_running: bool = True
         self._client_connected: bool = True
@@ -67,6 +91,28 @@ class ClientSocketThread(threading.Thread):
         else:
             self._status_message.update(self.RESPONSE_MSG)
 
+        self._session: dict = {constants.BINARY_AUDIO_STR: False}
+
+        # How this side streams, only sent back when answering a handshake
+        self._stream_info: dict = stream_info
+
+        self._clock_sync: ClockSync = clock_sync
+
+        metric_labels = dict(metric_labels or {})
+        self._bytes_sent_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_bytes_sent_total", metric_labels)
+        self._bytes_received_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_bytes_received_total", metric_labels)
+        self._dropped_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_messages_dropped_total", metric_labels)
+        self._queue_depth_metric = MetricsRegistry.optional_gauge(
+            metrics, "socket_queue_depth", metric_labels)
+        self._error_metric = MetricsRegistry.optional_counter(
+            metrics, "socket_errors_total", metric_labels)
+
+        if isinstance(handshake, dict):
+            self.add_outgoing_message(handshake)
+
         self._incoming_thread: threading.Thread
         self._outgoing_thread: threading.Thread
 
@@ -79,15 +125,13 @@ class ClientSocketThread(threading.Thread):
         self._incoming_thread.start()
         self._outgoing_thread.start()
 
-        while self._thread_running:
-            time.sleep(self.SOCKET_TIMEOUT)
-
         self._incoming_thread.join()
         self._outgoing_thread.join()
 
         self._close_client_socket()
 
         self._empty_outgoing_queue()
+        self._release_metrics()
         return
 
     def stop(self) -> None:
@@ -98,12 +142,26 @@ class ClientSocketThread(threading.Thread):
     def pending_incoming_message(self) -> bool:
         return not self._incoming_message_queue.empty()
 
-    def get_incoming_message(self) -> dict:
-        return self._incoming_message_queue.get_nowait()
+    def get_incoming_message(self, block: bool = False,
+                             timeout: float = None) -> dict:
+        return self._incoming_message_queue.get(block, timeout)
+
+    def add_outgoing_message(self, outgoing_message) -> None:
+        assert isinstance(outgoing_message, (dict, bytes))
+        if not packet_protocol.is_outgoing_audio(outgoing_message):
+            self._control_message_queue.put(outgoing_message)
+            self._pending_messages.release()
+            return
+
+        try:
+            self._outgoing_message_queue.put_nowait(outgoing_message)
+            self._pending_messages.release()
+
+        except queue.Full:
+            self._dropped_messages += 1
+            self._dropped_metric.inc()
+            self._handle_slow_client(outgoing_message)
 
-    def add_outgoing_message(self, outgoing_message: dict) -> None:
-        assert isinstance(outgoing_message, dict)
-        self._outgoing_message_queue.put(outgoing_message)
         return
 
     def update_status_message(self, status_message: dict) -> None:
@@ -111,6 +169,18 @@ class ClientSocketThread(threading.Thread):
         self._status_message.update(status_message)
         return
 
+    @property
+    def clock_sync(self) -> ClockSync:
+        return self._clock_sync
+
+    @property
+    def dropped_messages(self) -> int:
+        return self._dropped_messages
+
+    @property
+    def session(self) -> dict:
+        return self._session
+
     @property
     def client_connected(self) -> bool:
         return self._client_connected
@@ -119,80 +189,84 @@ class ClientSocketThread(threading.Thread):
     def thread_running(self) -> bool:
         return self._thread_running
 
-    def _socket_json_receive(self) -> dict:
-        receive_message = None
-        length_str = ""
-        message_buffer = ""
-
-        read_char = self._client_socket.recv(1)
-
-        if read_char == self.STARTING_BRACKET_CHAR:
-            starting_bracket_seen = 1
-            ending_bracket_seen = 0
-
-            message_buffer += read_char.decode()
+    def _socket_message_send(self, payload) -> None:
+        assert isinstance(self._client_socket, socket.socket)
 
-            while starting_bracket_seen != ending_bracket_seen:
-                read_char = self._client_socket.recv(1)
-                message_buffer += read_char.decode()
+        if isinstance(payload, bytes):
+            serialized_data = payload
+        else:
+            ClockSync.stamp_reply(payload)
+            wire_format = packet_protocol.session_wire_format(self._session)
+            serialized_data = packet_protocol.encode_message(payload,
+                                                             wire_format)
 
-                if read_char == self.ENDING_BRACKET_CHAR:
-                    ending_bracket_seen += 1
+        self._client_socket.sendall(serialized_data)
+        self._bytes_sent_metric.inc(len(serialized_data))
+        return
 
-            receive_message = literal_eval(message_buffer)
+    def _handle_slow_client(self, outgoing_message) -> None:
+        if self._slow_client_policy == constants.SLOW_CLIENT_DROP_OLDEST:
+            try:
+                self._outgoing_message_queue.get_nowait()
+                self._outgoing_message_queue.put_nowait(outgoing_message)
 
-        elif read_char != self.NONE_CHAR:
-            length_str += read_char.decode()
+            except (queue.Empty, queue.Full):
+                pass
 
-            while read_char != self.NEW_LINE_CHAR:
-                read_char = self._client_socket.recv(1)
-                length_str += read_char.decode()
+        elif self._slow_client_policy == constants.SLOW_CLIENT_DISCONNECT:
+            self._thread_running = False
 
-            try:
-                length_int = int(length_str)
-                pending_bytes = length_int
+        return
 
-                while pending_bytes > 0:
-                    temp_buffer = self._client_socket.recv(pending_bytes)
-                    message_buffer += temp_buffer.decode()
-                    pending_bytes -= len(temp_buffer)
+    def _handle_handshake(self, handshake: dict) -> None:
+        # The ack is queued before the session is so no audio in the
+        # negotiated wire format is sent ahead of it
+        session = dict(self._session)
+        session.update(packet_protocol.negotiate_handshake(
+            handshake, self._stream_info))
+        self.add_outgoing_message({constants.HANDSHAKE_ACK_STR: session})
+        self._session.update(session)
+        return
 
-                receive_message = json.loads(message_buffer)
+    def _handle_incoming_message(self, incoming_message: dict,
+                                 receive_time_ns: int) -> None:
+        if ClockSync.is_reply(incoming_message):
+            if self._clock_sync is not None:
+                self._clock_sync.add_reply(incoming_message, receive_time_ns)
 
-            except (socket.error, json.JSONDecodeError):
-                receive_message = literal_eval(message_buffer)
-                if not isinstance(receive_message, dict):
-                    receive_message = None
+        elif incoming_message.get(self.STATUS_KEY):
+            status_reply = ClockSync.create_reply(incoming_message,
+                                                  self._status_message,
+                                                  receive_time_ns)
+            self.add_outgoing_message(status_reply)
 
-            except ValueError:
-                receive_message = None
+        elif constants.HANDSHAKE_STR in incoming_message:
+            self._handle_handshake(incoming_message[constants.HANDSHAKE_STR])
 
-        return receive_message
+        elif constants.HANDSHAKE_ACK_STR in incoming_message:
+            self._session.update(incoming_message[constants.HANDSHAKE_ACK_STR])
 
-    def _socket_json_send(self, payload: dict, with_len: bool = True) -> None:
-        assert isinstance(self._client_socket, socket.socket)
-        serialized_data = json.dumps(payload)
-        len_string = str('%d\n' % len(serialized_data))
-        final_send_string = len_string + serialized_data
-        if with_len:
-            self._client_socket.sendall(final_send_string.encode())
         else:
-            self._client_socket.sendall(serialized_data.encode())
+            # Stamped here so time spent queued is not counted as jitter
+            incoming_message[constants.RECEIVE_TIME_STR] = receive_time_ns
+            self._incoming_message_queue.put(incoming_message)
+
         return
 
     def _receive_messages(self) -> None:
         while self._thread_running:
             try:
-                incoming_message = self._socket_json_receive()
+                received_bytes = self._stream_decoder.receive_from(
+                    self._client_socket)
+                receive_time_ns = time.monotonic_ns()
+                self._bytes_received_metric.inc(received_bytes)
 
-                if incoming_message is None:
+                if received_bytes == 0:
                     self._thread_running = False
 
-                elif incoming_message.get(self.STATUS_KEY):
-                    self._socket_json_send(self._status_message, False)
-
-                else:
-                    self._incoming_message_queue.put(incoming_message)
+                for incoming_message in self._stream_decoder.messages():
+                    self._handle_incoming_message(incoming_message,
+                                                  receive_time_ns)
 
             except socket.timeout:
                 pass
@@ -202,6 +276,7 @@ class ClientSocketThread(threading.Thread):
 
             except Exception as recv_error:
                 print("Client Socket had unhandled recv error:", recv_error)
+                self._error_metric.inc()
                 self._thread_running = False
 
         return
@@ -209,8 +284,23 @@ class ClientSocketThread(threading.Thread):
     def _send_messages(self) -> None:
         while self._thread_running:
             try:
-                outgoing_message = self._outgoing_message_queue.get(True, .5)
-                self._socket_json_send(outgoing_message)
+                if self._clock_sync is not None:
+                    if self._clock_sync.request_due:
+                        self._socket_message_send(
+                            self._clock_sync.create_request())
+
+                    get_timeout = min(self._clock_sync.time_until_request,
+                                      self.SOCKET_TIMEOUT)
+                else:
+                    get_timeout = self.SOCKET_TIMEOUT
+
+                if not self._pending_messages.acquire(True, get_timeout):
+                    continue
+
+                outgoing_message = self._next_outgoing_message()
+                self._queue_depth_metric.set(
+                    self._outgoing_message_queue.qsize())
+                self._socket_message_send(outgoing_message)
 
             except socket.error:
                 self._thread_running = False
@@ -220,18 +310,45 @@ class ClientSocketThread(threading.Thread):
 
             except Exception as send_error:
                 print("Client Socket had unhandled send error:", send_error)
+                self._error_metric.inc()
                 self._thread_running = False
 
         return
 
+    def _next_outgoing_message(self):
+        try:
+            return self._control_message_queue.get_nowait()
+
+        except queue.Empty:
+            return self._outgoing_message_queue.get_nowait()
+
     def _close_client_socket(self) -> None:
-        self._client_socket.shutdown(socket.SHUT_RDWR)
+        # The peer may already be gone, or the owner may have closed it
+        try:
+            self._client_socket.shutdown(socket.SHUT_RDWR)
+
+        except OSError:
+            pass
+
         self._client_socket.close()
         self._client_connected = False
         self._thread_running = False
         return
 
+    def _release_metrics(self) -> None:
+        # The metrics are labelled with this connection's address
+        for socket_metric in (self._bytes_sent_metric,
+                              self._bytes_received_metric,
+                              self._dropped_metric,
+                              self._queue_depth_metric,
+                              self._error_metric):
+            socket_metric.release()
+        return
+
     def _empty_outgoing_queue(self) -> None:
         while not self._outgoing_message_queue.empty():
             self._outgoing_message_queue.get()
+
+        while not self._control_message_queue.empty():
+            self._control_message_queue.get()
         return
@@ -0,0 +1,117 @@
+# clock_sync.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# An NTP style estimator of the offset between a client and the server
+# monotonic clocks built on top of the Network_Alive status exchange
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import collections
+
+# The local libraries
+from network_audio_classes import constants
+
+# *****************************Clock Sync Class****************************** #
+
+
+class ClockSync:
+    SAMPLE_WINDOW: int = 8
+    SYNC_INTERVAL: float = 1.0
+    FAST_SYNC_INTERVAL: float = .1
+
+    def __init__(self, sample_window: int = SAMPLE_WINDOW):
+        self._sample_list = collections.deque(maxlen=sample_window)
+
+        self._offset_ns: int = 0
+        self._round_trip_ns: int = 0
+        self._sample_count: int = 0
+
+        self._next_request_time: float = 0.0
+
+        # Replies keep coming while the server is there even without audio
+        self._last_reply_time: float = time.monotonic()
+        return
+
+    @property
+    def offset_ns(self) -> int:
+        return self._offset_ns
+
+    @property
+    def round_trip_ns(self) -> int:
+        return self._round_trip_ns
+
+    @property
+    def synchronized(self) -> bool:
+        return self._sample_count > 0
+
+    @property
+    def time_since_reply(self) -> float:
+        return time.monotonic() - self._last_reply_time
+
+    @property
+    def request_due(self) -> bool:
+        return time.monotonic() >= self._next_request_time
+
+    @property
+    def time_until_request(self) -> float:
+        return max(self._next_request_time - time.monotonic(), 0.0)
+
+    def to_server_time(self, local_time_ns: int) -> int:
+        return local_time_ns + self._offset_ns
+
+    def to_local_time(self, server_time_ns: int) -> int:
+        return server_time_ns - self._offset_ns
+
+    def create_request(self) -> dict:
+        if len(self._sample_list) < self._sample_list.maxlen:
+            sync_interval = self.FAST_SYNC_INTERVAL
+        else:
+            sync_interval = self.SYNC_INTERVAL
+
+        self._next_request_time = time.monotonic() + sync_interval
+
+        return {constants.NETWORK_ALIVE_STR: True,
+                constants.CLOCK_CLIENT_SEND_STR: time.monotonic_ns()}
+
+    def add_reply(self, reply: dict, receive_time_ns: int) -> None:
+        client_send_time = reply[constants.CLOCK_CLIENT_SEND_STR]
+        server_receive_time = reply[constants.CLOCK_SERVER_RECEIVE_STR]
+        server_send_time = reply[constants.CLOCK_SERVER_SEND_STR]
+
+        round_trip_ns = ((receive_time_ns - client_send_time) -
+                         (server_send_time - server_receive_time))
+        offset_ns = ((server_receive_time - client_send_time) +
+                     (server_send_time - receive_time_ns)) // 2
+
+        self._sample_list.append((round_trip_ns, offset_ns))
+        self._sample_count += 1
+        self._last_reply_time = time.monotonic()
+
+        # The sample with the shortest round trip has the least queuing in it
+        self._round_trip_ns, self._offset_ns = min(self._sample_list)
+        return
+
+    @staticmethod
+    def is_reply(message: dict) -> bool:
+        return constants.CLOCK_SERVER_RECEIVE_STR in message
+
+    @staticmethod
+    def create_reply(request: dict, status_message: dict,
+                     receive_time_ns: int) -> dict:
+        reply = dict(status_message)
+
+        if constants.CLOCK_CLIENT_SEND_STR in request:
+            reply[constants.CLOCK_CLIENT_SEND_STR] = \
+                request[constants.CLOCK_CLIENT_SEND_STR]
+            reply[constants.CLOCK_SERVER_RECEIVE_STR] = receive_time_ns
+
+        return reply
+
+    @staticmethod
+    def stamp_reply(reply: dict) -> None:
+        if constants.CLOCK_SERVER_RECEIVE_STR in reply:
+            reply[constants.CLOCK_SERVER_SEND_STR] = time.monotonic_ns()
+        return
@@ -22,6 +22,9 @@ FULL_LEFT_LOCATION = LOCATION_MIN
 
 AUDIO_SERVER_PORT = 1520
 AUDIO_CLIENT_PORT = 1250
+AUDIO_DISCOVERY_PORT = 1251
+
+DISCOVERY_GROUP = "239.255.12.51"
 
 PROCESS_KILL_WORD = "KILL"
 
@@ -29,3 +32,44 @@ SPEAKER_LOC_STR = "Speaker_Location"
 AUDIO_PAYLOAD_STR = "Audio_Payload"
 TIMESTAMP_STR = "Timestamp"
 CLIENT_READY_STR = "Client_Ready"
+SEQUENCE_STR = "Sequence"
+
+HANDSHAKE_STR = "Handshake"
+HANDSHAKE_ACK_STR = "Handshake_Ack"
+PROTOCOL_VERSION_STR = "Protocol_Version"
+BINARY_AUDIO_STR = "Binary_Audio"
+CODEC_STR = "Codec"
+CODECS_STR = "Codecs"
+ZONE_STR = "Zone"
+SAMPLE_RATE_STR = "Sample_Rate"
+CHANNELS_STR = "Channels"
+FRAME_SIZE_STR = "Frame_Size"
+PLAYOUT_DELAY_STR = "Playout_Delay"
+LATENCY_PROFILE_STR = "Latency_Profile"
+DEFAULT_ZONE = "Default"
+
+DISCOVER_STR = "Discover"
+SERVER_INFO_STR = "Server_Info"
+REQUEST_ID_STR = "Request_Id"
+SERVER_NAME_STR = "Server_Name"
+SERVER_IP_STR = "Server_Ip"
+SERVER_PORT_STR = "Server_Port"
+ZONES_STR = "Zones"
+
+LOW_LATENCY_PROFILE = "Low_Latency"
+BALANCED_PROFILE = "Balanced"
+EFFICIENT_PROFILE = "Efficient"
+
+SLOW_CLIENT_DROP_OLDEST = "Drop_Oldest"
+SLOW_CLIENT_DROP_NEWEST = "Drop_Newest"
+SLOW_CLIENT_DISCONNECT = "Disconnect"
+SLOW_CLIENT_POLICIES = [SLOW_CLIENT_DROP_OLDEST,
+                        SLOW_CLIENT_DROP_NEWEST,
+                        SLOW_CLIENT_DISCONNECT]
+
+NETWORK_ALIVE_STR = "Network_Alive"
+CLOCK_CLIENT_SEND_STR = "Clock_Client_Send"
+CLOCK_SERVER_RECEIVE_STR = "Clock_Server_Receive"
+CLOCK_SERVER_SEND_STR = "Clock_Server_Send"
+PRESENTATION_TIME_STR = "Presentation_Time"
+RECEIVE_TIME_STR = "Receive_Time"
@@ -0,0 +1,221 @@
+# drift_resampler.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Keeps a client's buffer at its target while the sound card runs from a
+# different crystal than the server. The drift estimator follows how fast the
+# buffer level moves against the nominal rate and turns it into a playback
+# ratio a few hundred ppm away from one, the resampler plays the buffered
+# audio at that ratio with cubic interpolation done in NumPy
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import ctypes
+import multiprocessing
+
+# The imports brought in via pip
+import numpy
+
+# The local libraries
+from network_audio_classes import constants
+
+# ****************************Drift Estimator******************************** #
+
+
+class DriftEstimator:
+    MAX_SKEW: float = 500e-6
+
+    # How long the level is smoothed over, how often its trend is measured,
+    # how slowly the skew estimate follows the trend and how long the level
+    # takes to be pulled back to its target
+    SMOOTHING_TIME: float = 2.0
+    TREND_INTERVAL: float = 4.0
+    SKEW_TIME: float = 60.0
+    CORRECTION_TIME: float = 20.0
+
+    def __init__(self,
+                 sample_rate: int = constants.AUDIO_RATE,
+                 max_skew: float = MAX_SKEW):
+        assert sample_rate > 0 and max_skew > 0
+
+        self._sample_rate: int = sample_rate
+        self._max_skew: float = max_skew
+
+        # Only used by the process feeding the estimator
+        self._smoothed_error: float = None
+        self._settle_samples: int = 0
+        self._trend_start_error: float = None
+        self._trend_samples: int = 0
+        self._trend_correction: float = 0.0
+        self._skew_measured: bool = False
+
+        self._skew = multiprocessing.Value(ctypes.c_double, 0.0)
+        self._ratio = multiprocessing.Value(ctypes.c_double, 1.0)
+        self._level_error = multiprocessing.Value(ctypes.c_double, 0.0)
+        return
+
+    @property
+    def skew(self) -> float:
+        return self._skew.value
+
+    @property
+    def ratio(self) -> float:
+        return self._ratio.value
+
+    @property
+    def level_error(self) -> float:
+        return self._level_error.value
+
+    def reset_level(self) -> None:
+        # After a jump in the level the trend starts over, the skew learned
+        # so far still holds
+        self._smoothed_error = None
+        return
+
+    def shift_level(self, level_change: float) -> None:
+        # A jump in the level of a known size, like samples skipped to hold
+        # sync, moves the trend along with it so the trend carries on
+        if self._smoothed_error is not None:
+            self._smoothed_error += level_change
+
+        if self._trend_start_error is not None:
+            self._trend_start_error += level_change
+        return
+
+    def update(self, level_error: float, sample_count: int) -> float:
+        # The level error is in samples, positive when the buffer is ahead of
+        # its target and has to be played faster
+        if self._smoothed_error is None:
+            self._smoothed_error = level_error
+            self._settle_samples = 0
+            self._trend_start_error = None
+
+        else:
+            smoothing = min(sample_count / (self.SMOOTHING_TIME *
+                                            self._sample_rate), 1.0)
+            self._smoothed_error += smoothing * (level_error -
+                                                 self._smoothed_error)
+
+        # The trend is only measured once the smoothing has caught up with
+        # the level, otherwise the catching up reads as drift
+        if self._trend_start_error is None:
+            self._settle_samples += sample_count
+            if self._settle_samples >= 2 * self.SMOOTHING_TIME * \
+                    self._sample_rate:
+                self._start_trend()
+
+        else:
+            self._trend_samples += sample_count
+            self._trend_correction += (self._ratio.value - 1.0) * \
+                sample_count
+
+            if self._trend_samples >= self.TREND_INTERVAL * self._sample_rate:
+                self._update_skew()
+
+        correction = self._smoothed_error / (self.CORRECTION_TIME *
+                                             self._sample_rate)
+        ratio_offset = self._clamp(self._skew.value + correction)
+
+        self._level_error.value = self._smoothed_error
+        self._ratio.value = 1.0 + ratio_offset
+        return self._ratio.value
+
+    def _start_trend(self) -> None:
+        self._trend_start_error = self._smoothed_error
+        self._trend_samples = 0
+        self._trend_correction = 0.0
+        return
+
+    def _update_skew(self) -> None:
+        # The level moves by the skew less whatever the ratio already took
+        # out, adding the correction back leaves the skew of the two clocks
+        level_change = self._smoothed_error - self._trend_start_error
+        measured_skew = (level_change + self._trend_correction) / \
+            self._trend_samples
+
+        if self._skew_measured:
+            skew_weight = min(self._trend_samples / (self.SKEW_TIME *
+                                                     self._sample_rate), 1.0)
+        else:
+            skew_weight = 1.0
+            self._skew_measured = True
+
+        skew = self._skew.value + skew_weight * (measured_skew -
+                                                 self._skew.value)
+        self._skew.value = self._clamp(skew)
+
+        self._start_trend()
+        return
+
+    def _clamp(self, ratio_offset: float) -> float:
+        return min(max(ratio_offset, -self._max_skew), self._max_skew)
+
+# ***************************Fractional Resampler**************************** #
+
+
+class FractionalResampler:
+    SAMPLE_TYPE = numpy.int16
+    SAMPLE_MIN: int = -32768
+    SAMPLE_MAX: int = 32767
+
+    def __init__(self, channels: int = constants.AUDIO_CHANNELS):
+        self._channels: int = channels
+
+        self._history: numpy.ndarray = None
+        self._phase: float = 0.0
+        self.reset()
+        return
+
+    @property
+    def pending_samples(self) -> float:
+        # Samples already taken from the buffer that have not been played
+        return len(self._history) - self._phase
+
+    def reset(self) -> None:
+        # One sample of silence sits behind the first read position for the
+        # interpolation to lean on
+        self._history = numpy.zeros((1, self._channels), numpy.float32)
+        self._phase = 1.0
+        return
+
+    def input_needed(self, sample_count: int, ratio: float) -> int:
+        last_position = self._phase + (sample_count - 1) * ratio
+        return max(int(last_position) + 3 - len(self._history), 0)
+
+    def process(self, audio_data: bytes, sample_count: int,
+                ratio: float) -> bytes:
+        input_frame = numpy.frombuffer(audio_data, self.SAMPLE_TYPE)
+        input_frame = input_frame.reshape(-1, self._channels)
+
+        samples = numpy.concatenate((self._history,
+                                     input_frame.astype(numpy.float32)))
+
+        positions = self._phase + numpy.arange(sample_count) * ratio
+        indexes = positions.astype(numpy.int64)
+        fractions = (positions - indexes).astype(numpy.float32)
+        fractions = fractions.reshape(-1, 1)
+
+        # Catmull-Rom interpolation between the two samples around each
+        # position, exact when the ratio is one
+        before = samples[indexes - 1]
+        current = samples[indexes]
+        after = samples[indexes + 1]
+        next_after = samples[indexes + 2]
+
+        cubic = -.5 * before + 1.5 * current - 1.5 * after + .5 * next_after
+        square = before - 2.5 * current + 2 * after - .5 * next_after
+        linear = .5 * (after - before)
+
+        output_frame = ((cubic * fractions + square) * fractions +
+                        linear) * fractions + current
+        numpy.rint(output_frame, out=output_frame)
+        numpy.clip(output_frame, self.SAMPLE_MIN, self.SAMPLE_MAX,
+                   out=output_frame)
+
+        next_position = self._phase + sample_count * ratio
+        keep_start = int(next_position) - 1
+        self._history = samples[keep_start:]
+        self._phase = next_position - keep_start
+
+        return output_frame.astype(self.SAMPLE_TYPE).tobytes()
@@ -0,0 +1,167 @@
+# format_converter.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Converts the server's audio into the rate and channel layout a client's
+# device plays natively. The rate change is a polyphase FIR resampler in
+# NumPy that keeps its filter history between frames, the channels are mixed
+# down or copied up around it so the filter runs on the fewest channels
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import math
+
+# The imports brought in via pip
+import numpy
+
+# The local libraries
+from network_audio_classes import constants
+
+# ***************************Polyphase Resampler***************************** #
+
+
+class PolyphaseResampler:
+    TAPS_PER_PHASE: int = 32
+    KAISER_BETA: float = 8.0
+
+    # The passband ends a little before the lower of the two Nyquist rates so
+    # the transition band does not fold back
+    ROLLOFF: float = .92
+
+    def __init__(self, input_rate: int, output_rate: int,
+                 channels: int = constants.AUDIO_CHANNELS,
+                 taps_per_phase: int = TAPS_PER_PHASE):
+        assert input_rate > 0 and output_rate > 0
+        assert channels > 0 and taps_per_phase > 0
+
+        rate_divisor = math.gcd(input_rate, output_rate)
+        self._up: int = output_rate // rate_divisor
+        self._down: int = input_rate // rate_divisor
+        self._input_rate: int = input_rate
+        self._channels: int = channels
+        self._taps: int = taps_per_phase
+
+        filter_len = taps_per_phase * self._up
+        cutoff = self.ROLLOFF * .5 / max(self._up, self._down)
+        filter_index = numpy.arange(filter_len) - (filter_len - 1) / 2
+        prototype = 2 * cutoff * numpy.sinc(2 * cutoff * filter_index) * \
+            numpy.kaiser(filter_len, self.KAISER_BETA) * self._up
+
+        # Row p holds the taps that land on input samples for output samples
+        # whose upsampled position is p past an input sample
+        self._phase_filters = prototype.reshape(taps_per_phase, self._up).T
+        self._phase_filters = self._phase_filters.astype(numpy.float32)
+
+        self._delay: float = (filter_len - 1) / 2 / self._up / input_rate
+
+        # The last taps - 1 input samples and the upsampled position of the
+        # next output sample counted from the first of them
+        self._history = numpy.zeros((taps_per_phase - 1, channels),
+                                    numpy.float32)
+        self._next_position: int = (taps_per_phase - 1) * self._up
+        return
+
+    @property
+    def delay(self) -> float:
+        return self._delay
+
+    def process(self, samples: numpy.ndarray) -> (numpy.ndarray, float):
+        # Takes float samples shaped (count, channels) and returns the output
+        # samples with how far after the first input sample the first output
+        # sample falls, less the filter delay
+        history_len = len(self._history)
+        samples = numpy.concatenate((self._history, samples))
+        samples_len = len(samples)
+
+        first_offset = (self._next_position - history_len * self._up) / \
+            self._up / self._input_rate - self._delay
+
+        output_count = max((samples_len * self._up - 1 -
+                            self._next_position) // self._down + 1, 0)
+        positions = self._next_position + \
+            numpy.arange(output_count) * self._down
+
+        phases = positions % self._up
+        bases = positions // self._up
+        tap_indexes = bases[:, numpy.newaxis] - numpy.arange(self._taps)
+
+        # One channel at a time is several times faster than a single einsum
+        # over the gathered (outputs, taps, channels) block
+        phase_filters = self._phase_filters[phases]
+        output_samples = numpy.empty((output_count, self._channels),
+                                     numpy.float32)
+        for channel in range(self._channels):
+            channel_taps = samples[:, channel][tap_indexes]
+            numpy.sum(phase_filters * channel_taps, axis=1,
+                      out=output_samples[:, channel])
+
+        self._next_position += output_count * self._down
+        self._next_position -= (samples_len - history_len) * self._up
+        self._history = samples[samples_len - history_len:]
+        return output_samples, first_offset
+
+# ****************************Format Converter******************************* #
+
+
+class FormatConverter:
+    SAMPLE_TYPE = numpy.int16
+    SAMPLE_MIN: int = -32768
+    SAMPLE_MAX: int = 32767
+
+    def __init__(self,
+                 output_rate: int,
+                 output_channels: int,
+                 input_rate: int = constants.AUDIO_RATE,
+                 input_channels: int = constants.AUDIO_CHANNELS):
+        self._input_channels: int = input_channels
+        self._output_channels: int = output_channels
+
+        self._mix_matrix = self.mix_matrix(input_channels, output_channels)
+
+        # The filter runs on whichever side of the mix has fewer channels
+        self._mix_first: bool = output_channels < input_channels
+        filter_channels = min(input_channels, output_channels)
+
+        self._resampler: PolyphaseResampler = None
+        if input_rate != output_rate:
+            self._resampler = PolyphaseResampler(input_rate, output_rate,
+                                                 filter_channels)
+        return
+
+    @classmethod
+    def mix_matrix(cls, input_channels: int,
+                   output_channels: int) -> numpy.ndarray:
+        if output_channels == 1:
+            mix_matrix = numpy.full((input_channels, 1), 1 / input_channels)
+
+        elif input_channels == 1:
+            mix_matrix = numpy.ones((1, output_channels))
+
+        else:
+            mix_matrix = numpy.eye(input_channels, output_channels)
+
+        return mix_matrix.astype(numpy.float32)
+
+    def convert(self, audio_data: bytes) -> (bytes, int):
+        # Returns the converted frame and the shift in ns of its first sample
+        # against the first sample of the frame that went in
+        samples = numpy.frombuffer(audio_data, self.SAMPLE_TYPE)
+        samples = samples.reshape(-1, self._input_channels)
+        samples = samples.astype(numpy.float32)
+
+        time_offset = 0.0
+
+        if self._mix_first:
+            samples = samples @ self._mix_matrix
+
+        if self._resampler is not None:
+            samples, time_offset = self._resampler.process(samples)
+
+        if not self._mix_first:
+            samples = samples @ self._mix_matrix
+
+        numpy.rint(samples, out=samples)
+        numpy.clip(samples, self.SAMPLE_MIN, self.SAMPLE_MAX, out=samples)
+        return samples.astype(self.SAMPLE_TYPE).tobytes(), int(time_offset *
+                                                              1e9)
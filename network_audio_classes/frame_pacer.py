@@ -0,0 +1,140 @@
+# frame_pacer.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Schedules audio frames against the monotonic clock so frame N goes out at
+# start + N * frame duration no matter how long sending the frames before it
+# took. The late and early deviations are kept in shared memory so they can be
+# read from outside the process doing the pacing
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import ctypes
+import multiprocessing
+
+# The local libraries
+from network_audio_classes import constants
+
+# *****************************Frame Pacer Class***************************** #
+
+
+class FramePacer:
+    MAX_CATCH_UP: float = .2
+    EARLY_TOLERANCE: float = .0005
+    LATE_TOLERANCE: float = .001
+
+    def __init__(self,
+                 frame_size: int = constants.AUDIO_FRAME_SIZE,
+                 sample_rate: int = constants.AUDIO_RATE,
+                 max_catch_up: float = MAX_CATCH_UP):
+        assert frame_size > 0 and sample_rate > 0
+        assert max_catch_up > 0
+
+        self._frame_size: int = frame_size
+        self._sample_rate: int = sample_rate
+        self._max_catch_up_ns: int = int(max_catch_up * 1e9)
+        self._early_tolerance_ns: int = int(self.EARLY_TOLERANCE * 1e9)
+        self._late_tolerance_ns: int = int(self.LATE_TOLERANCE * 1e9)
+
+        # Only used by the process doing the pacing
+        self._start_time: int = 0
+        self._frame_index: int = 0
+
+        self._frames_paced = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._late_frames = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._resync_count = multiprocessing.Value(ctypes.c_uint64, 0)
+
+        self._deviation_sum = multiprocessing.Value(ctypes.c_int64, 0)
+        self._max_late_time = multiprocessing.Value(ctypes.c_int64, 0)
+        self._max_early_time = multiprocessing.Value(ctypes.c_int64, 0)
+        return
+
+    @property
+    def frames_paced(self) -> int:
+        return self._frames_paced.value
+
+    @property
+    def late_frames(self) -> int:
+        return self._late_frames.value
+
+    @property
+    def resync_count(self) -> int:
+        return self._resync_count.value
+
+    @property
+    def average_deviation(self) -> float:
+        frames_paced = self._frames_paced.value
+        if frames_paced == 0:
+            return 0.0
+        return self._deviation_sum.value / frames_paced / 1e9
+
+    @property
+    def max_late_time(self) -> float:
+        return self._max_late_time.value / 1e9
+
+    @property
+    def max_early_time(self) -> float:
+        return self._max_early_time.value / 1e9
+
+    def start(self, start_time_ns: int = None) -> None:
+        if start_time_ns is None:
+            start_time_ns = time.monotonic_ns()
+
+        self._start_time = start_time_ns
+        self._frame_index = 0
+        return
+
+    def time_until_next(self) -> float:
+        if not self._start_time:
+            self.start()
+
+        next_deadline = self._frame_deadline(self._frame_index)
+        return max(next_deadline - time.monotonic_ns(), 0) / 1e9
+
+    def next_frame(self) -> bool:
+        if not self._start_time:
+            self.start()
+
+        current_time = time.monotonic_ns()
+        deadline = self._frame_deadline(self._frame_index)
+        deviation = current_time - deadline
+
+        if deviation < -self._early_tolerance_ns:
+            return False
+
+        # Late frames go out back to back to catch up, unless the schedule has
+        # fallen so far behind that it is restarted from now instead
+        if deviation > self._max_catch_up_ns:
+            self.start(current_time)
+            self._resync_count.value += 1
+            deviation = 0
+
+        self._record_deviation(deviation)
+        self._frame_index += 1
+        return True
+
+    def wait(self) -> None:
+        while not self.next_frame():
+            time.sleep(self.time_until_next())
+        return
+
+    def _frame_deadline(self, frame_index: int) -> int:
+        return self._start_time + (frame_index * self._frame_size *
+                                   1000000000 // self._sample_rate)
+
+    def _record_deviation(self, deviation: int) -> None:
+        self._frames_paced.value += 1
+        self._deviation_sum.value += deviation
+
+        if deviation > self._late_tolerance_ns:
+            self._late_frames.value += 1
+
+        if deviation > 0:
+            self._max_late_time.value = max(self._max_late_time.value,
+                                            deviation)
+        else:
+            self._max_early_time.value = max(self._max_early_time.value,
+                                             -deviation)
+        return
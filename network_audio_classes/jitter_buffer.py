@@ -0,0 +1,166 @@
+# jitter_buffer.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Tracks the inter-arrival jitter of audio frames and turns it into a target
+# number of frames to keep buffered. The values live in shared memory so the
+# process that owns the client can read them while another one updates them
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import math
+import time
+import ctypes
+import multiprocessing
+
+# The local libraries
+from network_audio_classes import constants
+
+# ***************************Jitter Buffer Class***************************** #
+
+
+class JitterBuffer:
+    MIN_LATENCY: float = .03
+    MAX_LATENCY: float = .2
+
+    JITTER_GAIN: int = 16
+    JITTER_MULTIPLIER: float = 4.0
+    SHRINK_HOLD_TIME: float = 5.0
+
+    HISTORY_LEN: int = 64
+
+    LATENCY_ASSERT: str = "Latency bounds must be positive and ordered"
+
+    def __init__(self,
+                 min_latency: float = MIN_LATENCY,
+                 max_latency: float = MAX_LATENCY,
+                 frame_duration: float = constants.AUDIO_SLEEP_TIME):
+        assert 0 < min_latency <= max_latency, self.LATENCY_ASSERT
+
+        self._min_latency: float = min_latency
+        self._max_latency: float = max_latency
+
+        self._frame_duration: float = frame_duration
+        self._min_depth: int = 0
+        self._max_depth: int = 0
+        self._set_depth_bounds()
+
+        self._jitter = multiprocessing.Value(ctypes.c_double, 0.0)
+        self._target_depth = multiprocessing.Value(ctypes.c_uint32,
+                                                   self._min_depth)
+
+        self._depth_history = multiprocessing.Array(ctypes.c_uint32,
+                                                    self.HISTORY_LEN)
+        self._history_count = multiprocessing.Value(ctypes.c_uint64, 0)
+
+        # Only used by the process receiving the frames
+        self._previous_arrival: int = 0
+        self._previous_timestamp: int = 0
+        self._shrink_time: float = 0.0
+
+        self._record_depth(self._min_depth)
+        return
+
+    @property
+    def jitter(self) -> float:
+        return self._jitter.value
+
+    @property
+    def target_depth(self) -> int:
+        return self._target_depth.value
+
+    @property
+    def min_depth(self) -> int:
+        return self._min_depth
+
+    @property
+    def max_depth(self) -> int:
+        return self._max_depth
+
+    @property
+    def depth_history(self) -> list:
+        history_count = self._history_count.value
+        history_len = min(history_count, self.HISTORY_LEN)
+
+        depth_history = []
+        for history_index in range(history_count - history_len,
+                                   history_count):
+            history_slot = history_index % self.HISTORY_LEN
+            depth_history.append(self._depth_history[history_slot])
+
+        return depth_history
+
+    def add_arrival(self, arrival_time_ns: int, timestamp_ns: int = 0) -> None:
+        if not timestamp_ns:
+            timestamp_ns = self._previous_timestamp + \
+                           int(self._frame_duration * 1e9)
+
+        if self._previous_arrival:
+            arrival_delta = arrival_time_ns - self._previous_arrival
+            timestamp_delta = timestamp_ns - self._previous_timestamp
+            transit_change = abs(arrival_delta - timestamp_delta) / 1e9
+
+            self._jitter.value += ((transit_change - self._jitter.value) /
+                                   self.JITTER_GAIN)
+            self._update_target_depth()
+
+        self._previous_arrival = arrival_time_ns
+        self._previous_timestamp = timestamp_ns
+        return
+
+    def reset(self) -> None:
+        self._previous_arrival = 0
+        self._previous_timestamp = 0
+        return
+
+    def set_frame_duration(self, frame_duration: float) -> None:
+        # The latency bounds stay the same when the frames change size, the
+        # depths that cover them start over from the smallest
+        if frame_duration != self._frame_duration:
+            self._frame_duration = frame_duration
+            self._set_depth_bounds()
+            self._record_depth(self._min_depth)
+            self.reset()
+        return
+
+    def _set_depth_bounds(self) -> None:
+        self._min_depth = max(math.ceil(self._min_latency /
+                                        self._frame_duration), 1)
+        self._max_depth = max(math.ceil(self._max_latency /
+                                        self._frame_duration), self._min_depth)
+        return
+
+    def _update_target_depth(self) -> None:
+        jitter_frames = self.JITTER_MULTIPLIER * self._jitter.value / \
+            self._frame_duration
+        desired_depth = 1 + math.ceil(jitter_frames)
+        desired_depth = min(max(desired_depth, self._min_depth),
+                            self._max_depth)
+
+        current_time = time.monotonic()
+        target_depth = self._target_depth.value
+
+        # Grow straight away but only shrink one frame at a time once the
+        # jitter has stayed low for a while
+        if desired_depth > target_depth:
+            self._shrink_time = current_time + self.SHRINK_HOLD_TIME
+            self._record_depth(desired_depth)
+
+        elif desired_depth < target_depth:
+            if current_time >= self._shrink_time:
+                self._shrink_time = current_time + self.SHRINK_HOLD_TIME
+                self._record_depth(target_depth - 1)
+
+        else:
+            self._shrink_time = current_time + self.SHRINK_HOLD_TIME
+
+        return
+
+    def _record_depth(self, target_depth: int) -> None:
+        self._target_depth.value = target_depth
+
+        history_slot = self._history_count.value % self.HISTORY_LEN
+        self._depth_history[history_slot] = target_depth
+        self._history_count.value += 1
+        return
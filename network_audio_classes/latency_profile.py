@@ -0,0 +1,143 @@
+# latency_profile.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# The presets that trade packet rate against latency for an installation. The
+# server streams every zone in its profile's frame size and tells clients
+# that size when they connect, each client then sizes its ring, jitter buffer
+# and device buffer from its own profile for the frames it actually gets
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import math
+
+# The local libraries
+from network_audio_classes import constants
+
+# ****************************Latency Profile******************************** #
+
+
+class LatencyProfile:
+    MIN_FRAMES_PER_BUFFER: int = 64
+
+    PROFILE_ASSERT: str = "Latency profile values must be positive"
+
+    def __init__(self,
+                 profile_name: str,
+                 frame_size: int,
+                 ring_depth: int,
+                 frames_per_buffer: int,
+                 min_latency: float,
+                 max_latency: float,
+                 playout_delay: float):
+        assert frame_size > 0 and ring_depth > 0 and frames_per_buffer > 0, \
+            self.PROFILE_ASSERT
+        assert 0 < min_latency <= max_latency and playout_delay > 0, \
+            self.PROFILE_ASSERT
+
+        self._profile_name: str = profile_name
+        self._frame_size: int = frame_size
+        self._ring_depth: int = ring_depth
+        self._frames_per_buffer: int = frames_per_buffer
+        self._min_latency: float = min_latency
+        self._max_latency: float = max_latency
+        self._playout_delay: float = playout_delay
+        return
+
+    @property
+    def profile_name(self) -> str:
+        return self._profile_name
+
+    @property
+    def frame_size(self) -> int:
+        return self._frame_size
+
+    @property
+    def frame_byte_size(self) -> int:
+        return self._frame_size * constants.AUDIO_BYTE_PER_FRAME
+
+    @property
+    def frame_duration(self) -> float:
+        return self._frame_size / constants.AUDIO_RATE
+
+    @property
+    def ring_depth(self) -> int:
+        return self._ring_depth
+
+    @property
+    def frames_per_buffer(self) -> int:
+        return self._frames_per_buffer
+
+    @property
+    def min_latency(self) -> float:
+        return self._min_latency
+
+    @property
+    def max_latency(self) -> float:
+        return self._max_latency
+
+    @property
+    def playout_delay(self) -> float:
+        return self._playout_delay
+
+    def ring_depth_for(self, frame_size: int,
+                       playout_delay: float = 0.0) -> int:
+        # The ring holds as much audio as the profile asks for whatever the
+        # server's frame size, and always a frame more than the jitter buffer
+        # or the playout delay can leave waiting in it
+        frame_duration = frame_size / constants.AUDIO_RATE
+        ring_time = self._ring_depth * self.frame_duration
+        buffered_time = max(self._max_latency, playout_delay)
+
+        return max(math.ceil(ring_time / frame_duration),
+                   math.ceil(buffered_time / frame_duration) + 1)
+
+    def frames_per_buffer_for(self, playout_delay: float = 0.0,
+                              rate: int = constants.AUDIO_RATE) -> int:
+        # A device buffer longer than half the playout delay would ask for
+        # audio the server has not sent yet
+        if not playout_delay:
+            return self._frames_per_buffer
+
+        return max(min(self._frames_per_buffer, int(playout_delay * rate / 2)),
+                   self.MIN_FRAMES_PER_BUFFER)
+
+# ****************************Latency Presets******************************** #
+
+
+LOW_LATENCY_PROFILE = LatencyProfile(constants.LOW_LATENCY_PROFILE,
+                                     frame_size=128,
+                                     ring_depth=48,
+                                     frames_per_buffer=128,
+                                     min_latency=.01,
+                                     max_latency=.08,
+                                     playout_delay=.02)
+
+BALANCED_PROFILE = LatencyProfile(constants.BALANCED_PROFILE,
+                                  frame_size=constants.AUDIO_FRAME_SIZE,
+                                  ring_depth=10,
+                                  frames_per_buffer=constants.AUDIO_FRAME_SIZE,
+                                  min_latency=.03,
+                                  max_latency=.2,
+                                  playout_delay=.1)
+
+EFFICIENT_PROFILE = LatencyProfile(constants.EFFICIENT_PROFILE,
+                                   frame_size=4096,
+                                   ring_depth=6,
+                                   frames_per_buffer=4096,
+                                   min_latency=.1,
+                                   max_latency=.4,
+                                   playout_delay=.3)
+
+LATENCY_PROFILES: dict = {
+    latency_profile.profile_name: latency_profile
+    for latency_profile in [LOW_LATENCY_PROFILE, BALANCED_PROFILE,
+                            EFFICIENT_PROFILE]}
+
+
+def get_latency_profile(profile_name: str) -> LatencyProfile:
+    if profile_name not in LATENCY_PROFILES:
+        raise ValueError("Unknown latency profile: %s" % profile_name)
+
+    return LATENCY_PROFILES[profile_name]
@@ -0,0 +1,407 @@
+# metrics_registry.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# A registry of named counters and gauges kept in shared memory so the
+# server, client and player processes can all record into the same place.
+# The values can be dumped in the Prometheus text format or served over a
+# small local HTTP endpoint
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import os
+import json
+import ctypes
+import threading
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# *******************************Metric Class******************************** #
+
+
+class Metric:
+
+    def __init__(self, metrics_registry, metric_key: str = None,
+                 metric_type: bytes = b'c'):
+        self._metrics_registry = metrics_registry
+        self._metric_key: str = metric_key
+        self._metric_type: bytes = metric_type
+
+        # The slot this process records into, looked up again when the metric
+        # is used from a new process
+        self._writer_pid: int = 0
+        self._metric_index: int = -1
+        self._metric_generation: int = 0
+        return
+
+    @property
+    def value(self) -> float:
+        if self._metric_key is None:
+            return 0.0
+
+        if self._metric_type == self._metrics_registry.COUNTER_TYPE:
+            return self._metrics_registry.get_total(self._metric_key)
+
+        metric_index = self._writer_index()
+        if metric_index < 0:
+            return 0.0
+        return self._metrics_registry.get_value(metric_index)
+
+    def inc(self, amount: float = 1) -> None:
+        metric_index = self._writer_index()
+        if metric_index >= 0:
+            self._metrics_registry.add_value(metric_index, amount)
+        return
+
+    def set(self, value: float) -> None:
+        metric_index = self._writer_index()
+        if metric_index >= 0:
+            self._metrics_registry.set_value(metric_index, value)
+        return
+
+    def release(self) -> None:
+        # The slots go back to the registry, the metric records nothing after
+        if self._metric_key is not None:
+            self._metrics_registry.release_key(self._metric_key)
+            self._metric_key = None
+            self._metric_index = -1
+        return
+
+    def _writer_index(self) -> int:
+        if self._metric_key is None:
+            return -1
+
+        if self._writer_pid != os.getpid():
+            self._writer_pid = os.getpid()
+            self._metric_index, self._metric_generation = \
+                self._metrics_registry.writer_slot(self._metric_key,
+                                                   self._metric_type)
+
+        # Released by another process and maybe handed to another metric
+        elif self._metric_index >= 0 and \
+                not self._metrics_registry.slot_current(
+                    self._metric_index, self._metric_generation):
+            self._metric_index = -1
+
+        return self._metric_index
+
+
+# Handed out when there is no registry to record into
+NULL_METRIC: Metric = Metric(None)
+
+# ***************************Metrics Registry Class************************** #
+
+
+class MetricsRegistry:
+    MAX_METRICS: int = 2048
+    KEY_SIZE: int = 160
+
+    COUNTER_TYPE: bytes = b'c'
+    GAUGE_TYPE: bytes = b'g'
+
+    # Gauges are set rather than added to so every process shares one slot
+    SHARED_WRITER: int = 0
+
+    METRIC_PREFIX: str = "network_audio_"
+
+    def __init__(self, max_metrics: int = MAX_METRICS):
+        self._max_metrics: int = max_metrics
+
+        self._metric_values = multiprocessing.RawArray(ctypes.c_double,
+                                                       max_metrics)
+        self._metric_keys = multiprocessing.RawArray(
+            ctypes.c_char, max_metrics * self.KEY_SIZE)
+        self._metric_types = multiprocessing.RawArray(ctypes.c_char,
+                                                      max_metrics)
+
+        # Each process adds to counters in its own slot so no lock is shared
+        # between processes, the slots are summed when the metrics are read
+        self._metric_writers = multiprocessing.RawArray(ctypes.c_int32,
+                                                        max_metrics)
+
+        # Bumped every time a slot is handed out so a metric still holding a
+        # released slot stops recording instead of adding to another series
+        self._metric_generations = multiprocessing.RawArray(ctypes.c_uint32,
+                                                            max_metrics)
+
+        self._metric_count = multiprocessing.Value(ctypes.c_uint32, 0)
+
+        # Per process cache of the slots that have already been looked up and
+        # the locks for threads adding to the same slot
+        self._key_indexes: dict = {}
+        self._slot_locks: dict = {}
+        return
+
+    def __getstate__(self) -> dict:
+        registry_state = dict(self.__dict__)
+        registry_state["_slot_locks"] = {}
+        return registry_state
+
+    @property
+    def metric_count(self) -> int:
+        return self._metric_count.value
+
+    @classmethod
+    def optional_counter(cls, metrics_registry, metric_name: str,
+                         labels: dict = None) -> Metric:
+        if metrics_registry is None:
+            return NULL_METRIC
+        return metrics_registry.counter(metric_name, labels)
+
+    @classmethod
+    def optional_gauge(cls, metrics_registry, metric_name: str,
+                       labels: dict = None) -> Metric:
+        if metrics_registry is None:
+            return NULL_METRIC
+        return metrics_registry.gauge(metric_name, labels)
+
+    @staticmethod
+    def queue_depth(message_queue) -> int:
+        # Multiprocessing queues can not report their size on every platform
+        try:
+            return message_queue.qsize()
+        except NotImplementedError:
+            return 0
+
+    def counter(self, metric_name: str, labels: dict = None) -> Metric:
+        return self._create_metric(metric_name, labels, self.COUNTER_TYPE)
+
+    def gauge(self, metric_name: str, labels: dict = None) -> Metric:
+        return self._create_metric(metric_name, labels, self.GAUGE_TYPE)
+
+    def get_value(self, metric_index: int) -> float:
+        return self._metric_values[metric_index]
+
+    def get_total(self, metric_key: str) -> float:
+        return self._metric_totals().get(metric_key, (None, 0.0))[1]
+
+    def add_value(self, metric_index: int, amount: float) -> None:
+        # Only threads of the process that owns the slot add to it
+        with self._slot_locks[metric_index]:
+            self._metric_values[metric_index] += amount
+        return
+
+    def set_value(self, metric_index: int, value: float) -> None:
+        self._metric_values[metric_index] = value
+        return
+
+    def slot_current(self, metric_index: int, metric_generation: int) -> bool:
+        return self._metric_generations[metric_index] == metric_generation
+
+    def writer_slot(self, metric_key: str, metric_type: bytes) -> (int, int):
+        metric_writer = os.getpid() if metric_type == self.COUNTER_TYPE \
+            else self.SHARED_WRITER
+
+        metric_index, metric_generation = self._key_indexes.get(
+            (metric_key, metric_writer), (-1, 0))
+
+        if metric_index < 0 or not self.slot_current(metric_index,
+                                                     metric_generation):
+            metric_index, metric_generation = self._register(
+                metric_key, metric_writer, metric_type)
+
+        if metric_index >= 0:
+            self._slot_locks.setdefault(metric_index, threading.Lock())
+
+        return metric_index, metric_generation
+
+    def release_key(self, metric_key: str) -> None:
+        # Metrics labelled per connection are released when it closes so the
+        # registry does not fill up. Every process's slot for the key goes,
+        # the new generation stops any process still holding one from using it
+        encoded_key = metric_key.encode()
+
+        with self._metric_count.get_lock():
+            for metric_index in range(self._metric_count.value):
+                if self._read_key(metric_index) != encoded_key:
+                    continue
+
+                key_start = metric_index * self.KEY_SIZE
+                self._metric_keys[key_start:key_start + self.KEY_SIZE] = \
+                    bytes(self.KEY_SIZE)
+                self._metric_values[metric_index] = 0.0
+                self._metric_generations[metric_index] += 1
+
+        for cache_key in [cache_key for cache_key in self._key_indexes
+                          if cache_key[0] == metric_key]:
+            self._key_indexes.pop(cache_key)
+        return
+
+    def snapshot(self) -> dict:
+        return {metric_key: metric_value for metric_key, (_, metric_value)
+                in self._metric_totals().items()}
+
+    def prometheus_text(self) -> str:
+        metric_groups = {}
+
+        # Every sample of a metric has to follow its TYPE line, labelled
+        # metrics registered later by other processes are grouped back in
+        for metric_key, (metric_type, metric_value) in \
+                self._metric_totals().items():
+            metric_name = metric_key.split("{")[0]
+
+            if metric_name not in metric_groups:
+                type_name = "counter" if metric_type == self.COUNTER_TYPE \
+                    else "gauge"
+                metric_groups[metric_name] = ["# TYPE %s %s" % (metric_name,
+                                                                type_name)]
+
+            metric_groups[metric_name].append("%s %r" % (metric_key,
+                                                         metric_value))
+
+        metric_lines = [metric_line for metric_group in metric_groups.values()
+                        for metric_line in metric_group]
+        return "\n".join(metric_lines) + "\n"
+
+    def _create_metric(self, metric_name: str, labels: dict,
+                       metric_type: bytes) -> Metric:
+        metric_key = self._metric_key(metric_name, labels)
+
+        if len(metric_key.encode()) >= self.KEY_SIZE:
+            raise ValueError("Metric key too long: %s" % metric_key)
+
+        # Registered now so the metric is listed before anything is recorded
+        self.writer_slot(metric_key, metric_type)
+        return Metric(self, metric_key, metric_type)
+
+    def _register(self, metric_key: str, metric_writer: int,
+                  metric_type: bytes) -> (int, int):
+        encoded_key = metric_key.encode()
+
+        with self._metric_count.get_lock():
+            metric_index = self._find_slot(encoded_key, metric_writer)
+
+            # Released slots are used again before the registry grows
+            if metric_index < 0:
+                metric_index = self._find_slot(b'')
+
+                if metric_index < 0 and \
+                        self._metric_count.value < self._max_metrics:
+                    metric_index = self._metric_count.value
+                    self._metric_count.value += 1
+
+                if metric_index >= 0:
+                    key_start = metric_index * self.KEY_SIZE
+                    self._metric_keys[key_start:key_start +
+                                      len(encoded_key)] = encoded_key
+                    self._metric_types[metric_index] = metric_type
+                    self._metric_writers[metric_index] = metric_writer
+                    self._metric_values[metric_index] = 0.0
+                    self._metric_generations[metric_index] += 1
+
+            metric_generation = self._metric_generations[metric_index] \
+                if metric_index >= 0 else 0
+
+        # A full registry hands out metrics that record nothing
+        if metric_index >= 0:
+            self._key_indexes[(metric_key, metric_writer)] = \
+                (metric_index, metric_generation)
+        else:
+            print("Metrics registry is full, not recording: ", metric_key)
+
+        return metric_index, metric_generation
+
+    def _find_slot(self, encoded_key: bytes, metric_writer: int = None) -> int:
+        for metric_index in range(self._metric_count.value):
+            if self._read_key(metric_index) == encoded_key and \
+                    metric_writer in (None,
+                                      self._metric_writers[metric_index]):
+                return metric_index
+        return -1
+
+    def _read_key(self, metric_index: int) -> bytes:
+        key_start = metric_index * self.KEY_SIZE
+        return self._metric_keys[key_start:key_start +
+                                 self.KEY_SIZE].split(b'\x00')[0]
+
+    def _metric_entries(self):
+        for metric_index in range(self._metric_count.value):
+            metric_key = self._read_key(metric_index)
+            if metric_key:
+                yield (metric_index, metric_key.decode(),
+                       self._metric_types[metric_index])
+
+    def _metric_totals(self) -> dict:
+        # A counter is the sum of the slots of every process that added to it
+        metric_totals = {}
+        for metric_index, metric_key, metric_type in self._metric_entries():
+            metric_total = metric_totals.get(metric_key, (metric_type, 0.0))[1]
+            metric_totals[metric_key] = (
+                metric_type, metric_total + self._metric_values[metric_index])
+        return metric_totals
+
+    def _metric_key(self, metric_name: str, labels: dict) -> str:
+        metric_key = self.METRIC_PREFIX + metric_name
+
+        if labels:
+            label_list = ['%s="%s"' % (label_name, str(label_value).replace(
+                '"', "'")) for label_name, label_value in sorted(
+                labels.items())]
+            metric_key += "{" + ",".join(label_list) + "}"
+
+        return metric_key
+
+# ***************************Metrics HTTP Server***************************** #
+
+
+class MetricsHttpServer(threading.Thread):
+    THREAD_NAME: str = "Metrics HTTP Server"
+
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9520
+
+    TEXT_PATH: str = "/metrics"
+    JSON_PATH: str = "/metrics.json"
+
+    def __init__(self,
+                 metrics_registry: MetricsRegistry,
+                 metrics_port: int = METRICS_PORT,
+                 metrics_host: str = METRICS_HOST):
+        threading.Thread.__init__(self, name=self.THREAD_NAME, daemon=True)
+
+        metrics_registry_ref = metrics_registry
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == MetricsHttpServer.TEXT_PATH:
+                    response_body = metrics_registry_ref.prometheus_text()
+                    content_type = "text/plain; version=0.0.4"
+
+                elif self.path == MetricsHttpServer.JSON_PATH:
+                    response_body = json.dumps(
+                        metrics_registry_ref.snapshot())
+                    content_type = "application/json"
+
+                else:
+                    self.send_error(404)
+                    return
+
+                response_data = response_body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(response_data)))
+                self.end_headers()
+                self.wfile.write(response_data)
+                return
+
+            def log_message(self, log_format, *log_args):
+                return
+
+        self._http_server = ThreadingHTTPServer((metrics_host, metrics_port),
+                                                MetricsRequestHandler)
+        return
+
+    @property
+    def server_port(self) -> int:
+        return self._http_server.server_address[1]
+
+    def run(self):
+        self._http_server.serve_forever()
+        return
+
+    def stop(self) -> None:
+        self._http_server.shutdown()
+        self._http_server.server_close()
+        return
@@ -0,0 +1,320 @@
+# packet_protocol.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# The wire format shared by the server and clients. Control messages stay as
+# length prefixed JSON while audio frames can be sent as a fixed binary header
+# followed by the raw PCM bytes once both sides agree on it at connect time.
+# The audio payload can also be run through a codec the client offered and is
+# sent in the sample rate and channel count of the client's device. Servers
+# are found with a single JSON datagram that they answer with how to connect
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import json
+import struct
+
+# The local libraries
+from network_audio_classes import constants
+from network_audio_classes import audio_codec
+
+# ****************************Protocol Constants***************************** #
+
+PACKET_MAGIC: int = 0xA5
+PROTOCOL_VERSION: int = 2
+
+AUDIO_PACKET_TYPE: int = 1
+
+# magic, version, packet type, codec id, sequence, timestamp, presentation
+# time and the payload length. Both times are on the server monotonic clock
+# in ns
+HEADER_STRUCT: struct.Struct = struct.Struct("!BBBBIQQI")
+HEADER_SIZE: int = HEADER_STRUCT.size
+
+SEQUENCE_MASK: int = 0xFFFFFFFF
+TIMESTAMP_MASK: int = 0xFFFFFFFFFFFFFFFF
+
+MIN_SAMPLE_RATE: int = 8000
+MAX_SAMPLE_RATE: int = 192000
+SUPPORTED_CHANNELS: list = [1, 2]
+
+LATENCY_PROFILES: list = [constants.LOW_LATENCY_PROFILE,
+                          constants.BALANCED_PROFILE,
+                          constants.EFFICIENT_PROFILE]
+
+# ****************************Protocol Functions***************************** #
+
+
+def is_audio_message(message: dict) -> bool:
+    return constants.AUDIO_PAYLOAD_STR in message
+
+
+def is_outgoing_audio(outgoing_message) -> bool:
+    # Audio is queued for a client already encoded, everything else is a
+    # control message unless it is an audio message that was not encoded
+    return isinstance(outgoing_message, bytes) or \
+        is_audio_message(outgoing_message)
+
+
+def create_handshake(binary_audio: bool = True, codecs: list = None,
+                     zone: str = constants.DEFAULT_ZONE,
+                     sample_rate: int = constants.AUDIO_RATE,
+                     channels: int = constants.AUDIO_CHANNELS,
+                     latency_profile: str = constants.BALANCED_PROFILE) -> dict:
+    if codecs is None:
+        codecs = [audio_codec.PcmCodec.CODEC_NAME]
+
+    handshake = {constants.PROTOCOL_VERSION_STR: PROTOCOL_VERSION,
+                 constants.BINARY_AUDIO_STR: binary_audio,
+                 constants.CODECS_STR: list(codecs),
+                 constants.ZONE_STR: zone,
+                 constants.SAMPLE_RATE_STR: sample_rate,
+                 constants.CHANNELS_STR: channels,
+                 constants.LATENCY_PROFILE_STR: latency_profile}
+    return {constants.HANDSHAKE_STR: handshake}
+
+
+def create_stream_info(frame_size: int = constants.AUDIO_FRAME_SIZE,
+                       playout_delay: float = 0.0) -> dict:
+    # How the server streams, the client fits its buffering around it
+    return {constants.FRAME_SIZE_STR: frame_size,
+            constants.PLAYOUT_DELAY_STR: playout_delay}
+
+
+def create_discovery_request(request_id: int, zone: str = None) -> dict:
+    discovery_request = {constants.REQUEST_ID_STR: request_id}
+    if zone is not None:
+        discovery_request[constants.ZONE_STR] = zone
+    return {constants.DISCOVER_STR: discovery_request}
+
+
+def create_server_info(server_name: str, server_port: int, zones: list,
+                       stream_info: dict = None) -> dict:
+    # Everything a client needs to pick a server and connect to it, the
+    # address is taken from where the reply came from
+    server_info = {constants.PROTOCOL_VERSION_STR: PROTOCOL_VERSION,
+                   constants.SERVER_NAME_STR: server_name,
+                   constants.SERVER_PORT_STR: server_port,
+                   constants.ZONES_STR: list(zones),
+                   constants.CODECS_STR: audio_codec.available_codecs()}
+    server_info.update(stream_info or create_stream_info())
+    return server_info
+
+
+def answer_discovery(discovery_request: dict, server_info: dict) -> dict:
+    # None when the client asked for a zone this server does not have
+    zone = discovery_request.get(constants.ZONE_STR)
+    if zone is not None and zone not in server_info[constants.ZONES_STR]:
+        return None
+
+    server_reply = dict(server_info)
+    server_reply[constants.REQUEST_ID_STR] = \
+        discovery_request.get(constants.REQUEST_ID_STR)
+    return {constants.SERVER_INFO_STR: server_reply}
+
+
+def decode_datagram(datagram: bytes) -> dict:
+    try:
+        message = json.loads(datagram)
+
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {}
+
+    if not isinstance(message, dict):
+        return {}
+    return message
+
+
+def negotiate_handshake(handshake: dict, stream_info: dict = None) -> dict:
+    assert isinstance(handshake, dict)
+    version = handshake.get(constants.PROTOCOL_VERSION_STR)
+    binary_audio = bool(handshake.get(constants.BINARY_AUDIO_STR))
+
+    sample_rate, channels = negotiate_audio_format(
+        handshake.get(constants.SAMPLE_RATE_STR),
+        handshake.get(constants.CHANNELS_STR))
+
+    latency_profile = handshake.get(constants.LATENCY_PROFILE_STR)
+    if latency_profile not in LATENCY_PROFILES:
+        latency_profile = constants.BALANCED_PROFILE
+
+    session = {constants.PROTOCOL_VERSION_STR: PROTOCOL_VERSION,
+               constants.BINARY_AUDIO_STR:
+                   binary_audio and version == PROTOCOL_VERSION,
+               constants.CODEC_STR: negotiate_codec(
+                   handshake.get(constants.CODECS_STR)),
+               constants.ZONE_STR: str(handshake.get(constants.ZONE_STR,
+                                                     constants.DEFAULT_ZONE)),
+               constants.SAMPLE_RATE_STR: sample_rate,
+               constants.CHANNELS_STR: channels,
+               constants.LATENCY_PROFILE_STR: latency_profile}
+    session.update(stream_info or create_stream_info())
+    return session
+
+
+def supported_audio_format(sample_rate: int, channels: int) -> bool:
+    return (isinstance(sample_rate, int) and
+            MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE and
+            channels in SUPPORTED_CHANNELS)
+
+
+def negotiate_audio_format(sample_rate: int, channels: int) -> (int, int):
+    # Clients that do not say or ask for something the server can not make
+    # get the source format
+    if supported_audio_format(sample_rate, channels):
+        return sample_rate, channels
+
+    return constants.AUDIO_RATE, constants.AUDIO_CHANNELS
+
+
+def negotiate_codec(codecs: list) -> str:
+    # The first codec the client offered that this side can also run
+    available_codecs = audio_codec.available_codecs()
+
+    for codec_name in codecs or []:
+        if codec_name in available_codecs:
+            return codec_name
+
+    return audio_codec.PcmCodec.CODEC_NAME
+
+
+def encode_json_message(message: dict, with_len: bool = True) -> bytes:
+    serialized_data = json.dumps(json_safe_message(message)).encode()
+    if with_len:
+        serialized_data = b'%d\n' % len(serialized_data) + serialized_data
+    return serialized_data
+
+
+def json_safe_message(message: dict) -> dict:
+    audio_payload = message.get(constants.AUDIO_PAYLOAD_STR)
+    if isinstance(audio_payload, (bytes, bytearray, memoryview)):
+        message = dict(message)
+        message[constants.AUDIO_PAYLOAD_STR] = list(audio_payload)
+    return message
+
+
+def encode_audio_payload(message: dict, codec_name: str,
+                         channels: int = constants.AUDIO_CHANNELS,
+                         stream_codecs: dict = None) -> dict:
+    if codec_name == audio_codec.PcmCodec.CODEC_NAME:
+        return message
+
+    if stream_codecs is None:
+        codec = audio_codec.get_codec(codec_name, channels)
+    else:
+        codec = audio_codec.get_stream_codec(stream_codecs, codec_name,
+                                             channels)
+
+    encoded_message = dict(message)
+    encoded_message[constants.AUDIO_PAYLOAD_STR] = codec.encode(
+        message[constants.AUDIO_PAYLOAD_STR])
+    encoded_message[constants.CODEC_STR] = codec_name
+    return encoded_message
+
+
+def encode_audio_packet(message: dict) -> bytes:
+    audio_payload = message[constants.AUDIO_PAYLOAD_STR]
+    codec_name = message.get(constants.CODEC_STR,
+                             audio_codec.PcmCodec.CODEC_NAME)
+    codec_id = audio_codec.get_codec_id(codec_name)
+    sequence = message.get(constants.SEQUENCE_STR, 0) & SEQUENCE_MASK
+    timestamp = message.get(constants.TIMESTAMP_STR, 0) & TIMESTAMP_MASK
+    presentation_time = message.get(constants.PRESENTATION_TIME_STR, 0)
+    presentation_time &= TIMESTAMP_MASK
+
+    header = HEADER_STRUCT.pack(PACKET_MAGIC, PROTOCOL_VERSION,
+                                AUDIO_PACKET_TYPE, codec_id, sequence,
+                                timestamp, presentation_time,
+                                len(audio_payload))
+    return header + bytes(audio_payload)
+
+
+def encode_message(message: dict, wire_format: tuple,
+                   stream_codecs: dict = None) -> bytes:
+    # Audio has to already be in the wire format's rate and channels, the
+    # server converts it once per format before encoding
+    binary_audio, codec_name, _, channels = wire_format
+
+    if is_audio_message(message):
+        message = encode_audio_payload(message, codec_name, channels,
+                                       stream_codecs)
+
+    if binary_audio and is_audio_message(message):
+        encoded_message = encode_audio_packet(message)
+    else:
+        encoded_message = encode_json_message(message)
+    return encoded_message
+
+
+def session_wire_format(session: dict) -> tuple:
+    return ((bool(session.get(constants.BINARY_AUDIO_STR)),
+             session.get(constants.CODEC_STR,
+                         audio_codec.PcmCodec.CODEC_NAME)) +
+            session_audio_format(session))
+
+
+def session_audio_format(session: dict) -> (int, int):
+    return (session.get(constants.SAMPLE_RATE_STR, constants.AUDIO_RATE),
+            session.get(constants.CHANNELS_STR, constants.AUDIO_CHANNELS))
+
+
+def session_zone(session: dict) -> str:
+    return session.get(constants.ZONE_STR, constants.DEFAULT_ZONE)
+
+
+def session_frame_size(session: dict) -> int:
+    return session.get(constants.FRAME_SIZE_STR, constants.AUDIO_FRAME_SIZE)
+
+
+def session_playout_delay(session: dict) -> float:
+    return session.get(constants.PLAYOUT_DELAY_STR, 0.0)
+
+
+def session_negotiated(session: dict) -> bool:
+    return constants.PROTOCOL_VERSION_STR in session
+
+
+def encode_once(message: dict, wire_format_list: list,
+                stream_codecs: dict = None) -> dict:
+    encoded_messages = {}
+    codec_messages = {}
+
+    # Each codec only runs once per frame no matter how many wire formats
+    # share it, the message is already in the wire formats' audio format
+    for wire_format in wire_format_list:
+        if wire_format not in encoded_messages:
+            binary_audio, codec_name, sample_rate, channels = wire_format
+            codec_key = (codec_name, channels)
+
+            if codec_key not in codec_messages and is_audio_message(message):
+                codec_messages[codec_key] = encode_audio_payload(
+                    message, codec_name, channels, stream_codecs)
+
+            codec_message = codec_messages.get(codec_key, message)
+            encoded_messages[wire_format] = encode_message(
+                codec_message, (binary_audio, audio_codec.PcmCodec.CODEC_NAME,
+                                sample_rate, channels))
+
+    return encoded_messages
+
+
+def decode_header(header: bytes) -> (int, int, int, int, int, int):
+    (magic, version, packet_type, codec_id, sequence, timestamp,
+     presentation_time, payload_len) = HEADER_STRUCT.unpack(header)
+
+    if magic != PACKET_MAGIC or version != PROTOCOL_VERSION:
+        raise ValueError("Unsupported packet header")
+
+    return (packet_type, codec_id, sequence, timestamp, presentation_time,
+            payload_len)
+
+
+def decode_audio_packet(codec_id: int, sequence: int, timestamp: int,
+                        presentation_time: int, audio_payload: bytes) -> dict:
+    audio_message = {constants.AUDIO_PAYLOAD_STR: audio_payload,
+                     constants.CODEC_STR: audio_codec.get_codec_name(codec_id),
+                     constants.SEQUENCE_STR: sequence,
+                     constants.TIMESTAMP_STR: timestamp,
+                     constants.PRESENTATION_TIME_STR: presentation_time}
+    return audio_message
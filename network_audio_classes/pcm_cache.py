@@ -0,0 +1,182 @@
+# pcm_cache.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# An on disk cache of decoded PCM so a track only goes through the decoder
+# the first time it is played. Cached tracks are memory mapped and handed out
+# as memoryview frames, the least recently played ones are evicted once the
+# cache grows past its size limit
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import os
+import mmap
+import hashlib
+import tempfile
+
+# The local libraries
+from network_audio_classes import constants
+
+# *****************************Cached Track********************************** #
+
+
+class CachedTrack:
+
+    def __init__(self, cache_path: str,
+                 frame_byte_size: int = constants.AUDIO_BYTE_FRAME_SIZE):
+        self._frame_byte_size: int = frame_byte_size
+
+        with open(cache_path, "rb") as cache_file:
+            self._track_map = mmap.mmap(cache_file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+
+        self._track_view: memoryview = memoryview(self._track_map)
+        self._frame_count: int = len(self._track_view) // frame_byte_size
+        return
+
+    @property
+    def frame_count(self) -> int:
+        return self._frame_count
+
+    def frame(self, frame_index: int) -> memoryview:
+        frame_start = frame_index * self._frame_byte_size
+        return self._track_view[frame_start:frame_start +
+                                self._frame_byte_size]
+
+    def frames(self, start_frame: int = 0):
+        for frame_index in range(start_frame, self._frame_count):
+            yield self.frame(frame_index)
+
+    def close(self) -> None:
+        # Frames still held elsewhere keep the map open until they are freed
+        try:
+            self._track_view.release()
+            self._track_map.close()
+        except BufferError:
+            pass
+        return
+
+# *****************************PCM Cache Writer****************************** #
+
+
+class PcmCacheWriter:
+
+    def __init__(self, pcm_cache, cache_key: str):
+        self._pcm_cache = pcm_cache
+        self._cache_path: str = pcm_cache.cache_path(cache_key)
+
+        # Every writer gets its own temp file, two servers or zones decoding
+        # the same track only race on the rename into place
+        temp_descriptor, self._temp_path = tempfile.mkstemp(
+            suffix=PcmCache.TEMP_EXTENSION, prefix=cache_key + ".",
+            dir=os.path.dirname(self._cache_path))
+
+        self._temp_file = os.fdopen(temp_descriptor, "wb")
+        return
+
+    def write(self, audio_frame: bytes) -> None:
+        self._temp_file.write(audio_frame)
+        return
+
+    def commit(self) -> None:
+        if self._temp_file is None:
+            return
+
+        # An empty track can not be memory mapped so it is never cached
+        if self._temp_file.tell() == 0:
+            self.discard()
+            return
+
+        self._temp_file.close()
+        self._temp_file = None
+
+        os.replace(self._temp_path, self._cache_path)
+        self._pcm_cache.evict()
+        return
+
+    def discard(self) -> None:
+        if self._temp_file is None:
+            return
+
+        self._temp_file.close()
+        self._temp_file = None
+
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
+        return
+
+# ********************************PCM Cache********************************** #
+
+
+class PcmCache:
+    CACHE_FOLDER: str = ".pcm_cache"
+    MAX_CACHE_SIZE: int = 1 << 30
+
+    CACHE_EXTENSION: str = ".pcm"
+    TEMP_EXTENSION: str = ".tmp"
+
+    def __init__(self,
+                 cache_folder: str = CACHE_FOLDER,
+                 max_cache_size: int = MAX_CACHE_SIZE,
+                 frame_byte_size: int = constants.AUDIO_BYTE_FRAME_SIZE):
+        assert max_cache_size > 0
+
+        self._cache_folder: str = cache_folder
+        self._max_cache_size: int = max_cache_size
+        self._frame_byte_size: int = frame_byte_size
+
+        os.makedirs(cache_folder, exist_ok=True)
+        return
+
+    @property
+    def cache_size(self) -> int:
+        return sum(os.path.getsize(cache_path)
+                   for cache_path in self._cache_file_list())
+
+    def cache_key(self, file_path: str) -> str:
+        file_stat = os.stat(file_path)
+
+        key_fields = (os.path.abspath(file_path), file_stat.st_mtime_ns,
+                      file_stat.st_size, constants.AUDIO_RATE,
+                      constants.AUDIO_CHANNELS, constants.AUDIO_SEG_WIDTH,
+                      self._frame_byte_size)
+        return hashlib.sha256(repr(key_fields).encode()).hexdigest()
+
+    def cache_path(self, cache_key: str) -> str:
+        return os.path.join(self._cache_folder,
+                            cache_key + self.CACHE_EXTENSION)
+
+    def open_track(self, file_path: str) -> CachedTrack:
+        cache_path = self.cache_path(self.cache_key(file_path))
+
+        if not os.path.exists(cache_path):
+            return None
+
+        # Touching the file marks it as recently played for the eviction
+        os.utime(cache_path)
+        return CachedTrack(cache_path, self._frame_byte_size)
+
+    def create_writer(self, file_path: str) -> PcmCacheWriter:
+        return PcmCacheWriter(self, self.cache_key(file_path))
+
+    def evict(self) -> None:
+        cache_file_list = sorted(self._cache_file_list(),
+                                 key=os.path.getmtime)
+        cache_size = sum(os.path.getsize(cache_path)
+                         for cache_path in cache_file_list)
+
+        # The newest track always stays even if it is over the limit alone
+        while cache_size > self._max_cache_size and len(cache_file_list) > 1:
+            cache_path = cache_file_list.pop(0)
+            cache_size -= os.path.getsize(cache_path)
+            os.remove(cache_path)
+
+        return
+
+    def _cache_file_list(self) -> list:
+        return [os.path.join(self._cache_folder, file_name)
+                for file_name in os.listdir(self._cache_folder)
+                if file_name.endswith(self.CACHE_EXTENSION)]
@@ -0,0 +1,239 @@
+# server_discovery.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# Finding servers without knowing their address. The server answers discovery
+# datagrams sent to the broadcast address or the discovery multicast group
+# with how to connect to it, so a client is ready to connect one round trip
+# after it powers on
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import random
+import socket
+import struct
+import threading
+
+# The local libraries
+from network_audio_classes import constants
+from network_audio_classes import packet_protocol
+from network_audio_classes.metrics_registry import MetricsRegistry
+
+# ***************************Discovery Responder***************************** #
+
+
+class DiscoveryResponder(threading.Thread):
+    THREAD_NAME: str = "Discovery Responder Thread"
+
+    SOCKET_TIMEOUT: float = .5
+    MAX_DATAGRAM_SIZE: int = 4096
+
+    def __init__(self,
+                 server_info: dict,
+                 port: int = constants.AUDIO_DISCOVERY_PORT,
+                 group: str = constants.DISCOVERY_GROUP,
+                 metrics: MetricsRegistry = None):
+        assert isinstance(server_info, dict)
+
+        threading.Thread.__init__(self, name=self.THREAD_NAME, daemon=True)
+
+        self._server_info: dict = server_info
+
+        # Bound here so a port that is already taken shows up to whoever
+        # starts the responder
+        self._responder_socket: socket.socket = self.create_socket(port, group)
+
+        self._thread_running: bool = True
+
+        self._request_metric = MetricsRegistry.optional_counter(
+            metrics, "discovery_requests_total")
+        self._reply_metric = MetricsRegistry.optional_counter(
+            metrics, "discovery_replies_total")
+        return
+
+    def run(self):
+        while self._thread_running:
+            try:
+                datagram, client_address = self._responder_socket.recvfrom(
+                    self.MAX_DATAGRAM_SIZE)
+                self._handle_datagram(datagram, client_address)
+
+            except socket.timeout:
+                pass
+
+            except OSError:
+                self._thread_running = False
+
+        self._responder_socket.close()
+        return
+
+    def stop(self) -> None:
+        self._thread_running = False
+        self.join()
+        return
+
+    @property
+    def server_info(self) -> dict:
+        return dict(self._server_info)
+
+    @property
+    def thread_running(self) -> bool:
+        return self._thread_running
+
+    @classmethod
+    def create_socket(cls, port: int, group: str) -> socket.socket:
+        responder_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        responder_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        responder_socket.bind(("", port))
+        responder_socket.settimeout(cls.SOCKET_TIMEOUT)
+
+        # Broadcasts still get through on hosts without a multicast route
+        try:
+            membership = struct.pack("4s4s", socket.inet_aton(group),
+                                     socket.inet_aton("0.0.0.0"))
+            responder_socket.setsockopt(socket.IPPROTO_IP,
+                                        socket.IP_ADD_MEMBERSHIP, membership)
+
+        except OSError as group_err:
+            print("Discovery responder could not join the group: ", group_err)
+
+        return responder_socket
+
+    def _handle_datagram(self, datagram: bytes, client_address: tuple) -> None:
+        discovery_request = packet_protocol.decode_datagram(datagram).get(
+            constants.DISCOVER_STR)
+
+        if not isinstance(discovery_request, dict):
+            return
+
+        self._request_metric.inc()
+
+        server_reply = packet_protocol.answer_discovery(discovery_request,
+                                                        self._server_info)
+        if server_reply is not None:
+            self._responder_socket.sendto(
+                packet_protocol.encode_json_message(server_reply, False),
+                client_address)
+            self._reply_metric.inc()
+
+        return
+
+# ****************************Discovery Client******************************* #
+
+
+class DiscoveryClient:
+    DISCOVERY_TIMEOUT: float = 1.0
+    RETRY_INTERVAL: float = .25
+    MAX_DATAGRAM_SIZE: int = 4096
+
+    BROADCAST_ADDRESS: str = "255.255.255.255"
+    LOOPBACK_ADDRESS: str = "127.0.0.1"
+    MULTICAST_TTL: int = 1
+
+    def __init__(self,
+                 port: int = constants.AUDIO_DISCOVERY_PORT,
+                 addresses: list = None):
+        # A server on this host is asked directly as well, broadcasts do not
+        # reach it when there is no network up
+        if addresses is None:
+            addresses = [self.BROADCAST_ADDRESS, constants.DISCOVERY_GROUP,
+                         self.LOOPBACK_ADDRESS]
+
+        self._port: int = port
+        self._addresses: list = list(addresses)
+        return
+
+    def discover(self, zone: str = None,
+                 timeout: float = DISCOVERY_TIMEOUT) -> dict:
+        # The first server to answer, None if none did before the timeout
+        server_info_list = self._discover(zone, timeout, True)
+        if not server_info_list:
+            return None
+        return server_info_list[0]
+
+    def discover_all(self, zone: str = None,
+                     timeout: float = DISCOVERY_TIMEOUT) -> list:
+        return self._discover(zone, timeout, False)
+
+    @staticmethod
+    def server_address(server_info: dict) -> (str, int):
+        return (server_info[constants.SERVER_IP_STR],
+                server_info[constants.SERVER_PORT_STR])
+
+    def _create_socket(self) -> socket.socket:
+        discovery_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        discovery_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        discovery_socket.setsockopt(socket.IPPROTO_IP,
+                                    socket.IP_MULTICAST_TTL,
+                                    self.MULTICAST_TTL)
+        discovery_socket.bind(("", 0))
+        return discovery_socket
+
+    def _send_request(self, discovery_socket: socket.socket,
+                      request_data: bytes) -> None:
+        for address in self._addresses:
+            try:
+                discovery_socket.sendto(request_data, (address, self._port))
+
+            except OSError:
+                pass
+
+        return
+
+    def _discover(self, zone: str, timeout: float, first_only: bool) -> list:
+        request_id = random.getrandbits(32)
+        request_data = packet_protocol.encode_json_message(
+            packet_protocol.create_discovery_request(request_id, zone), False)
+
+        server_info_list = []
+        server_key_list = []
+
+        discovery_socket = self._create_socket()
+
+        # The request is sent again in case a datagram was lost, a server
+        # that answers more than once or on more than one address is only
+        # listed once with the address that answered first
+        end_time = time.monotonic() + timeout
+        send_time = time.monotonic()
+
+        try:
+            while time.monotonic() < end_time:
+                if time.monotonic() >= send_time:
+                    self._send_request(discovery_socket, request_data)
+                    send_time += self.RETRY_INTERVAL
+
+                discovery_socket.settimeout(max(
+                    min(end_time, send_time) - time.monotonic(), 0.001))
+
+                try:
+                    datagram, server_address = discovery_socket.recvfrom(
+                        self.MAX_DATAGRAM_SIZE)
+
+                except socket.timeout:
+                    continue
+
+                server_info = packet_protocol.decode_datagram(datagram).get(
+                    constants.SERVER_INFO_STR)
+
+                if not isinstance(server_info, dict) or \
+                        server_info.get(constants.REQUEST_ID_STR) != request_id:
+                    continue
+
+                server_key = (server_info.get(constants.SERVER_NAME_STR),
+                              server_info.get(constants.SERVER_PORT_STR))
+                if server_key in server_key_list:
+                    continue
+
+                server_info[constants.SERVER_IP_STR] = server_address[0]
+                server_info_list.append(server_info)
+                server_key_list.append(server_key)
+
+                if first_only:
+                    break
+
+        finally:
+            discovery_socket.close()
+
+        return server_info_list
@@ -7,6 +7,7 @@
 # **********************************Import*********************************** #
 
 # The global libraries built into python
+import time
 import queue
 import ctypes
 import socket
@@ -15,7 +16,11 @@ import multiprocessing
 
 # The local libraries
 from network_audio_classes import constants
+from network_audio_classes import packet_protocol
+from network_audio_classes.format_converter import FormatConverter
+from network_audio_classes.server_discovery import DiscoveryResponder
 from network_audio_classes.client_socket_thread import ClientSocketThread
+from network_audio_classes.metrics_registry import MetricsRegistry
 
 # *************************Server Network Process*************************** #
 
@@ -30,40 +35,144 @@ class ServerNetworkProcess(multiprocessing.Process):
     IP_TEST_INDEX: int = 0
     IP_DEFAULT_ADDRESS: str = "127.0.0.1"
 
+    # Every interface so clients can use whichever address found the server
+    SERVER_BIND_ADDRESS: str = ""
+
     GET_TIME: float = 1.0
     SOCKET_BACKLOG: int = 5
     SOCKET_TIMEOUT: float = 1.0
 
-    def __init__(self):
+    CLIENT_QUEUE_DEPTH: int = 10
+    PLAYOUT_DELAY: float = .1
+
+    ZONE_ASSERT: str = "Audio packets must be sent to one of the server zones"
+
+    def __init__(self,
+                 slow_client_policy: str = constants.SLOW_CLIENT_DROP_OLDEST,
+                 client_queue_depth: int = CLIENT_QUEUE_DEPTH,
+                 playout_delay: float = PLAYOUT_DELAY,
+                 zones: list = None,
+                 metrics: MetricsRegistry = None,
+                 frame_size: int = constants.AUDIO_FRAME_SIZE,
+                 discovery: bool = True):
         multiprocessing.Process.__init__(self, name=self.PROCESS_NAME)
 
+        assert playout_delay > 0
+        assert isinstance(frame_size, int) and frame_size > 0
+
+        # The frame size every zone streams in, clients are told it and the
+        # playout delay when they connect and buffer around them
+        self._frame_size: int = frame_size
+        self._stream_info: dict = packet_protocol.create_stream_info(
+            frame_size, playout_delay)
+
+        # Every zone is its own stream with its own queue, sequence numbers
+        # and presentation times that only goes out to that zone's clients
+        self._zones: list = list(zones or [constants.DEFAULT_ZONE])
+
+        # Only used by the process adding audio packets
+        self._playout_delay_ns: int = int(playout_delay * 1e9)
+        self._next_presentation_time: dict = dict.fromkeys(self._zones, 0)
+        self._next_sequence: dict = dict.fromkeys(self._zones, 0)
+
+        # Only used by each zone's send thread, a converter per audio format
+        # the zone's clients play that is not the source format
+        self._format_converters: dict = {zone: {} for zone in self._zones}
+
+        # Also only used by each zone's send thread, the zone's own codecs so
+        # an encoder's state never carries over from another zone's audio
+        self._zone_codecs: dict = {zone: {} for zone in self._zones}
+
+        assert slow_client_policy in constants.SLOW_CLIENT_POLICIES
+        assert isinstance(client_queue_depth, int) and client_queue_depth > 0
+
+        self._slow_client_policy: str = slow_client_policy
+        self._client_queue_depth: int = client_queue_depth
+
         self._client_thread_list: list = []
 
+        # Threads that have stopped running but may not have exited yet
+        self._closing_thread_list: list = []
+
         self._incoming_message_queue = multiprocessing.Queue(self.QUEUE_DEPTH)
-        self._outgoing_message_queue = multiprocessing.Queue(self.QUEUE_DEPTH)
+        self._outgoing_message_queues: dict = {
+            zone: multiprocessing.Queue(self.QUEUE_DEPTH)
+            for zone in self._zones}
 
         self._server_ip: str = ""
 
-        self._server_socket: socket.socket = socket.socket()
+        self._server_socket: socket.socket
+        self._server_socket = None
+
+        # Answers clients looking for a server once the socket is listening
+        self._discovery: bool = discovery
+        self._discovery_responder: DiscoveryResponder
+        self._discovery_responder = None
 
         self._server_running = multiprocessing.Value(ctypes.c_bool, True)
         self._clients_connected = multiprocessing.Value(ctypes.c_uint64, 0)
+
+        self._packets_dropped = multiprocessing.Value(ctypes.c_uint64, 0)
+
+        self._packets_serialized = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._serialization_time = multiprocessing.Value(ctypes.c_uint64, 0)
+
+        # Shared with the client threads and whatever serves the metrics
+        if metrics is None:
+            metrics = MetricsRegistry()
+
+        self._metrics: MetricsRegistry = metrics
+
+        self._clients_metric = metrics.gauge("server_clients_connected")
+        self._queue_depth_metrics: dict = {
+            zone: metrics.gauge("server_queue_depth", {"zone": zone})
+            for zone in self._zones}
+        self._overwritten_metrics: dict = {
+            zone: metrics.counter("server_queue_overwritten_total",
+                                  {"zone": zone})
+            for zone in self._zones}
+        self._dropped_metrics: dict = {
+            zone: metrics.counter("server_packets_dropped_total",
+                                  {"zone": zone})
+            for zone in self._zones}
+        self._serialized_metrics: dict = {
+            zone: metrics.counter("server_packets_serialized_total",
+                                  {"zone": zone})
+            for zone in self._zones}
+        self._serialization_metrics: dict = {
+            zone: metrics.counter("server_serialization_seconds_total",
+                                  {"zone": zone})
+            for zone in self._zones}
+        self._conversion_metrics: dict = {
+            zone: metrics.counter("server_conversion_seconds_total",
+                                  {"zone": zone})
+            for zone in self._zones}
         return
 
     def run(self):
 
-        send_message_thread = threading.Thread(target=self._send_thread())
-        send_message_thread.start()
+        send_message_thread_list = [
+            threading.Thread(target=self._send_thread, args=(zone,))
+            for zone in self._zones]
+
+        for send_message_thread in send_message_thread_list:
+            send_message_thread.start()
 
         while self._server_running.value:
             self._check_for_new_clients()
 
             self._close_dead_client_threads()
 
-        send_message_thread.join()
+        for send_message_thread in send_message_thread_list:
+            send_message_thread.join()
+
+        self._stop_discovery_responder()
 
         self._close_dead_client_threads(force_close=True)
         self._clear_queues()
+
+        if self._server_socket is not None:
+            self._server_socket.close()
         return
 
     def stop(self):
@@ -71,43 +180,229 @@ class ServerNetworkProcess(multiprocessing.Process):
         self.join()
         return
 
-    def add_audio_packet(self, audio_packet: dict, wait: bool = True) -> None:
+    def add_audio_packet(self, audio_packet: dict, wait: bool = True,
+                         zone: str = constants.DEFAULT_ZONE) -> None:
         assert isinstance(wait, bool)
         assert isinstance(audio_packet, dict)
+        assert zone in self._outgoing_message_queues, self.ZONE_ASSERT
+
+        outgoing_message_queue = self._outgoing_message_queues[zone]
+
+        if constants.AUDIO_PAYLOAD_STR in audio_packet:
+            self._stamp_sequence(audio_packet, zone)
+            self._stamp_presentation_time(audio_packet, zone)
+
+            # Frames sliced out of the PCM cache are views, the queue pickles
+            # the payload so it gets copied once here
+            audio_payload = audio_packet[constants.AUDIO_PAYLOAD_STR]
+            if isinstance(audio_payload, memoryview):
+                audio_packet[constants.AUDIO_PAYLOAD_STR] = bytes(audio_payload)
 
         if wait:
-            self._outgoing_message_queue.put(audio_packet, True, self.GET_TIME)
+            outgoing_message_queue.put(audio_packet, True, self.GET_TIME)
 
         else:
-            if self._outgoing_message_queue.full():
-                self._outgoing_message_queue.get_nowait()
+            if outgoing_message_queue.full():
+                outgoing_message_queue.get_nowait()
+                self._overwritten_metrics[zone].inc()
 
-            self._outgoing_message_queue.put_nowait(audio_packet)
+            outgoing_message_queue.put_nowait(audio_packet)
 
         return
 
+    @property
+    def zones(self) -> list:
+        return list(self._zones)
+
+    @property
+    def frame_size(self) -> int:
+        return self._frame_size
+
+    @property
+    def server_info(self) -> dict:
+        return packet_protocol.create_server_info(
+            socket.gethostname(), constants.AUDIO_CLIENT_PORT, self._zones,
+            self._stream_info)
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self._metrics
+
     @property
     def clients_connected(self) -> bool:
         return self._clients_connected.value
 
-    def _send_thread(self) -> None:
+    @property
+    def packets_dropped(self) -> int:
+        return self._packets_dropped.value
 
-        while self._server_running.value:
-            try:
-                outgoing_message = self._outgoing_message_queue.get_nowait()
+    @property
+    def packets_serialized(self) -> int:
+        return self._packets_serialized.value
 
-                for client_thread in self._client_thread_list:
-                    try:
-                        client_thread.add_outgoing_message(outgoing_message)
+    @property
+    def average_serialization_time(self) -> float:
+        packets_serialized = self._packets_serialized.value
+        if packets_serialized == 0:
+            return 0.0
+        return self._serialization_time.value / packets_serialized / 1e9
+
+    def _stamp_sequence(self, audio_packet: dict, zone: str) -> None:
+        if constants.SEQUENCE_STR not in audio_packet:
+            audio_packet[constants.SEQUENCE_STR] = self._next_sequence[zone]
+            self._next_sequence[zone] = (self._next_sequence[zone] + 1) & \
+                packet_protocol.SEQUENCE_MASK
+        return
+
+    def _stamp_presentation_time(self, audio_packet: dict, zone: str) -> None:
+        if constants.PRESENTATION_TIME_STR in audio_packet:
+            return
+
+        # Frames play back to back unless the source has fallen more than
+        # half the playout delay behind, then the stream restarts later
+        current_time = time.monotonic_ns()
+        earliest_time = current_time + self._playout_delay_ns // 2
+
+        if self._next_presentation_time[zone] < earliest_time:
+            presentation_time = current_time + self._playout_delay_ns
+        else:
+            presentation_time = self._next_presentation_time[zone]
+
+        audio_payload = audio_packet[constants.AUDIO_PAYLOAD_STR]
+        sample_count = len(audio_payload) // constants.AUDIO_BYTE_PER_FRAME
+        frame_duration = sample_count * 1000000000 // constants.AUDIO_RATE
+
+        audio_packet[constants.PRESENTATION_TIME_STR] = presentation_time
+        self._next_presentation_time[zone] = presentation_time + frame_duration
+        return
+
+    def _encode_once(self, outgoing_message: dict, wire_format_list: list,
+                     zone: str = constants.DEFAULT_ZONE) -> dict:
+        format_messages = self._convert_once(
+            outgoing_message, [wire_format[2:]
+                               for wire_format in wire_format_list], zone)
+
+        start_time = time.perf_counter_ns()
+
+        encoded_messages = {}
+        for audio_format, format_message in format_messages.items():
+            encoded_messages.update(packet_protocol.encode_once(
+                format_message, [wire_format
+                                 for wire_format in wire_format_list
+                                 if wire_format[2:] == audio_format],
+                self._zone_codecs[zone]))
+
+        encode_time = time.perf_counter_ns() - start_time
+        # Every zone's send thread adds to the same totals
+        with self._serialization_time.get_lock():
+            self._serialization_time.value += encode_time
+        with self._packets_serialized.get_lock():
+            self._packets_serialized.value += 1
+
+        self._serialization_metrics[zone].inc(encode_time / 1e9)
+        self._serialized_metrics[zone].inc()
+        return encoded_messages
+
+    def _convert_once(self, outgoing_message: dict, audio_format_list: list,
+                      zone: str = constants.DEFAULT_ZONE) -> dict:
+        # Every audio format the zone's clients play is converted once per
+        # frame, the converters keep their filter state between frames
+        format_converters = self._format_converters[zone]
+        source_format = (constants.AUDIO_RATE, constants.AUDIO_CHANNELS)
+
+        for audio_format in list(format_converters):
+            if audio_format not in audio_format_list:
+                del format_converters[audio_format]
+
+        start_time = time.perf_counter_ns()
+
+        format_messages = {}
+        for audio_format in audio_format_list:
+            if audio_format in format_messages:
+                continue
+
+            if audio_format == source_format or \
+                    not packet_protocol.is_audio_message(outgoing_message):
+                format_messages[audio_format] = outgoing_message
+                continue
+
+            if audio_format not in format_converters:
+                format_converters[audio_format] = FormatConverter(
+                    *audio_format)
+
+            audio_data, time_offset = format_converters[audio_format].convert(
+                outgoing_message[constants.AUDIO_PAYLOAD_STR])
+
+            # The filter delay is taken out of the presentation time so every
+            # format plays in step with the source
+            format_message = dict(outgoing_message)
+            format_message[constants.AUDIO_PAYLOAD_STR] = audio_data
+            if constants.PRESENTATION_TIME_STR in format_message:
+                format_message[constants.PRESENTATION_TIME_STR] += time_offset
+            format_messages[audio_format] = format_message
+
+        if format_converters:
+            self._conversion_metrics[zone].inc(
+                (time.perf_counter_ns() - start_time) / 1e9)
+        return format_messages
+
+    def _record_queue_depth(self, zone: str) -> None:
+        self._queue_depth_metrics[zone].set(MetricsRegistry.queue_depth(
+            self._outgoing_message_queues[zone]))
+        return
+
+    def _record_drop(self, zone: str) -> None:
+        with self._packets_dropped.get_lock():
+            self._packets_dropped.value += 1
+        self._dropped_metrics[zone].inc()
+        return
+
+    def _record_error(self, error_stage: str) -> None:
+        self._metrics.counter("server_errors_total",
+                              {"stage": error_stage}).inc()
+        return
+
+    def _update_clients_connected(self, client_change: int) -> None:
+        with self._clients_connected.get_lock():
+            self._clients_connected.value += client_change
+        self._clients_metric.set(self._clients_connected.value)
+        return
 
-                    except queue.Full:
-                        pass
+    def _send_thread(self, zone: str) -> None:
+        outgoing_message_queue = self._outgoing_message_queues[zone]
+
+        while self._server_running.value:
+            try:
+                outgoing_message = outgoing_message_queue.get(
+                    True, self.GET_TIME)
+                self._record_queue_depth(zone)
+
+                client_thread_list = [
+                    client_thread
+                    for client_thread in list(self._client_thread_list)
+                    if packet_protocol.session_zone(client_thread.session) ==
+                    zone]
+                wire_format_list = [
+                    packet_protocol.session_wire_format(client_thread.session)
+                    for client_thread in client_thread_list]
+                encoded_messages = self._encode_once(outgoing_message,
+                                                     wire_format_list, zone)
+
+                for client_thread, wire_format in zip(client_thread_list,
+                                                      wire_format_list):
+                    dropped_messages = client_thread.dropped_messages
+                    client_thread.add_outgoing_message(
+                        encoded_messages[wire_format])
+
+                    if client_thread.dropped_messages != dropped_messages:
+                        self._record_drop(zone)
 
             except queue.Empty:
                 pass
 
             except Exception as send_err:
                 print("Got an unhandled error in send thread: ", send_err)
+                self._record_error("send")
 
         return
 
@@ -120,56 +415,112 @@ class ServerNetworkProcess(multiprocessing.Process):
 
     def _create_server_socket(self) -> None:
         try:
-            self._server_ip = self.get_own_ip()
+            self._server_ip = self.SERVER_BIND_ADDRESS
             server_ip_info = (self._server_ip, constants.AUDIO_CLIENT_PORT)
             self._server_socket = socket.socket(socket.AF_INET,
                                                 socket.SOCK_STREAM)
+
+            # A restarted server can take the port straight back while the
+            # connections it closed are still in TIME_WAIT
+            self._server_socket.setsockopt(socket.SOL_SOCKET,
+                                           socket.SO_REUSEADDR, 1)
             self._server_socket.bind(server_ip_info)
 
             self._server_socket.listen(self.SOCKET_BACKLOG)
             self._server_socket.settimeout(self.SOCKET_TIMEOUT)
 
+            self._start_discovery_responder()
+
         except Exception as create_err:
             print("Got an error creating server socket: ", create_err)
+            self._record_error("create_socket")
+            self._server_socket = None
+            time.sleep(self.SOCKET_TIMEOUT)
+        return
+
+    def _start_discovery_responder(self) -> None:
+        if not self._discovery or self._discovery_responder is not None:
+            return
+
+        # The server still takes clients that know its address when another
+        # server on this host already answers discovery
+        try:
+            self._discovery_responder = DiscoveryResponder(
+                self.server_info, metrics=self._metrics)
+            self._discovery_responder.start()
+
+        except OSError as discovery_err:
+            print("Got an error starting server discovery: ", discovery_err)
+            self._record_error("discovery")
+            self._discovery_responder = None
+        return
+
+    def _stop_discovery_responder(self) -> None:
+        if self._discovery_responder is not None:
+            self._discovery_responder.stop()
+            self._discovery_responder = None
         return
 
-    def get_own_ip(self) -> str:
+    @classmethod
+    def get_own_ip(cls) -> str:
+        # Without a route out there is no better address than loopback
         temp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        temp_socket.connect((self.IP_TEST_ADDRESS, self.IP_TEST_PORT))
-        device_ip = temp_socket.getsockname()[self.IP_TEST_INDEX]
+        try:
+            temp_socket.connect((cls.IP_TEST_ADDRESS, cls.IP_TEST_PORT))
+            device_ip = temp_socket.getsockname()[cls.IP_TEST_INDEX]
+
+        except OSError:
+            device_ip = cls.IP_DEFAULT_ADDRESS
+
         temp_socket.close()
         return device_ip
 
     def _accept_client(self) -> None:
         try:
             new_client, client_address = self._server_socket.accept()
-            client_thread = ClientSocketThread(new_client)
+            client_thread = ClientSocketThread(
+                new_client, queue.Queue(),
+                outgoing_queue_depth=self._client_queue_depth,
+                slow_client_policy=self._slow_client_policy,
+                metrics=self._metrics,
+                metric_labels={"client": "%s:%d" % client_address},
+                stream_info=self._stream_info)
             client_thread.start()
             self._client_thread_list.append(client_thread)
-            self._clients_connected.value += 1
+            self._update_clients_connected(1)
 
         except socket.timeout:
             pass
 
         except Exception as accept_err:
             print("Had an issue with accepting client: ", accept_err)
+            self._record_error("accept")
         return
 
     def _close_dead_client_threads(self, force_close: bool = False) -> None:
-        dead_client_list = []
-
-        for client_thread in self._client_thread_list:
+        for client_thread in list(self._client_thread_list):
             if (not client_thread.thread_running) or force_close:
+                self._client_thread_list.remove(client_thread)
+                self._closing_thread_list.append(client_thread)
+                self._update_clients_connected(-1)
+
+        # A thread that stopped running closes its own socket, it is only
+        # joined once it has exited so the accept loop never waits on it
+        for client_thread in list(self._closing_thread_list):
+            if force_close:
                 client_thread.stop()
-                dead_client_list.append(client_thread)
 
-        for dead_client_list in dead_client_list:
-            self._client_thread_list.remove(dead_client_list)
-            self._clients_connected.value -= 1
+            elif client_thread.is_alive():
+                continue
+
+            client_thread.join()
+            self._closing_thread_list.remove(client_thread)
 
         return
 
     def _clear_queues(self) -> None:
-        self._outgoing_message_queue = multiprocessing.Queue(self.QUEUE_DEPTH)
+        self._outgoing_message_queues = {
+            zone: multiprocessing.Queue(self.QUEUE_DEPTH)
+            for zone in self._zones}
         self._incoming_message_queue = multiprocessing.Queue(self.QUEUE_DEPTH)
         return
@@ -0,0 +1,177 @@
+# shared_audio_ring.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# A ring of audio frames kept in shared memory so that the process producing
+# audio and the process playing it can hand frames over with a single copy
+# each way. Every slot holds up to the frame size, resampled frames can come
+# in a sample short or long so each slot keeps the length written to it
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import time
+import ctypes
+import multiprocessing
+from multiprocessing import shared_memory
+
+# The local libraries
+from network_audio_classes import constants
+
+# ***************************Shared Audio Ring Class************************* #
+
+
+class SharedAudioRing:
+    RING_DEPTH: int = 10
+
+    RING_DEPTH_ASSERT: str = "Ring depth must be a positive int"
+    FRAME_SIZE_ASSERT: str = "Audio frame is larger than the ring frame size"
+
+    def __init__(self,
+                 ring_depth: int = RING_DEPTH,
+                 frame_byte_size: int = constants.AUDIO_BYTE_FRAME_SIZE):
+        assert isinstance(ring_depth, int) and ring_depth > 0, \
+            self.RING_DEPTH_ASSERT
+
+        self._ring_depth: int = ring_depth
+        self._frame_byte_size: int = frame_byte_size
+
+        ring_byte_size = ring_depth * frame_byte_size
+        self._shared_memory = shared_memory.SharedMemory(create=True,
+                                                         size=ring_byte_size)
+
+        self._write_count = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._read_count = multiprocessing.Value(ctypes.c_uint64, 0)
+        self._last_write_time = multiprocessing.Value(ctypes.c_int64, 0)
+
+        # The local monotonic time in ns each slot should be played at
+        self._presentation_times = multiprocessing.RawArray(ctypes.c_int64,
+                                                            ring_depth)
+        self._slot_lengths = multiprocessing.RawArray(ctypes.c_uint32,
+                                                      ring_depth)
+
+        # The waiting flags keep the semaphores from counting up while nobody
+        # is blocked on them, the callback side never blocks to signal
+        self._space_semaphore = multiprocessing.Semaphore(0)
+        self._space_waiting = multiprocessing.Value(ctypes.c_bool, False)
+
+        self._data_semaphore = multiprocessing.Semaphore(0)
+        self._data_waiting = multiprocessing.Value(ctypes.c_bool, False)
+        return
+
+    @property
+    def ring_depth(self) -> int:
+        return self._ring_depth
+
+    @property
+    def frame_byte_size(self) -> int:
+        return self._frame_byte_size
+
+    @property
+    def write_count(self) -> int:
+        return self._write_count.value
+
+    @property
+    def read_count(self) -> int:
+        return self._read_count.value
+
+    @property
+    def last_write_time(self) -> int:
+        return self._last_write_time.value
+
+    @property
+    def frames_buffered(self) -> int:
+        return self._write_count.value - self._read_count.value
+
+    @property
+    def full(self) -> bool:
+        return self.frames_buffered >= self._ring_depth
+
+    @property
+    def head_presentation_time(self) -> int:
+        slot_index = self._read_count.value % self._ring_depth
+        return self._presentation_times[slot_index]
+
+    def write(self, audio_data: bytes, presentation_time: int = 0) -> bool:
+        assert len(audio_data) <= self._frame_byte_size, self.FRAME_SIZE_ASSERT
+
+        if self.full:
+            return False
+
+        self.write_slot()[:len(audio_data)] = audio_data
+        self.commit_write(presentation_time, len(audio_data))
+        return True
+
+    def write_slot(self) -> memoryview:
+        # The whole slot, commit_write says how much of it was filled
+        slot_start = (self._write_count.value % self._ring_depth) * \
+            self._frame_byte_size
+        return self._shared_memory.buf[slot_start:
+                                       slot_start + self._frame_byte_size]
+
+    def commit_write(self, presentation_time: int = 0,
+                     byte_length: int = 0) -> None:
+        assert byte_length <= self._frame_byte_size, self.FRAME_SIZE_ASSERT
+
+        slot_index = self._write_count.value % self._ring_depth
+        self._presentation_times[slot_index] = presentation_time
+        self._slot_lengths[slot_index] = byte_length or self._frame_byte_size
+
+        self._last_write_time.value = time.monotonic_ns()
+        self._write_count.value += 1
+
+        if self._data_waiting.value:
+            self._data_semaphore.release()
+        return
+
+    def read(self) -> bytes:
+        audio_data = bytes(self.head_slot())
+        self.advance()
+        return audio_data
+
+    def get_slot(self, frame_count: int) -> memoryview:
+        slot_index = frame_count % self._ring_depth
+        slot_start = slot_index * self._frame_byte_size
+        slot_end = slot_start + self._slot_lengths[slot_index]
+        return self._shared_memory.buf[slot_start:slot_end]
+
+    def head_slot(self) -> memoryview:
+        return self.get_slot(self._read_count.value)
+
+    def advance(self) -> None:
+        self._read_count.value += 1
+
+        if self._space_waiting.value:
+            self._space_semaphore.release()
+        return
+
+    def wait_for_space(self, buffered_limit: int, timeout: float) -> bool:
+        self._space_waiting.value = True
+        space_available = True
+
+        while space_available and self.frames_buffered >= buffered_limit:
+            space_available = self._space_semaphore.acquire(True, timeout)
+
+        self._space_waiting.value = False
+        return space_available
+
+    def wait_for_data(self, timeout: float) -> bool:
+        self._data_waiting.value = True
+        data_available = True
+
+        while data_available and self.frames_buffered == 0:
+            data_available = self._data_semaphore.acquire(True, timeout)
+
+        self._data_waiting.value = False
+        return data_available
+
+    def peek(self) -> bytes:
+        return bytes(self.head_slot())
+
+    def close(self) -> None:
+        self._shared_memory.close()
+        return
+
+    def unlink(self) -> None:
+        self._shared_memory.unlink()
+        return
@@ -0,0 +1,192 @@
+# stream_decoder.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# An incremental decoder that turns a socket byte stream into messages. Data
+# is read in large chunks into one reusable buffer and partial messages are
+# kept between reads, so a frame costs a handful of syscalls instead of one
+# per byte
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import json
+import socket
+from ast import literal_eval
+
+# The local libraries
+from network_audio_classes import packet_protocol
+
+# ***************************Stream Decoder Class**************************** #
+
+
+class StreamDecoder:
+    BUFFER_SIZE: int = 64 * 1024
+    MAX_LENGTH_DIGITS: int = 16
+
+    STARTING_BRACKET_CHAR: int = ord('{')
+    ENDING_BRACKET_CHAR: int = ord('}')
+    NEW_LINE_CHAR: bytes = b'\n'
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        assert isinstance(buffer_size, int) and buffer_size > 0
+
+        self._buffer: bytearray = bytearray(buffer_size)
+        self._buffer_view: memoryview = memoryview(self._buffer)
+
+        self._read_index: int = 0
+        self._write_index: int = 0
+
+        self._bracket_scan_index: int = 0
+        self._bracket_depth: int = 0
+        return
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._write_index - self._read_index
+
+    def receive_from(self, client_socket: socket.socket) -> int:
+        if self._write_index == len(self._buffer):
+            self._make_room(self.pending_bytes + 1)
+
+        free_space = self._buffer_view[self._write_index:]
+        received_bytes = client_socket.recv_into(free_space)
+        self._write_index += received_bytes
+        return received_bytes
+
+    def feed(self, data: bytes) -> None:
+        data_len = len(data)
+        if self._write_index + data_len > len(self._buffer):
+            self._make_room(self.pending_bytes + data_len)
+
+        end_index = self._write_index + data_len
+        self._buffer_view[self._write_index:end_index] = data
+        self._write_index = end_index
+        return
+
+    def messages(self):
+        while self._read_index < self._write_index:
+            first_byte = self._buffer[self._read_index]
+
+            if first_byte == packet_protocol.PACKET_MAGIC:
+                message = self._decode_binary_packet()
+
+            elif first_byte == self.STARTING_BRACKET_CHAR:
+                message = self._decode_bracket_message()
+
+            else:
+                message = self._decode_length_message()
+
+            if message is None:
+                break
+
+            yield message
+
+        if self._read_index == self._write_index:
+            self._read_index = 0
+            self._write_index = 0
+        return
+
+    def _consume(self, byte_count: int) -> memoryview:
+        start_index = self._read_index
+        self._read_index += byte_count
+        return self._buffer_view[start_index:self._read_index]
+
+    def _decode_binary_packet(self):
+        header_size = packet_protocol.HEADER_SIZE
+        if self.pending_bytes < header_size:
+            return None
+
+        header_end = self._read_index + header_size
+        header = self._buffer_view[self._read_index:header_end]
+        (packet_type, codec_id, sequence, timestamp, presentation_time,
+         payload_len) = packet_protocol.decode_header(header)
+
+        packet_len = header_size + payload_len
+        if self.pending_bytes < packet_len:
+            self._reserve(packet_len)
+            return None
+
+        self._consume(header_size)
+        audio_payload = bytes(self._consume(payload_len))
+        return packet_protocol.decode_audio_packet(codec_id, sequence,
+                                                   timestamp,
+                                                   presentation_time,
+                                                   audio_payload)
+
+    def _decode_bracket_message(self):
+        scan_index = max(self._bracket_scan_index, self._read_index)
+
+        while scan_index < self._write_index:
+            read_char = self._buffer[scan_index]
+            scan_index += 1
+
+            if read_char == self.STARTING_BRACKET_CHAR:
+                self._bracket_depth += 1
+
+            elif read_char == self.ENDING_BRACKET_CHAR:
+                self._bracket_depth -= 1
+
+                if self._bracket_depth == 0:
+                    message_len = scan_index - self._read_index
+                    self._bracket_scan_index = 0
+                    return self._parse_json(self._consume(message_len))
+
+        self._bracket_scan_index = scan_index
+        return None
+
+    def _decode_length_message(self):
+        length_end = self._buffer.find(self.NEW_LINE_CHAR, self._read_index,
+                                       self._write_index)
+
+        if length_end < 0:
+            if self.pending_bytes > self.MAX_LENGTH_DIGITS:
+                raise ValueError("Invalid message length prefix")
+            return None
+
+        message_len = int(self._buffer[self._read_index:length_end])
+        prefix_len = length_end + 1 - self._read_index
+
+        if self.pending_bytes < prefix_len + message_len:
+            self._reserve(prefix_len + message_len)
+            return None
+
+        self._consume(prefix_len)
+        return self._parse_json(self._consume(message_len))
+
+    @staticmethod
+    def _parse_json(message_data: memoryview) -> dict:
+        message_bytes = bytes(message_data)
+        try:
+            message = json.loads(message_bytes)
+
+        except json.JSONDecodeError:
+            message = literal_eval(message_bytes.decode())
+
+        if not isinstance(message, dict):
+            raise ValueError("Received message was not a dict")
+
+        return message
+
+    def _reserve(self, byte_count: int) -> None:
+        if self._read_index + byte_count > len(self._buffer):
+            self._make_room(byte_count)
+        return
+
+    def _make_room(self, byte_count: int) -> None:
+        pending_bytes = self.pending_bytes
+        pending_data = bytes(self._buffer_view[self._read_index:
+                                               self._write_index])
+
+        if byte_count > len(self._buffer):
+            self._buffer = bytearray(max(byte_count, 2 * len(self._buffer)))
+            self._buffer_view = memoryview(self._buffer)
+
+        self._buffer_view[:pending_bytes] = pending_data
+
+        if self._bracket_scan_index:
+            self._bracket_scan_index -= self._read_index
+
+        self._read_index = 0
+        self._write_index = pending_bytes
+        return
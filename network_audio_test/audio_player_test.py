@@ -16,7 +16,7 @@ if __name__ == '__main__':
     test_audio_player_right.set_speaker_location(-1.0)
 
     file_location = "audio/sample.wav"
-    audio_file = pydub.AudioSegment.from_mp3(file_location)
+    audio_file = pydub.AudioSegment.from_file(file_location)
     audio_data = audio_file.raw_data
 
     playback_len = int(len(audio_data) / 10)
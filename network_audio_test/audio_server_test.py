@@ -4,25 +4,24 @@
 
 import time
 
-from network_audio_classes import util_func
 from audio_client_application import AudioClientApplication
 from audio_server_application import AudioServerApplication
 
 
 if __name__ == '__main__':
 
-    current_ip = util_func.get_own_ip()
-
     test_server = AudioServerApplication("audio/sample.wav")
     test_server.start()
 
     time.sleep(2)
 
-    test_client = AudioClientApplication(current_ip)
+    test_client = AudioClientApplication()
     test_client.start()
 
     time.sleep(10)
 
+    print("Time to first audio: ", test_client.time_to_first_audio)
+
     test_server.stop()
     print("Server closed")
 
@@ -34,6 +33,9 @@ if __name__ == '__main__':
 
     time.sleep(10)
 
+    print("Reconnects: ", test_client.reconnects)
+    print("Time to recovery: ", test_client.recovery_time)
+
     print("CLOSING")
 
     test_client.stop()
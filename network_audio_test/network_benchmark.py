@@ -0,0 +1,376 @@
+# network_benchmark.py
+# Created by: VectorHax
+# Created on: October 18th, 2026
+
+# A headless benchmark of the network and playback pipeline. Everything runs
+# on loopback with synthetic PCM and the null output sink, the results are
+# written out as JSON and can be checked against an earlier run
+
+# **********************************Import*********************************** #
+
+# The global libraries built into python
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import platform
+
+# The imports brought in via pip
+import numpy
+
+# The local libraries
+from network_audio_classes import constants
+from network_audio_classes import packet_protocol
+from network_audio_classes import latency_profile
+from network_audio_classes.frame_pacer import FramePacer
+from network_audio_classes.audio_player_process import AudioPlayer
+from network_audio_classes.audio_output_backend import NullOutputBackend
+from network_audio_classes.client_socket_thread import ClientSocketThread
+from network_audio_classes.server_network_process import ServerNetworkProcess
+from network_audio_classes.async_server_network_process import \
+    AsyncServerNetworkProcess
+
+# ****************************Benchmark Settings***************************** #
+
+DEFAULT_OUTPUT: str = "benchmark_results.json"
+DEFAULT_DURATION: float = 5.0
+DEFAULT_CLIENTS: int = 4
+
+THROUGHPUT_FRAMES: int = 2000
+CONNECT_TIME: float = 1.0
+DRAIN_TIME: float = 1.0
+POLL_TIME: float = .0005
+
+# How much worse than the baseline a result can be before it is flagged
+REGRESSION_TOLERANCE: float = .2
+
+# Results where a higher value is better, everything else is lower is better
+HIGHER_IS_BETTER: list = ["frames_per_second", "bytes_per_second"]
+COMPARED_RESULTS: list = HIGHER_IS_BETTER + ["serialization_time",
+                                             "latency_p50", "latency_p95",
+                                             "latency_p99", "cpu_per_client",
+                                             "callback_time"]
+
+# ****************************Benchmark Helpers****************************** #
+
+
+def synthetic_frame(frame_index: int,
+                    frame_size: int = constants.AUDIO_FRAME_SIZE) -> bytes:
+    sample_index = numpy.arange(frame_size) + frame_index * frame_size
+    samples = numpy.sin(2 * numpy.pi * 440 * sample_index /
+                        constants.AUDIO_RATE) * 8000
+    return samples.astype(numpy.int16).repeat(constants.AUDIO_CHANNELS).tobytes()
+
+
+def latency_percentiles(latency_list: list) -> dict:
+    if not latency_list:
+        return {"latency_p50": 0.0, "latency_p95": 0.0, "latency_p99": 0.0}
+
+    p50, p95, p99 = numpy.percentile(latency_list, [50, 95, 99])
+    return {"latency_p50": p50, "latency_p95": p95, "latency_p99": p99}
+
+
+def child_cpu_time() -> float:
+    process_times = os.times()
+    return process_times.children_user + process_times.children_system
+
+
+def drain_messages(client_thread: ClientSocketThread,
+                   latency_list: list) -> int:
+    frames_received = 0
+
+    while True:
+        try:
+            incoming_message = client_thread.get_incoming_message()
+        except queue.Empty:
+            return frames_received
+
+        receive_time = time.monotonic_ns()
+
+        if constants.AUDIO_PAYLOAD_STR in incoming_message:
+            frames_received += 1
+            audio_timestamp = incoming_message[constants.TIMESTAMP_STR]
+            latency_list.append((receive_time - audio_timestamp) / 1e9)
+
+# *******************************Benchmarks********************************** #
+
+
+def benchmark_client_socket_thread(
+        binary_audio: bool,
+        profile: latency_profile.LatencyProfile =
+        latency_profile.BALANCED_PROFILE) -> dict:
+    server_socket, client_socket = socket.socketpair()
+
+    server_thread = ClientSocketThread(
+        server_socket, queue.Queue(),
+        slow_client_policy=constants.SLOW_CLIENT_DROP_NEWEST)
+    client_thread = ClientSocketThread(
+        client_socket, queue.Queue(),
+        handshake=packet_protocol.create_handshake(binary_audio))
+
+    server_thread.start()
+    client_thread.start()
+    time.sleep(CONNECT_TIME)
+
+    audio_frame = synthetic_frame(0, profile.frame_size)
+    latency_list = []
+    frames_received = 0
+
+    start_time = time.perf_counter()
+    start_cpu = time.process_time()
+
+    # The sender retries instead of dropping so this is the most the thread
+    # pair can move, not what a paced stream needs
+    for _ in range(THROUGHPUT_FRAMES):
+        audio_message = {constants.AUDIO_PAYLOAD_STR: audio_frame,
+                         constants.TIMESTAMP_STR: time.monotonic_ns()}
+
+        while True:
+            dropped_messages = server_thread.dropped_messages
+            server_thread.add_outgoing_message(audio_message)
+            if server_thread.dropped_messages == dropped_messages:
+                break
+            frames_received += drain_messages(client_thread, latency_list)
+            time.sleep(POLL_TIME)
+
+        frames_received += drain_messages(client_thread, latency_list)
+
+    drain_deadline = time.perf_counter() + DRAIN_TIME
+    while (frames_received < THROUGHPUT_FRAMES and
+           time.perf_counter() < drain_deadline):
+        frames_received += drain_messages(client_thread, latency_list)
+        time.sleep(POLL_TIME)
+
+    elapsed_time = time.perf_counter() - start_time
+    cpu_time = time.process_time() - start_cpu
+
+    client_thread.stop()
+    server_thread.stop()
+
+    wire_format = (binary_audio, "PCM", constants.AUDIO_RATE,
+                   constants.AUDIO_CHANNELS)
+    wire_size = len(packet_protocol.encode_message(
+        {constants.AUDIO_PAYLOAD_STR: audio_frame,
+         constants.TIMESTAMP_STR: time.monotonic_ns()}, wire_format))
+
+    results = {"frames_per_second": frames_received / elapsed_time,
+               "bytes_per_second": frames_received * wire_size / elapsed_time,
+               "wire_bytes_per_frame": wire_size,
+               "cpu_per_client": cpu_time / elapsed_time}
+    results.update(latency_percentiles(latency_list))
+    return results
+
+
+def benchmark_server_network_process(
+        server_class, client_count: int, duration: float,
+        profile: latency_profile.LatencyProfile =
+        latency_profile.BALANCED_PROFILE) -> dict:
+    server_process = server_class(playout_delay=profile.playout_delay,
+                                  frame_size=profile.frame_size)
+    server_ip = ServerNetworkProcess.get_own_ip()
+
+    start_cpu = child_cpu_time()
+    server_process.start()
+    time.sleep(CONNECT_TIME)
+
+    client_thread_list = []
+    for client_index in range(client_count):
+        client_socket = socket.create_connection(
+            (server_ip, constants.AUDIO_CLIENT_PORT))
+        client_thread = ClientSocketThread(
+            client_socket, queue.Queue(),
+            handshake=packet_protocol.create_handshake(
+                client_index % 2 == 0,
+                latency_profile=profile.profile_name))
+        client_thread.start()
+        client_thread_list.append(client_thread)
+
+    time.sleep(CONNECT_TIME)
+
+    frame_pacer = FramePacer(profile.frame_size)
+    frame_pacer.start()
+
+    latency_list = []
+    frames_received = 0
+    frames_sent = 0
+
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < duration:
+
+        # The clients are drained between frames so the latency is measured
+        # to within a poll interval of the arrival
+        while not frame_pacer.next_frame():
+            for client_thread in client_thread_list:
+                frames_received += drain_messages(client_thread, latency_list)
+            time.sleep(min(frame_pacer.time_until_next(), POLL_TIME))
+
+        audio_message = {constants.AUDIO_PAYLOAD_STR: synthetic_frame(
+            frames_sent, profile.frame_size),
+            constants.TIMESTAMP_STR: time.monotonic_ns()}
+        server_process.add_audio_packet(audio_message, wait=False)
+        frames_sent += 1
+
+    time.sleep(DRAIN_TIME)
+    for client_thread in client_thread_list:
+        frames_received += drain_messages(client_thread, latency_list)
+
+    elapsed_time = time.perf_counter() - start_time
+
+    for client_thread in client_thread_list:
+        client_thread.stop()
+
+    serialization_time = server_process.average_serialization_time
+    packets_dropped = server_process.packets_dropped
+    server_metrics = server_process.metrics.snapshot()
+
+    server_process.stop()
+    cpu_time = child_cpu_time() - start_cpu
+
+    results = {"clients": client_count,
+               "frames_sent": frames_sent,
+               "frames_per_second": frames_received / elapsed_time,
+               "bytes_per_second": frames_received *
+               profile.frame_byte_size / elapsed_time,
+               "frames_lost": frames_sent * client_count - frames_received,
+               "packets_dropped": packets_dropped,
+               "serialization_time": serialization_time,
+               "cpu_per_client": cpu_time / elapsed_time / client_count,
+               "pacer_late_frames": frame_pacer.late_frames,
+               "metrics": server_metrics}
+    results.update(latency_percentiles(latency_list))
+    return results
+
+
+def benchmark_audio_player(duration: float,
+                           profile: latency_profile.LatencyProfile =
+                           latency_profile.BALANCED_PROFILE) -> dict:
+    output_backend = NullOutputBackend(profile.frames_per_buffer)
+    audio_player = AudioPlayer(profile.ring_depth,
+                               output_backend=output_backend,
+                               frame_size=profile.frame_size)
+
+    start_cpu = child_cpu_time()
+    audio_player.start()
+
+    frames_added = 0
+    start_time = time.perf_counter()
+
+    while time.perf_counter() - start_time < duration:
+        audio_player.add_audio_data(synthetic_frame(frames_added,
+                                                    profile.frame_size))
+        frames_added += 1
+        audio_player.wait_for_audio_player()
+
+    elapsed_time = time.perf_counter() - start_time
+    frames_played = audio_player.audio_data_played
+    underrun_count = audio_player.underrun_count
+    player_metrics = audio_player.metrics.snapshot()
+
+    audio_player.stop()
+    cpu_time = child_cpu_time() - start_cpu
+
+    return {"frames_per_second": frames_played / elapsed_time,
+            "bytes_per_second": frames_played *
+            profile.frame_byte_size / elapsed_time,
+            "frames_added": frames_added,
+            "underruns": underrun_count,
+            "cpu_per_client": cpu_time / elapsed_time,
+            "callback_time": output_backend.average_callback_time,
+            "max_callback_time": output_backend.max_callback_time,
+            "max_callback_delay": output_backend.max_start_delay,
+            "late_callbacks": output_backend.late_callbacks,
+            "metrics": player_metrics}
+
+# *****************************Result Handling******************************* #
+
+
+def run_benchmarks(client_count: int, duration: float,
+                   profile_name: str = constants.BALANCED_PROFILE) -> dict:
+    profile = latency_profile.get_latency_profile(profile_name)
+    benchmark_results = {}
+
+    for binary_audio, format_name in [(True, "binary"), (False, "json")]:
+        print("Benchmarking ClientSocketThread with", format_name, "audio")
+        benchmark_results["client_socket_thread_" + format_name] = \
+            benchmark_client_socket_thread(binary_audio, profile)
+
+    for server_class, server_name in [
+            (ServerNetworkProcess, "server_network_process"),
+            (AsyncServerNetworkProcess, "async_server_network_process")]:
+        print("Benchmarking", server_class.__name__, "with", client_count,
+              "clients")
+        benchmark_results[server_name] = benchmark_server_network_process(
+            server_class, client_count, duration, profile)
+
+    print("Benchmarking AudioPlayer")
+    benchmark_results["audio_player"] = benchmark_audio_player(duration,
+                                                               profile)
+
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "clients": client_count,
+            "duration": duration,
+            "latency_profile": profile_name,
+            "benchmarks": benchmark_results}
+
+
+def find_regressions(results: dict, baseline: dict,
+                     tolerance: float = REGRESSION_TOLERANCE) -> list:
+    regression_list = []
+
+    for benchmark_name, benchmark_result in results["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(benchmark_name, {})
+
+        for result_name in COMPARED_RESULTS:
+            if result_name not in benchmark_result or \
+                    not baseline_result.get(result_name):
+                continue
+
+            result_value = benchmark_result[result_name]
+            baseline_value = baseline_result[result_name]
+
+            if result_name in HIGHER_IS_BETTER:
+                regressed = result_value < baseline_value * (1 - tolerance)
+            else:
+                regressed = result_value > baseline_value * (1 + tolerance)
+
+            if regressed:
+                regression_list.append("%s %s: %.6g against %.6g" % (
+                    benchmark_name, result_name, result_value,
+                    baseline_value))
+
+    return regression_list
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--profile", default=constants.BALANCED_PROFILE,
+                        choices=list(latency_profile.LATENCY_PROFILES))
+    arguments = parser.parse_args()
+
+    benchmark_results = run_benchmarks(arguments.clients, arguments.duration,
+                                       arguments.profile)
+
+    with open(arguments.output, "w") as output_file:
+        json.dump(benchmark_results, output_file, indent=4)
+
+    print(json.dumps(benchmark_results["benchmarks"], indent=4))
+    print("Results written to", arguments.output)
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as baseline_file:
+            regressions = find_regressions(benchmark_results,
+                                           json.load(baseline_file))
+
+        for regression in regressions:
+            print("Regression:", regression)
+
+        sys.exit(1 if regressions else 0)
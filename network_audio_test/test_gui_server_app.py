@@ -1,11 +1,11 @@
 
-from network_audio_classes import util_func
+from network_audio_classes.server_network_process import ServerNetworkProcess
 from audio_client_application import AudioClientApplication
 from audio_server_gui_app import AudioGUIServerApplication
 
 
 if __name__ == '__main__':
-    server_ip = util_func.get_own_ip()
+    server_ip = ServerNetworkProcess.get_own_ip()
     print("Starting server with ip of: ", server_ip)
 
     test_client = AudioClientApplication(server_ip)